@@ -0,0 +1,98 @@
+"""Times ``LocalFileRegistrationFactory`` on generated xlsx exports, without network.
+
+Run with ``python benchmarks/bench_local_factory.py [rows]``.
+"""
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+from time import perf_counter
+
+import openpyxl
+
+from gdocs_4_ski_automation.core.factories import (DB_FILE_NAME,
+                                                   REGISTRATION_FILE_NAME,
+                                                   SETTINGS_FILE_NAME,
+                                                   LocalFileRegistrationFactory)
+
+PARTICIPANT_HEADERS = [
+    "Vorname",
+    "Nachname",
+    "Alter zum Kursbeginn",
+    "Welcher Kurs soll besucht werden? ",
+    "Hat die Teilnehmer*in bereits Kurse besucht?",
+    "Hast du noch ein Frage oder willst eine Bemerkung hinterlassen?",
+]
+DB_HEADERS = (
+    [
+        "Zeitstempel",
+        "Sind alle Teilnehmenden Mitglieder des SV DJK Götting?",
+        "E-Mail Adresse",
+        "Vorname",
+        "Nachname",
+        "Wie lautet deine Adresse? ",
+        "Unter welcher Nummer können wir dich erreichen?",
+        "Wie viele Teilnehmer*innen möchtest du anmelden",
+    ]
+    + PARTICIPANT_HEADERS * 8
+    + ["price", "r_mail_sent", "p_mail_sent", "ID"]
+)
+COURSES = ["Ski", "Snowboard", "Zwergerl", "Zwergerl-Snowboard"]
+
+
+def write_workbook(path: Path, sheets: dict) -> None:
+    workbook = openpyxl.Workbook(write_only=True)
+    for title, rows in sheets.items():
+        worksheet = workbook.create_sheet(title)
+        for row in rows:
+            worksheet.append(row)
+    workbook.save(path)
+
+
+def write_exports(directory: Path, size: int) -> None:
+    start = datetime(2024, 10, 1, 8, 0, 0, 250000)
+    db_rows = [DB_HEADERS]
+    for n in range(size):
+        count = 1 + n % 3
+        row = [start + timedelta(minutes=n), "Ja", f"m{n}@example.org", "Eltern", f"F{n}", "Str. 1", "0123", count]
+        for slot in range(8):
+            if slot < count:
+                row += [f"Kind{slot}", f"F{n}", 4 + (n + slot) % 40, COURSES[(n + slot) % 4], "A-Kurs Ski", None]
+            else:
+                row += [None] * len(PARTICIPANT_HEADERS)
+        db_rows.append(row + [None, True, False, n + 1])
+    prices = [
+        ["Kategorie", "Preis"],
+        ["Zwergerl", 100],
+        ["Kind", 135],
+        ["Erwachsen", 160],
+        ["FamilienRabatt", 10],
+        ["FruehbucherRabatt", 15],
+        ["FruehbucherRabattDatum", datetime(2024, 11, 1)],
+    ]
+    payments = [["Bezahlungs Checkliste"], ["ID", "Vorname", "Nachname", "Mail", "Tel", "Summe", "Bezahlt"]]
+    payments += [[n + 1, None, None, None, None, None, n % 2 == 0] for n in range(size)]
+
+    write_workbook(directory / SETTINGS_FILE_NAME, {"Preise": prices})
+    write_workbook(directory / REGISTRATION_FILE_NAME, {"Bezahlung": payments})
+    write_workbook(directory / DB_FILE_NAME, {"Formularantworten": db_rows})
+
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+    with tempfile.TemporaryDirectory() as directory:
+        directory = Path(directory)
+        write_exports(directory, size)
+
+        start = perf_counter()
+        factory = LocalFileRegistrationFactory(directory)
+        load_time = perf_counter() - start
+
+        start = perf_counter()
+        registrations = factory.build_registrations()
+        map_time = perf_counter() - start
+
+    print(
+        f"{len(registrations)} registrations | read {load_time:.3f}s | map {map_time:.3f}s"
+        f" | {len(registrations) / (load_time + map_time):.0f} registrations/s"
+    )
@@ -0,0 +1,50 @@
+"""Compares per-registration ``get_paid_flag`` scans with a prebuilt ``build_paid_index``.
+
+Run with ``python benchmarks/bench_paid_index.py``. The scan is quadratic, so for
+large sizes it is timed on a sample of lookups and extrapolated to all rows.
+"""
+import random
+from time import perf_counter
+
+import pandas as pd
+
+from gdocs_4_ski_automation.core.factories import build_paid_index, get_paid_flag
+
+SIZES = [1_000, 10_000, 50_000]
+MAX_SCAN_LOOKUPS = 1_000
+
+
+def make_registrations_frame(size: int) -> dict:
+    ids = [str(i) for i in range(1, size + 1)]
+    paid = [random.choice(["TRUE", "FALSE"]) for _ in ids]
+    frame = pd.DataFrame({"ID": ids, "Bezahlt": paid})
+    return {"Bezahlung": frame}
+
+
+def bench(size: int) -> None:
+    registrations_frame = make_registrations_frame(size)
+    lookup_ids = [str(i) for i in range(1, size + 1)]
+
+    sample = random.sample(lookup_ids, min(size, MAX_SCAN_LOOKUPS))
+    start = perf_counter()
+    scanned = [get_paid_flag(registrations_frame, i) for i in sample]
+    scan_time = (perf_counter() - start) * size / len(sample)
+
+    start = perf_counter()
+    index = build_paid_index(registrations_frame)
+    indexed = [index.get(i, False) for i in lookup_ids]
+    index_time = perf_counter() - start
+
+    assert scanned == [index.get(i, False) for i in sample]
+    assert len(indexed) == size
+    print(
+        f"{size:>7} rows | scan {scan_time:9.3f}s"
+        f"{' (extrapolated)' if len(sample) < size else '               '}"
+        f" | index {index_time:7.4f}s | speedup {scan_time / index_time:8.0f}x"
+    )
+
+
+if __name__ == "__main__":
+    random.seed(0)
+    for size in SIZES:
+        bench(size)
@@ -0,0 +1,72 @@
+"""Times ``render_previews`` in this process and on a process pool.
+
+Run with ``python benchmarks/bench_previews.py [registrations]``.
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+import yaml
+
+from gdocs_4_ski_automation.core.ctypes import (ContactPerson, Course, Name,
+                                                Participant, Payment,
+                                                Registration)
+from gdocs_4_ski_automation.core.mail_services import render_previews
+
+REGISTRATION_TEMPLATE = """<html><body>
+<p>Hallo {{ first_name }},</p>
+<ul>
+{% for p in participants %}
+  <li>{{ p.first_name }} {{ p.last_name }} ({{ p.age }}): {{ p.course }}</li>
+{% endfor %}
+</ul>
+<p>Bitte überweise {{ amount }} EUR an {{ iban }} ({{ bic }}), Kurs {{ course_number }}.</p>
+<p>Fragen an {{ contact_email }}</p>
+</body></html>
+"""
+PAID_TEMPLATE = "<p>Danke {{ first_name }} {{ last_name }}, {{ amount }} EUR erhalten.</p>\n"
+MAIL_SETTINGS = {
+    "from_email": "kurse@example.org",
+    "iban": "DE00 0000",
+    "bic": "GENODEF1",
+    "contact_email": "info@example.org",
+}
+
+
+def make_registration(_id: int) -> Registration:
+    participants = tuple(
+        Participant(Name(f"Kind{n}", f"Familie{_id}"), 4 + n, Course.SKI, "", "")
+        for n in range(1 + _id % 3)
+    )
+    return Registration(
+        time_stemp="01.10.2024 12:00:00",
+        _id=_id,
+        contact=ContactPerson(Name("Eltern", f"Familie{_id}"), "Str. 1", f"m{_id}@example.org", ""),
+        participants=participants,
+        payment=Payment(amount=120.0 * len(participants), payed=_id % 2 == 0),
+        registration_mail_sent=False,
+        payment_mail_sent=False,
+        timestamp=datetime(2024, 10, 1, 12),
+    )
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+    registrations = [make_registration(n) for n in range(1, count + 1)]
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = Path(tmp)
+        (directory / "registration.html").write_text(REGISTRATION_TEMPLATE)
+        (directory / "paid.html").write_text(PAID_TEMPLATE)
+        (directory / "mail_setting.yaml").write_text(yaml.safe_dump(MAIL_SETTINGS))
+        for workers in (1, os.cpu_count()):
+            report = render_previews(
+                registrations,
+                str(directory / "paid.html"),
+                str(directory / "registration.html"),
+                str(directory / "mail_setting.yaml"),
+                str(directory / f"previews_{workers}"),
+                workers=workers,
+            )
+            print(f"{workers} worker(s): {report}")
@@ -0,0 +1,104 @@
+"""Measures the memory of 100k registrations with the slotted record types.
+
+Compares ``core.ctypes`` against the same records as plain ``@dataclass`` objects
+with a ``__dict__``. Run with ``python benchmarks/bench_record_memory.py [count]``.
+"""
+import sys
+import tracemalloc
+from dataclasses import dataclass
+
+from gdocs_4_ski_automation.core import ctypes as slotted
+from gdocs_4_ski_automation.core.ctypes import Course
+
+
+@dataclass
+class Name:
+    first: str
+    last: str
+
+
+@dataclass
+class ContactPerson:
+    name: Name
+    adress: str
+    mail: str
+    tel: str
+
+
+@dataclass
+class Participant:
+    name: Name
+    age: int
+    course: Course
+    pre_course: str
+    notes: str
+
+
+@dataclass
+class Payment:
+    amount: float
+    payed: bool
+
+
+@dataclass
+class Registration:
+    time_stemp: str
+    _id: int
+    contact: ContactPerson
+    participants: list
+    payment: Payment
+    registration_mail_sent: bool
+    payment_mail_sent: bool
+
+
+def build(types, count: int, participant_container) -> list:
+    # distinct strings per registration, like values decoded from the sheet
+    registrations = []
+    for i in range(count):
+        family = f"Familie{i}"
+        participants = participant_container(
+            types.Participant(
+                name=types.Name(first=f"Kind{k}", last=family),
+                age=4 + k,
+                course=Course.SKI,
+                pre_course="A-Kurs Ski",
+                notes="",
+            )
+            for k in range(2)
+        )
+        registrations.append(
+            types.Registration(
+                time_stemp=f"01.10.2024 12:{i % 60:02d}:00",
+                _id=i + 1,
+                contact=types.ContactPerson(
+                    name=types.Name(first="Eltern", last=family),
+                    adress=f"Hauptstr. {i}",
+                    mail=f"eltern{i}@example.org",
+                    tel=f"0123{i}",
+                ),
+                participants=participants,
+                payment=types.Payment(amount=270.0, payed=False),
+                registration_mail_sent=False,
+                payment_mail_sent=False,
+            )
+        )
+    return registrations
+
+
+def measure(types, count: int, participant_container) -> int:
+    tracemalloc.start()
+    registrations = build(types, count, participant_container)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert len(registrations) == count
+    return size
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    plain = measure(sys.modules[__name__], count, list)
+    compact = measure(slotted, count, tuple)
+    print(f"{count} registrations with 2 participants each")
+    print(f"plain dataclasses : {plain / 2**20:7.1f} MiB ({plain / count:6.0f} B/registration)")
+    print(f"slotted records   : {compact / 2**20:7.1f} MiB ({compact / count:6.0f} B/registration)")
+    print(f"saved             : {(plain - compact) / 2**20:7.1f} MiB ({1 - compact / plain:.0%})")
@@ -0,0 +1,28 @@
+"""Compares ``parse_time_stemp`` with ``datetime.strptime`` on Zeitstempel values.
+
+Run with ``python benchmarks/bench_timestamps.py [count]``.
+"""
+import sys
+from datetime import datetime, timedelta
+from timeit import timeit
+
+from gdocs_4_ski_automation.core.timestamps import (TIME_STEMP_FORMAT,
+                                                    parse_time_stemp)
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    start = datetime(2024, 10, 1, 8, 0, 0)
+    values = [(start + timedelta(seconds=37 * n)).strftime(TIME_STEMP_FORMAT) for n in range(count)]
+    assert [parse_time_stemp(v) for v in values[:1000]] == [
+        datetime.strptime(v, TIME_STEMP_FORMAT) for v in values[:1000]
+    ]
+
+    def best_of_three(parse) -> float:
+        return min(timeit(lambda: [parse(v) for v in values], number=1) for _ in range(3))
+
+    slow = best_of_three(lambda v: datetime.strptime(v, TIME_STEMP_FORMAT))
+    fast = best_of_three(parse_time_stemp)
+    print(f"{count} timestamps")
+    print(f"strptime         : {slow:.3f}s ({slow / count * 1e6:.2f} us/value)")
+    print(f"parse_time_stemp : {fast:.3f}s ({fast / count * 1e6:.2f} us/value)")
+    print(f"speedup          : {slow / fast:.1f}x")
@@ -0,0 +1,84 @@
+"""Compares mail transports against local stand-ins with simulated latency.
+
+Sends the same emails through ``HTTPBatchTransport`` with several batch sizes and,
+if ``aiosmtpd`` is installed, through ``SMTPSession``.
+
+Run with ``python benchmarks/bench_transports.py [emails] [latency in ms]``.
+"""
+import asyncio
+import socket
+import sys
+from pathlib import Path
+from time import perf_counter
+
+import yagmail
+
+from gdocs_4_ski_automation.core.mail_transports import (HTTPBatchTransport,
+                                                         SMTPSession)
+
+# the stand-in of the mail API lives with the tests
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tests"))
+from fake_mail_api import FakeMailAPI  # noqa: E402
+
+TEMPLATE = {"subject": "Registrierungsbestätigung", "body": "<p>Hallo</p>" * 50, "attachments": []}
+MAIL_SETTINGS = {"from_email": "kurse@example.org"}
+
+
+def bench_http(count: int, latency: float, max_batch: int) -> float:
+    messages = [(f"eltern{n}@example.org", TEMPLATE) for n in range(count)]
+    with FakeMailAPI(latency=latency) as api, HTTPBatchTransport(api.url, "key") as transport:
+        start = perf_counter()
+        for i in range(0, count, max_batch):
+            transport.send_batch(messages[i : i + max_batch], MAIL_SETTINGS, "unused")
+        seconds = perf_counter() - start
+    assert len(api.messages) == count
+    return seconds
+
+
+def bench_smtp(count: int, latency: float) -> float:
+    from aiosmtpd.controller import Controller
+
+    class SlowHandler:
+        async def handle_DATA(self, server, session, envelope):
+            await asyncio.sleep(latency)
+            return "250 OK"
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    controller = Controller(SlowHandler(), hostname="127.0.0.1", port=port)
+    controller.start()
+
+    def connect(mail_settings, credentials_dir) -> yagmail.SMTP:
+        return yagmail.SMTP(
+            mail_settings["from_email"],
+            host="127.0.0.1",
+            port=port,
+            smtp_ssl=False,
+            smtp_starttls=False,
+            smtp_skip_login=True,
+        )
+
+    try:
+        with SMTPSession(connect) as session:
+            start = perf_counter()
+            for n in range(count):
+                session.send(f"eltern{n}@example.org", TEMPLATE, MAIL_SETTINGS, "unused")
+            return perf_counter() - start
+    finally:
+        controller.stop()
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 20.0) / 1000
+    print(f"{count} emails, {latency * 1000:.0f} ms latency per request or transaction")
+    for max_batch in (1, 10, 100):
+        seconds = bench_http(count, latency, max_batch)
+        print(f"HTTP batch of {max_batch:>3}: {seconds:.2f}s ({count / seconds:.1f} mails/s)")
+    try:
+        seconds = bench_smtp(count, latency)
+    except ImportError:
+        print("SMTP session     : skipped, aiosmtpd is not installed")
+    else:
+        print(f"SMTP session     : {seconds:.2f}s ({count / seconds:.1f} mails/s)")
@@ -24,6 +24,10 @@ FILE_PATHS: Dict[str, str] = {
     "registration_template_path": "registration.html",
     "checklist_path": "checklist.pdf",
     "mail_secret_path": "client_secret_mail.json",
+    # /tmp survives between invocations of a warm instance
+    "state_path": "/tmp/ingestion_state.pkl",
+    "snapshot_dir": "/tmp/sheet_snapshots",
+    "outbox_path": "/tmp/mail_outbox.sqlite",
 }
 
 
@@ -55,6 +59,9 @@ def main(request) -> tuple[str, int]:
             checklist_path=FILE_PATHS["checklist_path"],
             mail_secret_path=FILE_PATHS["mail_secret_path"],
             sheet_ids=SHEET_IDS,
+            state_path=FILE_PATHS["state_path"],
+            snapshot_dir=FILE_PATHS["snapshot_dir"],
+            outbox_path=FILE_PATHS["outbox_path"],
         )
         
         logger.info("Service completed successfully")
@@ -0,0 +1,114 @@
+import mimetypes
+import os
+import threading
+from collections import OrderedDict
+from email import encoders
+from email.mime.base import MIMEBase
+from typing import Tuple, Union
+
+# key of a cached attachment: absolute path, modification time and size of the file
+_Key = Tuple[str, int, int]
+
+
+class AttachmentCache:
+    """Base64-encoded MIME parts of attachments shared by many emails.
+
+    Every email of a run carries the same files, e.g. the checklist PDF. The cache
+    reads and encodes each file once and hands out the same MIME part for every
+    message, which only references it when it is serialized. A file that changes on
+    disk is encoded again. The cache is bounded by the encoded size of its parts and
+    evicts the least recently used part first. Files larger than the bound are encoded
+    for every email without being cached. The cache is safe to share between threads.
+
+    Attributes:
+        max_bytes: Maximum total size of the cached, encoded parts.
+        size: Current total size of the cached, encoded parts.
+        hits: Number of parts served from the cache.
+        misses: Number of parts encoded.
+    """
+
+    def __init__(self, max_bytes: int = 8 * 1024 * 1024) -> None:
+        """Initialize the cache.
+
+        Args:
+            max_bytes: Maximum total size of the cached, encoded parts.
+        """
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[_Key, Tuple[MIMEBase, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        """Drop all cached parts, keeping the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def get(self, path: Union[str, os.PathLike]) -> MIMEBase:
+        """Get the MIME part of an attachment, encoding the file on first use.
+
+        The returned part is shared and must not be modified.
+
+        Args:
+            path: Path of the file to attach.
+
+        Returns:
+            The base64-encoded attachment part.
+
+        Raises:
+            FileNotFoundError: If the file does not exist.
+        """
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        key = (path, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+
+        part = encode_attachment(path)
+        size = len(part.get_payload())
+        with self._lock:
+            self.misses += 1
+            if size <= self.max_bytes and key not in self._entries:
+                self._entries[key] = (part, size)
+                self.size += size
+                while self.size > self.max_bytes:
+                    _, (_, evicted) = self._entries.popitem(last=False)
+                    self.size -= evicted
+        return part
+
+
+def encode_attachment(path: Union[str, os.PathLike]) -> MIMEBase:
+    """Read a file into a base64-encoded attachment part.
+
+    Args:
+        path: Path of the file to attach.
+
+    Returns:
+        The attachment part, named after the file.
+
+    Raises:
+        FileNotFoundError: If the file does not exist.
+    """
+    content_type, encoding = mimetypes.guess_type(str(path))
+    if content_type is None or encoding is not None:
+        content_type = "application/octet-stream"
+    main_type, sub_type = content_type.split("/", 1)
+    part = MIMEBase(main_type, sub_type)
+    with open(path, "rb") as file:
+        part.set_payload(file.read())
+    encoders.encode_base64(part)
+    part.add_header("Content-Disposition", "attachment", filename=os.path.basename(path))
+    return part
+
+
+# one cache per process, so a warm instance keeps its encoded attachments
+SHARED_ATTACHMENTS = AttachmentCache()
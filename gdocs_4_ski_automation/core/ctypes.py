@@ -1,5 +1,7 @@
 from dataclasses import dataclass
+from datetime import datetime
 from enum import Enum
+from typing import Optional, Tuple
 
 
 class Course(Enum):
@@ -9,13 +11,13 @@ class Course(Enum):
     SNOWBOARD = "Snowboard"
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Name:
     first: str
     last: str
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ContactPerson:
     name: Name
     adress: str
@@ -23,7 +25,7 @@ class ContactPerson:
     tel: str
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Participant:
     name: Name
     age: int
@@ -32,19 +34,23 @@ class Participant:
     notes: str
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Payment:
     amount: float
     payed: bool
 
 
-@dataclass
+# Registration stays mutable as its mail flags are set in place, by the mail service
+# and from the sheet when a stored registration is reused. ``timestamp`` is
+# ``time_stemp`` parsed once during mapping.
+@dataclass(slots=True)
 class Registration:
 
     time_stemp: int
     _id: int
     contact: ContactPerson
-    participants: tuple[Participant]
+    participants: Tuple[Participant, ...]
     payment: Payment
     registration_mail_sent: bool
     payment_mail_sent: bool
+    timestamp: Optional[datetime] = None
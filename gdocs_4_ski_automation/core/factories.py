@@ -1,17 +1,47 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Generator, List, Optional, Tuple, Union
+from typing import Dict, Generator, List, Optional, Set, Tuple, Union
 
 import gspread
 import pandas as pd
+from gspread.utils import absolute_range_name
 
 from gdocs_4_ski_automation.core.ctypes import (ContactPerson, Course, Name,
                                                 Participant, Payment,
                                                 Registration)
-from gdocs_4_ski_automation.core.price_calculation import get_price
+from gdocs_4_ski_automation.core.incremental import (FORM_COLUMN_COUNT,
+                                                     ChangeTracker,
+                                                     IngestionState,
+                                                     load_state, row_digest,
+                                                     save_state)
+from gdocs_4_ski_automation.core.price_calculation import (PriceCache,
+                                                           PriceTable,
+                                                           Prices, get_price)
+from gdocs_4_ski_automation.core.schema import (ParticipantSlot,
+                                                RegistrationSchema,
+                                                make_headers_unique)
+from gdocs_4_ski_automation.core.sheet_reader import (BatchSheetReader,
+                                                      read_workbook_values)
+from gdocs_4_ski_automation.core.sheet_writer import TableExtent
+from gdocs_4_ski_automation.core.snapshot_cache import SnapshotCache
+from gdocs_4_ski_automation.core.timestamps import (TimestampParser,
+                                                    parse_time_stemp)
 from gdocs_4_ski_automation.utils.utils import GoogleAuthenticatorInterface
 
 
+SETTINGS_FILE_NAME = "settings.xlsx"
+REGISTRATION_FILE_NAME = "anmeldungen.xlsx"
+DB_FILE_NAME = "anmeldungen_db_do_not_change.xlsx"
+
+FORM_COURSES = {
+    "Zwergerl": Course.ZWEGERL,
+    "Zwergerl-Snowboard": Course.ZWEGERL_SNOWBOARD,
+    "Ski": Course.SKI,
+    "Snowboard": Course.SNOWBOARD,
+}
+
+
 def map_settings_to_price_dict(settings_frame: pd.DataFrame) -> Dict[str, Union[str, float]]:
     """Maps the settings DataFrame to a dictionary containing price information.
 
@@ -27,10 +57,23 @@ def map_settings_to_price_dict(settings_frame: pd.DataFrame) -> Dict[str, Union[
     return prices
 
 
+def map_settings_to_price_table(settings_frame: pd.DataFrame) -> PriceTable:
+    """Maps the settings DataFrame to a parsed PriceTable.
+
+    Args:
+        settings_frame: DataFrame containing the settings information with 'Preise' sheet.
+
+    Returns:
+        Price table with numbers and the early bird cutoff already parsed.
+    """
+    return PriceTable.from_prices(map_settings_to_price_dict(settings_frame))
+
+
 def dataframe_to_registration_mapper(
     db_frame: pd.DataFrame, 
     settings_frame: pd.DataFrame, 
-    registrations_frame: pd.DataFrame
+    registrations_frame: pd.DataFrame,
+    paid_index: Optional[Dict[str, bool]] = None,
 ) -> Generator[Registration, None, None]:
     """Maps data from the provided dataframes to Registration objects.
 
@@ -41,24 +84,29 @@ def dataframe_to_registration_mapper(
         db_frame: DataFrame containing the database information with form responses.
         settings_frame: DataFrame containing the settings information including prices.
         registrations_frame: DataFrame containing the registrations information with payment status.
+        paid_index: Optional ID to paid mapping from ``build_paid_index``. Built from
+            ``registrations_frame`` if not given.
 
     Yields:
         Registration objects constructed from the dataframes.
     """
-    price_dict = map_settings_to_price_dict(settings_frame)
+    price_table = map_settings_to_price_table(settings_frame)
+    if paid_index is None:
+        paid_index = build_paid_index(registrations_frame)
 
     for i, line in db_frame["Formularantworten"].iterrows():
         if line["Zeitstempel"] != "":
             time_stemp = line["Zeitstempel"]
+            timestamp = parse_time_stemp(time_stemp)
             contact = build_contact(line)
-            participants = list(
+            participants = tuple(
                 filter(
                     lambda x: x is not None,
                     (build_participant(line, i, registrations_frame) for i in range(8)),
                 )
             )
-            pay_sum = get_price(participants, time_stemp, price_dict)
-            payed_flag = get_paid_flag(registrations_frame, line["ID"])
+            pay_sum = get_price(participants, timestamp, price_table)
+            payed_flag = paid_index.get(line["ID"], False)
             payment = Payment(amount=pay_sum, payed=payed_flag)
             payment_mail_sent = line["p_mail_sent"] == "TRUE"
             registration_mail_sent = line["r_mail_sent"] == "TRUE"
@@ -71,8 +119,154 @@ def dataframe_to_registration_mapper(
                 payment=payment,
                 registration_mail_sent=registration_mail_sent,
                 payment_mail_sent=payment_mail_sent,
+                timestamp=timestamp,
+            )
+
+
+def rows_to_registration_mapper(
+    db_rows: List[List[str]],
+    schema: RegistrationSchema,
+    prices: Prices,
+    paid_index: Dict[str, bool],
+    offset: int = 0,
+    price_cache: Optional[PriceCache] = None,
+    timestamps: Optional[TimestampParser] = None,
+    tracker: Optional[ChangeTracker] = None,
+    known: Optional[Dict[int, Registration]] = None,
+) -> Generator[Registration, None, None]:
+    """Maps raw Formularantworten rows to Registration objects.
+
+    Same result as ``dataframe_to_registration_mapper``, but decodes the lists
+    returned by ``get_all_values()`` directly through a compiled schema.
+
+    Args:
+        db_rows: Data rows of the Formularantworten sheet, without the header row.
+        schema: Schema compiled from the sheet's deduplicated headers.
+        prices: Price table from ``map_settings_to_price_table`` (or a price dictionary).
+        paid_index: ID to paid mapping from ``build_paid_index``.
+        offset: Data index of the first row, used to number registrations.
+        price_cache: Optional price cache shared across calls. A new one is used if not given.
+        timestamps: Optional timestamp parser shared across calls. A new one is used if not given.
+        tracker: Optional change tracker recording the inputs of every registration.
+        known: Registrations of the previous run by ID. Together with ``tracker``, rows
+            whose inputs did not change reuse these instead of being decoded and priced.
+
+    Yields:
+        Registration objects constructed from the rows.
+    """
+    if price_cache is None:
+        price_cache = PriceCache()
+    if timestamps is None:
+        timestamps = TimestampParser()
+    if known is None:
+        known = {}
+    width = schema.width
+    for i, row in enumerate(db_rows, start=offset):
+        if len(row) < width:
+            row = row + [""] * (width - len(row))
+        time_stemp = row[schema.time_stemp]
+        if time_stemp != "":
+            paid = paid_index.get(row[schema._id], False)
+            registration_mail_sent = row[schema.r_mail_sent] == "TRUE"
+            payment_mail_sent = row[schema.p_mail_sent] == "TRUE"
+            pending = not registration_mail_sent or (paid and not payment_mail_sent)
+            if tracker is not None and tracker.observe(i + 1, row_digest(row), paid, pending):
+                registration = known.get(i + 1)
+                if registration is not None:
+                    # the flags of the sheet win over the stored ones, which are stale if
+                    # another run sent the mails or a run stopped before storing its state
+                    registration.registration_mail_sent = registration_mail_sent
+                    registration.payment_mail_sent = payment_mail_sent
+                    yield registration
+                    continue
+            timestamp = timestamps(time_stemp)
+            participants = tuple(
+                participant
+                for participant in (decode_participant(row, slot) for slot in schema.participants)
+                if participant is not None
+            )
+            payment = Payment(
+                amount=price_cache.get_price(participants, timestamp, prices),
+                payed=paid,
             )
 
+            yield Registration(
+                time_stemp=time_stemp,
+                _id=i + 1,
+                contact=decode_contact(row, schema),
+                participants=participants,
+                payment=payment,
+                registration_mail_sent=registration_mail_sent,
+                payment_mail_sent=payment_mail_sent,
+                timestamp=timestamp,
+            )
+
+
+def decode_participant(row: List[str], slot: ParticipantSlot) -> Optional[Participant]:
+    """Decodes one participant block of a raw form row.
+
+    Args:
+        row: Raw cell values of a Formularantworten row.
+        slot: Column positions of the participant block.
+
+    Returns:
+        The decoded Participant object or None if no course is selected.
+
+    Raises:
+        ValueError: If an unknown course type is encountered.
+    """
+    course = row[slot.course]
+    if course == "":
+        return None
+    if course not in FORM_COURSES:
+        raise ValueError(f"Course {course} not found")
+    return Participant(
+        name=Name(first=row[slot.first], last=row[slot.last]),
+        age=int(row[slot.age]),
+        course=FORM_COURSES[course],
+        pre_course=row[slot.pre_course],
+        notes=row[slot.notes],
+    )
+
+
+def decode_contact(row: List[str], schema: RegistrationSchema) -> ContactPerson:
+    """Decodes the contact person of a raw form row.
+
+    Args:
+        row: Raw cell values of a Formularantworten row.
+        schema: Column positions of the contact fields.
+
+    Returns:
+        The decoded ContactPerson object.
+    """
+    return ContactPerson(
+        name=Name(first=row[schema.first], last=row[schema.last]),
+        adress=row[schema.adress],
+        mail=row[schema.mail],
+        tel=row[schema.tel],
+    )
+
+
+def build_paid_index(registrations_frame: pd.DataFrame) -> Dict[str, bool]:
+    """Builds an ID to paid mapping from the 'Bezahlung' sheet.
+
+    Replaces repeated ``get_paid_flag`` scans with a single pass, so looking up
+    the payment status of every registration is linear instead of quadratic.
+    Like ``get_paid_flag``, the first row of a duplicated ID wins.
+
+    Args:
+        registrations_frame: DataFrame containing the registrations information with payment data.
+
+    Returns:
+        Dictionary mapping registration IDs to True if paid, False otherwise.
+    """
+    payments = registrations_frame["Bezahlung"]
+    index = {}
+    for registration_id, paid in zip(payments["ID"].values, payments["Bezahlt"].values):
+        if registration_id != "" and registration_id not in index:
+            index[registration_id] = paid == "TRUE"
+    return index
+
 
 def get_paid_flag(registrations_frame: pd.DataFrame, registration_id: str) -> bool:
     """Checks if the registration with the given ID has been paid.
@@ -159,56 +353,107 @@ def build_contact(line: pd.Series) -> ContactPerson:
     )
 
 
+def values_to_frame(records: List[List[str]], head: int = 1) -> pd.DataFrame:
+    """Builds a DataFrame from raw sheet values with deduplicated headers.
+
+    Args:
+        records: Values of a worksheet as returned by ``get_all_values()``.
+        head: Number of header rows; the last of them names the columns.
+
+    Returns:
+        DataFrame with the rows below the header rows.
+    """
+    headers = records[head - 1]
+    return pd.DataFrame(records[head:], columns=list(make_headers_unique(headers)))
+
+
 class LocalFileRegistrationFactory:
     """Factory for building registrations from local Excel files.
     
-    Note: This class is not currently implemented.
+    Reads xlsx exports of the settings, registrations and db spreadsheets and
+    builds the same registrations as ``GDocsRegistrationFactory``, without network.
     """
     
-    def __init__(self, file_path: Path) -> None:
+    def __init__(
+        self,
+        file_path: Path,
+        setting_file_name: str = SETTINGS_FILE_NAME,
+        registration_file_name: str = REGISTRATION_FILE_NAME,
+        db_file_name: str = DB_FILE_NAME,
+    ) -> None:
         """Initialize the local file registration factory.
         
         Args:
             file_path: Path to the directory containing Excel files.
+            setting_file_name: File name of the settings export.
+            registration_file_name: File name of the registrations export.
+            db_file_name: File name of the db export.
             
         Raises:
-            NotImplementedError: This class is not yet implemented.
+            FileNotFoundError: If one of the files does not exist.
         """
-        self.file_path = file_path
-        raise NotImplementedError("This class is not implemented yet")
+        self.file_path = Path(file_path)
 
-        self.setting_file_name = SETTINGS_FILE_NAME
-        self.registration_file_name = REGISTRATION_FILE_NAME
-        self.db_file_name = DB_FILE_NAME
+        self.setting_file_name = setting_file_name
+        self.registration_file_name = registration_file_name
+        self.db_file_name = db_file_name
 
         file_names = [self.setting_file_name, self.registration_file_name, self.db_file_name]
         for file_name in file_names:
-            if not os.path.exists(file_path / file_name):
+            if not os.path.exists(self.file_path / file_name):
                 raise FileNotFoundError(f"File {file_name} not found")
-        self.settings_frame = self._load(file_path / self.setting_file_name)
-        self.registrations_frame = self._load(file_path / self.registration_file_name)
-        self.db_frame = self._load(file_path / self.db_file_name)
+        self.settings_frame = {
+            title: frame
+            for title, frame in self._load(self.file_path / self.setting_file_name, ["Preise"])
+        }
+        self.registrations_frame = {
+            title: frame
+            for title, frame in self._load(
+                self.file_path / self.registration_file_name, ["Bezahlung"], head=2
+            )
+        }
+        records = read_workbook_values(self.file_path / self.db_file_name, ["Formularantworten"])
+        records = records["Formularantworten"]
+        self.headers = records[0] if records else []
+        self.db_rows = records[1:]
+        self.schema = RegistrationSchema.compile(list(make_headers_unique(self.headers)))
+        self.paid_index = build_paid_index(self.registrations_frame)
+        self.price_table = map_settings_to_price_table(self.settings_frame)
+        self.price_cache = PriceCache()
+        self.timestamps = TimestampParser()
 
-    def _load(self, directory: Path) -> pd.DataFrame:
-        """Load Excel file from directory path.
+    def _load(
+        self, directory: Path, needed_sheets: List[str], head: int = 1
+    ) -> Generator[Tuple[str, pd.DataFrame], None, None]:
+        """Load worksheets of an Excel file.
         
         Args:
             directory: Path to the Excel file.
+            needed_sheets: List of sheet titles to load.
+            head: Number of header rows to skip. Defaults to 1.
             
-        Returns:
-            DataFrame with the loaded Excel data.
+        Yields:
+            Tuple containing the sheet title and a pandas DataFrame with the sheet's data.
         """
-        return pd.read_excel(directory)
+        for title, records in read_workbook_values(directory, needed_sheets).items():
+            yield title, values_to_frame(records, head)
 
-    def build_registrations(self) -> Tuple[Registration, ...]:
+    def build_registrations(self) -> List[Registration]:
         """Build registration objects from local files.
         
         Returns:
-            Tuple of Registration objects.
+            List of Registration objects.
         """
-        return tuple(dataframe_to_registration_mapper(
-            self.db_frame, self.settings_frame, self.registrations_frame
-        ))
+        return list(
+            rows_to_registration_mapper(
+                self.db_rows,
+                self.schema,
+                self.price_table,
+                self.paid_index,
+                price_cache=self.price_cache,
+                timestamps=self.timestamps,
+            )
+        )
 
 
 class GDocsRegistrationFactory:
@@ -218,13 +463,31 @@ class GDocsRegistrationFactory:
     data from multiple sheets to create Registration objects.
     """
     
-    def __init__(self, sheet_ids: Dict[str, str], g_client: gspread.Client) -> None:
+    def __init__(
+        self,
+        sheet_ids: Dict[str, str],
+        g_client: gspread.Client,
+        state_path: Optional[str] = None,
+        projected: bool = False,
+        chunk_rows: Optional[int] = None,
+        cache: Optional[SnapshotCache] = None,
+    ) -> None:
         """Initializes the factory with Google Sheets IDs and client.
         
         Args:
             sheet_ids: Dictionary containing the IDs of the Google Sheets.
                 Expected keys are 'settings', 'registrations', and 'db'.
             g_client: The Google client used to interact with the Google Sheets API.
+            state_path: Optional path of an ingestion state file. If given, the factory
+                runs in incremental mode: rows whose form answers, payment status and
+                prices did not change since the stored run are neither decoded nor priced.
+            projected: If True, only the db columns the mapper consumes are downloaded.
+                Needs the header row first, which costs one extra small request when
+                there is no ingestion state.
+            chunk_rows: Optional maximum number of db rows per request for very large sheets.
+            cache: Optional snapshot cache for the settings sheet. The registrations and db
+                sheets are written on every run, which changes their revision, so probing
+                them would only add a request. They are always read from the API.
         """
 
         # get the sheet ids and client as global variables
@@ -233,19 +496,119 @@ class GDocsRegistrationFactory:
         self.registration_sheet_id = sheet_ids["registrations"]
         self.db_sheet_id = sheet_ids["db"]
         self.gc = g_client
+        self.state_path = state_path
+        self.state = load_state(state_path) if state_path is not None else None
+        self.projected = projected
+        self.chunk_rows = chunk_rows
+
+        self.reader = BatchSheetReader(g_client, cache=cache)
+
+        # fetch all needed sheets concurrently, the db sheet on its own thread as it
+        # may take more than one request
+        settings_range = absolute_range_name("Preise")
+        payments_range = absolute_range_name("Bezahlung")
+        ranges: Dict[str, List[str]] = {}
+        for sheet_id, range_name in [
+            (self.setting_sheet_id, settings_range),
+            (self.registration_sheet_id, payments_range),
+        ]:
+            ranges.setdefault(sheet_id, []).append(range_name)
+        written = {self.registration_sheet_id, self.db_sheet_id}
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            db_future = pool.submit(self._load_db)
+            values = self.reader.fetch(ranges, cached={self.setting_sheet_id} - written)
+            self.db_rows = db_future.result()
 
         # build dataframes from google sheets witch are needed
         self.settings_frame = {
-            title: frame for title, frame in self._load(self.setting_sheet_id, ["Preise"])
+            "Preise": values_to_frame(values[self.setting_sheet_id][settings_range])
         }
         self.registrations_frame = {
-            title: frame
-            for title, frame in self._load(self.registration_sheet_id, ["Bezahlung"], head=2)
-        }
-        self.db_frame = {
-            title: frame
-            for title, frame in self._load(self.db_sheet_id, ["Formularantworten"], head=1)
+            "Bezahlung": values_to_frame(values[self.registration_sheet_id][payments_range], head=2)
         }
+        self.schema = RegistrationSchema.compile(list(make_headers_unique(self.headers)))
+
+        # lookups against the registrations and settings workbooks, built once per run
+        self.paid_index = build_paid_index(self.registrations_frame)
+        self.price_table = map_settings_to_price_table(self.settings_frame)
+        self.price_cache = PriceCache()
+        self.timestamps = TimestampParser()
+
+        # inputs of every registration, compared with the previous run
+        if self.state is not None:
+            self.tracker = ChangeTracker(self.price_table, self.state.fingerprints)
+        else:
+            self.tracker = ChangeTracker(self.price_table)
+
+    def _load_db(self) -> List[List[str]]:
+        """Load the Formularantworten rows.
+
+        All rows are read on every run, as any of them may have been edited since the
+        last one. With an ingestion state, the header row is read in the same request
+        as the rows, limited to the form columns A:BD the row digests cover and the
+        columns the mapper reads. If the header row changed, the rows are read as
+        without a state. Sets ``headers`` and ``reusable_registrations`` as a side effect.
+
+        Returns:
+            The raw data rows to map.
+        """
+        if self.state is not None:
+            headers = self.state.headers
+            schema = RegistrationSchema.compile(list(make_headers_unique(headers)))
+            form_columns = range(min(FORM_COLUMN_COUNT, len(headers)))
+            columns = sorted(set(form_columns) | set(schema.columns))
+            records = self._load_db_rows(headers, 1, columns)
+            read = set(columns)
+            if records and records[0] == [h if i in read else "" for i, h in enumerate(headers)]:
+                rows = records[1:]
+                self.headers = headers
+                self.reusable_registrations = {r._id: r for r in self.state.registrations}
+                return rows
+            # the header row changed, fall back to a full read
+
+        if self.projected or self.chunk_rows is not None:
+            header_range = absolute_range_name("Formularantworten", "1:1")
+            records = self.reader.fetch_spreadsheet(self.db_sheet_id, [header_range], cached=False)
+            headers = records[header_range][0] if records[header_range] else []
+            rows = self._load_db_rows(headers, 2) if headers else []
+        else:
+            full_range = absolute_range_name("Formularantworten")
+            records = self.reader.fetch_spreadsheet(self.db_sheet_id, [full_range], cached=False)
+            records = records[full_range]
+            headers = records[0] if records else []
+            rows = records[1:]
+
+        self.headers = headers
+        # stored registrations whose row is unchanged are reused by the mapper
+        self.reusable_registrations = (
+            {r._id: r for r in self.state.registrations} if self.state is not None else {}
+        )
+        return rows
+
+    def _load_db_rows(
+        self, headers: List[str], start_row: int, columns: Optional[List[int]] = None
+    ) -> List[List[str]]:
+        """Read Formularantworten rows, projected and chunked as configured.
+
+        Args:
+            headers: Raw header row of the sheet.
+            start_row: Sheet row number (1-based) of the first row to read.
+            columns: Optional columns to read. Defaults to the columns the mapper reads
+                if ``projected`` is set, and to all of them otherwise.
+
+        Returns:
+            Full-width rows from ``start_row`` on. Columns left out by the projection are empty.
+        """
+        if columns is None and self.projected:
+            columns = RegistrationSchema.compile(list(make_headers_unique(headers))).columns
+        return self.reader.read_rows(
+            self.db_sheet_id,
+            "Formularantworten",
+            width=len(headers),
+            start_row=start_row,
+            columns=columns,
+            chunk_rows=self.chunk_rows,
+        )
 
     def check_sheet_id(self, sheet_id: str) -> None:
         """Check if a Google Sheet with the given ID exists.
@@ -264,7 +627,7 @@ class GDocsRegistrationFactory:
     def _make_headers_unique(self, headers: List[str]) -> Generator[str, None, None]:
         """Ensures that headers are unique by appending a count to duplicate headers.
         
-        Also replaces spaces with underscores in the headers.
+        See ``make_headers_unique``.
 
         Args:
             headers: List of header names.
@@ -272,14 +635,7 @@ class GDocsRegistrationFactory:
         Yields:
             Unique header name with spaces replaced by underscores.
         """
-        seen = dict()
-        for item in headers:
-            if item not in seen:
-                seen[item] = 0
-                yield item.replace(" ", "_")
-            else:
-                seen[item] += 1
-                yield f"{item}{seen[item]}".replace(" ", "_")
+        return make_headers_unique(headers)
 
     def _load(
         self, 
@@ -289,6 +645,8 @@ class GDocsRegistrationFactory:
     ) -> Generator[Tuple[str, pd.DataFrame], None, None]:
         """Load data from specified sheets in a Google Sheets document.
 
+        All sheets are read with a single batch request.
+
         Args:
             sheet_id: The ID of the Google Sheets document.
             needed_sheets: List of sheet titles to load. Defaults to empty list.
@@ -299,30 +657,75 @@ class GDocsRegistrationFactory:
         """
         if needed_sheets is None:
             needed_sheets = []
-            
-        # self.check_sheet_id(sheet_id) # check if the sheet exists # not needed for now (performance)
-        sheets = self.gc.open_by_key(sheet_id)
-        for sheet in sheets.worksheets():
-            if sheet.title in needed_sheets:
-                records = sheet.get_all_values()
-                for i in range(head):
-                    headers = records.pop(0)
-                headers = list(self._make_headers_unique(headers))
-                yield sheet.title, pd.DataFrame(records, columns=headers)
+        if not needed_sheets:
+            return
+
+        ranges = [absolute_range_name(title) for title in needed_sheets]
+        values = self.reader.fetch_spreadsheet(sheet_id, ranges)
+        for title, range_name in zip(needed_sheets, ranges):
+            yield title, values_to_frame(values[range_name], head)
 
     def build_registrations(self) -> List[Registration]:
-        """Converts data from the database, settings, and registrations frames into Registration objects.
+        """Converts data from the database rows, settings, and registrations frames into Registration objects.
         
         Returns:
             List of Registration objects built from the Google Sheets data.
         """
-
         return list(
-            dataframe_to_registration_mapper(
-                self.db_frame, self.settings_frame, self.registrations_frame
+            rows_to_registration_mapper(
+                self.db_rows,
+                self.schema,
+                self.price_table,
+                self.paid_index,
+                0,
+                self.price_cache,
+                self.timestamps,
+                self.tracker,
+                self.reusable_registrations,
             )
         )
 
+    @property
+    def changed_ids(self) -> Set[int]:
+        """IDs of the built registrations that are new, changed or had a mail pending.
+
+        Everything else was fully processed by the previous run with the same inputs,
+        so the mail service and the dumper can skip it.
+        """
+        return self.tracker.changed_ids
+
+    @property
+    def extents(self) -> Dict[str, TableExtent]:
+        """Extents of the tables the previous run wrote to the registrations sheet."""
+        return dict(self.state.extents) if self.state is not None else {}
+
+    def store_state(
+        self,
+        registrations: List[Registration],
+        extents: Optional[Dict[str, TableExtent]] = None,
+    ) -> None:
+        """Persist the registrations and their input fingerprints for the next incremental run.
+
+        Call this after the mail flags of ``registrations`` were written back, so the
+        stored flags match the sheet. Does nothing if no state path is configured.
+
+        Args:
+            registrations: All registrations of this run with their final mail flags.
+            extents: Optional extents of the tables written by this run, see
+                ``GDocsDumper.extents``.
+        """
+        if self.state_path is None:
+            return
+        save_state(
+            self.state_path,
+            IngestionState(
+                headers=list(self.headers),
+                registrations=list(registrations),
+                fingerprints=dict(self.tracker.current),
+                extents=dict(extents or {}),
+            ),
+        )
+
 
 if __name__ == "__main__":
     # factory = LocalFileRegistrationFactory(Path("data/sample_sheets/"))
@@ -0,0 +1,160 @@
+import hashlib
+import os
+import pickle
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Set
+
+from gdocs_4_ski_automation.core.ctypes import Registration
+from gdocs_4_ski_automation.core.price_calculation import PriceTable
+from gdocs_4_ski_automation.core.sheet_writer import TableExtent
+
+# Columns A:BD hold the Google Form answers. BE:BH (price, mail flags, ID) are
+# written back by the dumper and therefore excluded from the fingerprint.
+FORM_COLUMN_COUNT = 56
+
+
+def row_digest(row: Sequence[str]) -> str:
+    """Hashes the form answers of a single row.
+
+    Args:
+        row: Raw cell values of a Formularantworten row as returned by the Sheets API.
+
+    Returns:
+        Hex digest of the form columns of ``row``.
+    """
+    cells = list(row[:FORM_COLUMN_COUNT])
+    # the API drops trailing empty cells, so padding must not change the hash
+    while cells and cells[-1] == "":
+        cells.pop()
+    digest = hashlib.sha1()
+    for cell in cells:
+        digest.update(b"\x1f")
+        digest.update(str(cell).encode("utf-8"))
+    return digest.hexdigest()
+
+
+@dataclass(slots=True, frozen=True)
+class InputFingerprint:
+    """Everything a registration is derived from.
+
+    Attributes:
+        row: Digest of the form answers of its source row, see ``row_digest``.
+        paid: Its status on the Bezahlung sheet.
+        prices: The price table it was priced with.
+    """
+
+    row: str
+    paid: bool
+    prices: PriceTable
+
+
+class ChangeTracker:
+    """Compares the inputs of this run's registrations with the previous run.
+
+    A registration is unchanged if its fingerprint equals the stored one. Unchanged
+    registrations keep their price, and unless a mail is still due for them, they need
+    neither mails nor a write back of their flags.
+    """
+
+    def __init__(
+        self, prices: PriceTable, previous: Optional[Dict[int, InputFingerprint]] = None
+    ) -> None:
+        """Initialize the tracker.
+
+        Args:
+            prices: The price table of this run.
+            previous: Fingerprints stored by the previous run, keyed by registration ID.
+        """
+        self.prices = prices
+        self.previous = previous or {}
+        self.current: Dict[int, InputFingerprint] = {}
+        self.pending: Set[int] = set()
+
+    def observe(self, _id: int, row: str, paid: bool, pending: bool = False) -> bool:
+        """Record the inputs of a registration.
+
+        Args:
+            _id: ID of the registration.
+            row: Digest of its source row, see ``row_digest``.
+            paid: Its status on the Bezahlung sheet.
+            pending: True if a mail is still due according to the mail flags of the sheet.
+
+        Returns:
+            True if the inputs are the same as in the previous run.
+        """
+        fingerprint = InputFingerprint(row=row, paid=paid, prices=self.prices)
+        self.current[_id] = fingerprint
+        if pending:
+            self.pending.add(_id)
+        return self.previous.get(_id) == fingerprint
+
+    @property
+    def changed_ids(self) -> Set[int]:
+        """IDs of the observed registrations that are new, changed or have a mail due."""
+        return {
+            _id
+            for _id, fingerprint in self.current.items()
+            if self.previous.get(_id) != fingerprint or _id in self.pending
+        }
+
+
+@dataclass
+class IngestionState:
+    """Everything the next run reuses from the last one.
+
+    Attributes:
+        headers: Raw header row of the Formularantworten sheet.
+        registrations: Registrations known after the last run, including mail flags.
+        fingerprints: Input fingerprints of ``registrations``, keyed by registration ID.
+        extents: Extents of the tables written to the registrations sheet, keyed by
+            worksheet title.
+    """
+
+    headers: List[str]
+    registrations: List[Registration]
+    fingerprints: Dict[int, InputFingerprint] = field(default_factory=dict)
+    extents: Dict[str, TableExtent] = field(default_factory=dict)
+
+
+def load_state(path: str) -> Optional[IngestionState]:
+    """Loads a previously stored ingestion state.
+
+    Args:
+        path: Path of the state file.
+
+    Returns:
+        The stored state or None if there is no usable state file.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as file:
+            state = pickle.load(file)
+    except (pickle.UnpicklingError, EOFError, AttributeError, TypeError):
+        # unreadable or written for older record types, start over with a full read
+        return None
+    if not isinstance(state, IngestionState):
+        return None
+    if any(getattr(r, "timestamp", None) is None for r in state.registrations):
+        # stored before timestamps were parsed during mapping
+        return None
+    if not hasattr(state, "fingerprints"):
+        # stored before input fingerprints, every registration counts as changed
+        state.fingerprints = {}
+    if not hasattr(state, "extents"):
+        # stored before table extents, the next dump clears to the end of the grids
+        state.extents = {}
+    return state
+
+
+def save_state(path: str, state: IngestionState) -> None:
+    """Atomically stores the ingestion state.
+
+    Args:
+        path: Path of the state file.
+        state: State to store.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as file:
+        pickle.dump(state, file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
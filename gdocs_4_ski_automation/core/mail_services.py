@@ -1,13 +1,25 @@
+import html
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Callable, Dict, List, Union
+from itertools import groupby
+from typing import (Any, Callable, Dict, Iterable, List, Optional, Set, Tuple,
+                    Union)
 
 import jinja2
-import yagmail
 import yaml
-from requests import HTTPError
 
 from gdocs_4_ski_automation.core.ctypes import Registration
+from gdocs_4_ski_automation.core.mail_transports import (BatchMailTransport,
+                                                         MailMessage,
+                                                         SMTPSession,
+                                                         report_send_error)
+from gdocs_4_ski_automation.core.outbox import (PAYMENT_MAIL,
+                                                REGISTRATION_MAIL, SENT,
+                                                MailOutbox, OutboxMessage)
+from gdocs_4_ski_automation.core.rate_limit import TokenBucket
 
 
 def send_mail(
@@ -18,6 +30,10 @@ def send_mail(
 ) -> None:
     """Send an email using yagmail with OAuth2 authentication.
 
+    Opens a new connection per email. Pass an ``SMTPSession`` to ``mail_service``
+    instead to send all mails of a run over one connection.
+    Attachments are taken from the encoded parts shared by the process.
+
     Args:
         to_email: Recipient email address.
         template: Dictionary containing email template with 'subject', 'body', and 'attachments' keys.
@@ -27,58 +43,84 @@ def send_mail(
     Raises:
         Exception: If email sending fails for any reason.
     """
-    # Load email settings from YAML file
-    from_email = mail_settings["from_email"]
+    with SMTPSession(max_messages=1) as session:
+        session(to_email, template, mail_settings, credentials_dir)
 
-    try:
-        if not os.path.exists(credentials_dir):
-            raise FileNotFoundError(f"Credentials file {credentials_dir} not found")
-        yag = yagmail.SMTP(from_email, oauth2_file=credentials_dir)
-        yag.send(
-            subject=template["subject"],
-            contents=template["body"],
-            to=to_email,
-            prettify_html=False,
-        )
-        print(f"Email sent to {to_email}")
-    except Exception as e:
-        if isinstance(e, HTTPError):
-            print(f"HTTP Error: {e.response.status_code} - {e.response.reason}")
-            if e.response.status_code == 401:
-                raise Exception("Authentication failed. Check your OAuth2 credentials.")
-        print(f"Failed to send email to {to_email}: {e}")
 
 
+class TemplateRenderer:
+    """Keeps Jinja2 environments and compiled mail templates for reuse.
 
-def send_mail_dummy(
-    to_email: str, 
-    template: Dict[str, Any], 
-    *args: Any, 
-    **kwargs: Any
-) -> None:
-    """Dummy mail function for testing that prints email content instead of sending.
-
-    Args:
-        to_email: Recipient email address (for debugging output).
-        template: Dictionary containing email template with 'body' key.
-        *args: Additional positional arguments (ignored).
-        **kwargs: Additional keyword arguments (ignored).
+    Build one per run (or per warm process) and pass it to the ``fill_*_template``
+    functions, so every template file is loaded and compiled only once.
     """
-    print("Showing Mail")
-    print(template["body"])
 
+    def __init__(self, bytecode_cache_dir: Optional[Union[str, Path]] = None) -> None:
+        """Initialize the renderer.
 
-def fill_registration_template(registration: Registration, _template_dir, mail_settings):
-    if isinstance(_template_dir, str):
-        _template_dir = Path(_template_dir)
-    
-    # Configure Jinja2 with proper whitespace control
-    env = jinja2.Environment(
-        loader=jinja2.FileSystemLoader(_template_dir.parent),
-        trim_blocks=True,        # Remove newline after block tags
-        lstrip_blocks=True,      # Remove leading spaces/tabs before blocks
-    )
-    body_template = env.get_template(_template_dir.name)
+        Args:
+            bytecode_cache_dir: Optional directory for a Jinja2 bytecode cache, which
+                lets a fresh process skip compiling templates it compiled before.
+        """
+        self.bytecode_cache = None
+        if bytecode_cache_dir is not None:
+            os.makedirs(bytecode_cache_dir, exist_ok=True)
+            self.bytecode_cache = jinja2.FileSystemBytecodeCache(str(bytecode_cache_dir))
+        self._environments: Dict[Tuple[Path, bool], jinja2.Environment] = {}
+        self._templates: Dict[Tuple[Path, bool], jinja2.Template] = {}
+
+    def get_template(
+        self, template_dir: Union[str, Path], whitespace_control: bool = False
+    ) -> jinja2.Template:
+        """Get a compiled template, loading it on first use.
+
+        Args:
+            template_dir: Path to the Jinja2 template file.
+            whitespace_control: If True, block tags do not leave newlines and indentation behind.
+
+        Returns:
+            The compiled template.
+        """
+        template_dir = Path(template_dir)
+        key = (template_dir, whitespace_control)
+        template = self._templates.get(key)
+        if template is None:
+            env_key = (template_dir.parent, whitespace_control)
+            env = self._environments.get(env_key)
+            if env is None:
+                env = jinja2.Environment(
+                    loader=jinja2.FileSystemLoader(template_dir.parent),
+                    trim_blocks=whitespace_control,    # Remove newline after block tags
+                    lstrip_blocks=whitespace_control,  # Remove leading spaces/tabs before blocks
+                    bytecode_cache=self.bytecode_cache,
+                )
+                self._environments[env_key] = env
+            template = self._templates[key] = env.get_template(template_dir.name)
+        return template
+
+
+def fill_registration_template(
+    registration: Registration,
+    _template_dir: Union[str, Path],
+    mail_settings: Dict[str, Any],
+    renderer: Optional[TemplateRenderer] = None,
+    attachments: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """Fill the registration confirmation email template with registration data.
+
+    Args:
+        registration: Registration object containing contact, participant and payment information.
+        _template_dir: Path to the Jinja2 template file for registration confirmation emails.
+        mail_settings: Dictionary containing 'iban', 'bic' and 'contact_email'.
+        renderer: Optional renderer holding compiled templates. A new one is used if not given.
+        attachments: Optional paths of files to attach, e.g. the checklist PDF.
+
+    Returns:
+        Dictionary containing the filled email template with 'subject', 'body', and 'attachments' keys.
+    """
+    if renderer is None:
+        renderer = TemplateRenderer()
+    body_template = renderer.get_template(_template_dir, whitespace_control=True)
     
     _participants = []
     for p in registration.participants:
@@ -105,13 +147,18 @@ def fill_registration_template(registration: Registration, _template_dir, mail_s
     }
 
     html_body_content = body_template.render(template["data"])
-    return {"subject": template["subject"], "body": html_body_content, "attachments": []}
+    return {
+        "subject": template["subject"],
+        "body": html_body_content,
+        "attachments": list(attachments or []),
+    }
 
 
 def fill_paid_template(
     registration: Registration, 
     _template_dir: Union[str, Path], 
-    mail_settings: Dict[str, Any]
+    mail_settings: Dict[str, Any],
+    renderer: Optional[TemplateRenderer] = None,
 ) -> Dict[str, Any]:
     """Fill the payment confirmation email template with registration data.
 
@@ -119,14 +166,14 @@ def fill_paid_template(
         registration: Registration object containing contact and payment information.
         _template_dir: Path to the Jinja2 template file for payment confirmation emails.
         mail_settings: Dictionary containing mail settings (currently unused).
+        renderer: Optional renderer holding compiled templates. A new one is used if not given.
 
     Returns:
         Dictionary containing the filled email template with 'subject', 'body', and 'attachments' keys.
     """
-    if isinstance(_template_dir, str):
-        _template_dir = Path(_template_dir)
-    env = jinja2.Environment(loader=jinja2.FileSystemLoader(_template_dir.parent))
-    body_template = env.get_template(_template_dir.name)
+    if renderer is None:
+        renderer = TemplateRenderer()
+    body_template = renderer.get_template(_template_dir)
     # Render the template with participant data
     data = {
     'first_name': registration.contact.name.first,
@@ -136,19 +183,423 @@ def fill_paid_template(
     return {"subject": "Zahlungseingang", "body": html_body_content, "attachments": []}
 
 
+def _load_mail_settings(
+    paid_template_dir: str,
+    registration_template_dir: str,
+    mail_settings_dir: str,
+    checklist_dir: Optional[str] = None,
+) -> Tuple[Dict[str, Any], List[str]]:
+    """Check the mail files and load the mail settings.
+
+    Args:
+        paid_template_dir: Path to the paid email template HTML file.
+        registration_template_dir: Path to the registration email template HTML file.
+        mail_settings_dir: Path to the mail settings YAML file.
+        checklist_dir: Optional path to the checklist PDF file.
+
+    Returns:
+        The mail settings and the attachments of the registration confirmation emails.
+
+    Raises:
+        FileNotFoundError: If any of the files is not found.
+    """
+    for path in (paid_template_dir, registration_template_dir, mail_settings_dir):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"File {path} not found")
+    if checklist_dir is not None and not os.path.exists(checklist_dir):
+        raise FileNotFoundError(f"File {checklist_dir} not found")
+
+    with open(mail_settings_dir, "r") as file:
+        mail_settings = yaml.safe_load(file)
+    return mail_settings, [checklist_dir] if checklist_dir is not None else []
+
+
+def _render_mail(
+    r: Registration,
+    kind: str,
+    paid_template_dir: str,
+    registration_template_dir: str,
+    mail_settings: Dict[str, Any],
+    renderer: TemplateRenderer,
+    attachments: List[str],
+) -> Dict[str, Any]:
+    """Fill the template of the given kind of email for a registration."""
+    if kind == REGISTRATION_MAIL:
+        return fill_registration_template(
+            r, registration_template_dir, mail_settings, renderer, attachments
+        )
+    return fill_paid_template(r, paid_template_dir, mail_settings, renderer)
+
+
+@dataclass(slots=True, frozen=True)
+class PreviewReport:
+    """Outcome of ``render_previews``.
+
+    Attributes:
+        mails: Number of emails rendered.
+        seconds: Wall time of the rendering.
+        output_dir: Directory the previews were written to.
+    """
+
+    mails: int
+    seconds: float
+    output_dir: str
+
+    @property
+    def mails_per_second(self) -> float:
+        return self.mails / self.seconds if self.seconds > 0 else float("inf")
+
+    def __str__(self) -> str:
+        return (
+            f"Rendered {self.mails} mails in {self.seconds:.2f}s "
+            f"({self.mails_per_second:.1f} mails/s) to {self.output_dir}"
+        )
+
+
+# templates and settings of a preview worker process, set by _init_preview_worker
+_preview_context: Dict[str, Any] = {}
+
+
+def _init_preview_worker(
+    paid_template_dir: str,
+    registration_template_dir: str,
+    mail_settings: Dict[str, Any],
+    attachments: List[str],
+    output_dir: str,
+) -> None:
+    """Prepare a preview worker, so it compiles each template once for all its chunks."""
+    _preview_context.update(
+        paid_template_dir=paid_template_dir,
+        registration_template_dir=registration_template_dir,
+        mail_settings=mail_settings,
+        renderer=TemplateRenderer(),
+        attachments=attachments,
+        output_dir=output_dir,
+    )
+
+
+def _write_previews(registrations: List[Registration]) -> int:
+    """Render the pending emails of registrations to HTML files.
+
+    Each file starts with a comment naming recipient, subject and attachments.
+
+    Returns:
+        Number of emails rendered.
+    """
+    context = _preview_context
+    count = 0
+    for r in registrations:
+        for kind in _due_mails(r):
+            template = _render_mail(
+                r,
+                kind,
+                context["paid_template_dir"],
+                context["registration_template_dir"],
+                context["mail_settings"],
+                context["renderer"],
+                context["attachments"],
+            )
+            names = ", ".join(os.path.basename(path) for path in template["attachments"])
+            header = (
+                f"To: {r.contact.mail}\nSubject: {template['subject']}\nAttachments: {names}"
+            )
+            path = os.path.join(context["output_dir"], f"{r._id}_{kind}.html")
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(f"<!--\n{html.escape(header)}\n-->\n{template['body']}")
+            count += 1
+    return count
+
+
+def render_previews(
+    registrations: List[Registration],
+    paid_template_dir: str,
+    registration_template_dir: str,
+    mail_settings_dir: str,
+    output_dir: str,
+    changed_ids: Optional[Set[int]] = None,
+    workers: Optional[int] = None,
+    checklist_dir: Optional[str] = None,
+    chunksize: int = 100,
+) -> PreviewReport:
+    """Render all pending emails to HTML files for review instead of sending them.
+
+    Every email ``mail_service`` would send is written to ``<output_dir>/<ID>_<kind>.html``.
+    Chunks of registrations are rendered on a process pool. No mail flag is changed.
+
+    Args:
+        registrations: List of Registration objects to process.
+        paid_template_dir: Path to the paid email template HTML file.
+        registration_template_dir: Path to the registration email template HTML file.
+        mail_settings_dir: Path to the mail settings YAML file.
+        output_dir: Directory for the previews. It is created if needed.
+        changed_ids: Optional IDs of the registrations to process.
+        workers: Number of worker processes. Defaults to the number of CPUs; with one
+            worker the emails are rendered in this process.
+        checklist_dir: Optional path to the checklist PDF file attached to the
+            registration confirmation emails.
+        chunksize: Number of registrations a worker renders per task.
+
+    Returns:
+        Number of rendered emails and the time it took.
+
+    Raises:
+        FileNotFoundError: If any of the required template or settings files are not found.
+    """
+    start = time.perf_counter()
+    mail_settings, attachments = _load_mail_settings(
+        paid_template_dir, registration_template_dir, mail_settings_dir, checklist_dir
+    )
+    os.makedirs(output_dir, exist_ok=True)
+    pending = [r for r in registrations if changed_ids is None or r._id in changed_ids]
+    chunks = [pending[i : i + chunksize] for i in range(0, len(pending), chunksize)]
+    context = (paid_template_dir, registration_template_dir, mail_settings, attachments, output_dir)
+
+    workers = min(workers or os.cpu_count() or 1, len(chunks))
+    if workers <= 1:
+        _init_preview_worker(*context)
+        mails = sum(map(_write_previews, chunks))
+    else:
+        with ProcessPoolExecutor(
+            workers, initializer=_init_preview_worker, initargs=context
+        ) as pool:
+            mails = sum(pool.map(_write_previews, chunks))
+    return PreviewReport(mails, time.perf_counter() - start, output_dir)
+
+
+def _send(
+    send_mail_function: Callable,
+    to_email: str,
+    template: Dict[str, Any],
+    mail_settings: Dict[str, Any],
+    credentials_dir: str,
+    rate_limit: Optional[TokenBucket],
+) -> Optional[str]:
+    """Send one email, reporting instead of raising failures.
+
+    Args:
+        send_mail_function: Function to use for sending the email.
+        to_email: Recipient email address.
+        template: Dictionary containing the filled email template.
+        mail_settings: Dictionary containing mail configuration.
+        credentials_dir: Path to the email credentials file.
+        rate_limit: Optional token bucket to take a token from before sending.
+
+    Returns:
+        None if the email was sent, the error message otherwise.
+
+    Raises:
+        Exception: If the OAuth2 authentication failed.
+    """
+    if rate_limit is not None:
+        rate_limit.acquire()
+    try:
+        send_mail_function(to_email, template, mail_settings, credentials_dir)
+    except Exception as e:
+        report_send_error(to_email, e)
+        return str(e) or type(e).__name__
+    return None
+
+
+def _send_batch(
+    transport: BatchMailTransport,
+    messages: List[MailMessage],
+    mail_settings: Dict[str, Any],
+    credentials_dir: str,
+    rate_limit: Optional[TokenBucket],
+) -> List[Optional[str]]:
+    """Send a batch of emails, reporting instead of raising failures.
+
+    Args:
+        transport: Transport to send the batch with.
+        messages: Recipients and filled templates.
+        mail_settings: Dictionary containing mail configuration.
+        credentials_dir: Path to the email credentials file.
+        rate_limit: Optional token bucket to take one token per email from before sending.
+
+    Returns:
+        None for every sent email, the error message for every other one.
+
+    Raises:
+        Exception: If the authentication failed.
+    """
+    if rate_limit is not None:
+        rate_limit.acquire(len(messages))
+    try:
+        errors = transport.send_batch(messages, mail_settings, credentials_dir)
+        if len(errors) != len(messages):
+            # results that cannot be matched would end up on the wrong registrations
+            raise RuntimeError(f"{len(errors)} results for {len(messages)} emails")
+    except Exception as e:
+        report_send_error(f"{len(messages)} recipients", e)
+        return [str(e) or type(e).__name__] * len(messages)
+    for (to_email, _), error in zip(messages, errors):
+        if error is not None:
+            print(f"Failed to send email to {to_email}: {error}")
+    return errors
+
+
+def _deliver_in_batches(
+    transport: BatchMailTransport,
+    groups: List[List[MailMessage]],
+    mail_settings: Dict[str, Any],
+    credentials_dir: str,
+    workers: int,
+    rate_limit: Optional[TokenBucket],
+) -> List[Optional[str]]:
+    """Send groups of emails in batches of at most ``transport.max_batch`` emails.
+
+    A group, i.e. the emails of one registration, is only split if it does not fit
+    into a batch of its own, so its emails keep their order.
+
+    Args:
+        transport: Transport to send the batches with.
+        groups: Recipients and filled templates, grouped by registration.
+        mail_settings: Dictionary containing mail configuration.
+        credentials_dir: Path to the email credentials file.
+        workers: Number of batches sent concurrently.
+        rate_limit: Optional token bucket shared by all workers.
+
+    Returns:
+        None for every sent email, the error message for every other one, in the
+        order of ``groups``.
+
+    Raises:
+        Exception: If the authentication failed.
+    """
+    batches: List[List[MailMessage]] = []
+    batch: List[MailMessage] = []
+    for group in groups:
+        if batch and len(batch) + len(group) > transport.max_batch:
+            batches.append(batch)
+            batch = []
+        batch.extend(group)
+        while len(batch) > transport.max_batch:
+            batches.append(batch[: transport.max_batch])
+            batch = batch[transport.max_batch :]
+    if batch:
+        batches.append(batch)
+
+    def send(messages: List[MailMessage]) -> List[Optional[str]]:
+        return _send_batch(transport, messages, mail_settings, credentials_dir, rate_limit)
+
+    return [error for errors in _run_concurrently(send, batches, workers) for error in errors]
+
+
+def _run_concurrently(
+    function: Callable[[Any], Any], items: Iterable[Any], workers: int
+) -> List[Any]:
+    """Apply ``function`` to all items, on a thread pool if ``workers`` > 1.
+
+    Args:
+        function: Function to apply.
+        items: Items to apply it to.
+        workers: Number of threads.
+
+    Returns:
+        The results in the order of ``items``.
+
+    Raises:
+        Exception: The first error raised by ``function``. Queued items are skipped then.
+    """
+    if workers <= 1:
+        return [function(item) for item in items]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(function, item) for item in items]
+        try:
+            return [future.result() for future in futures]
+        except Exception:
+            pool.shutdown(cancel_futures=True)
+            raise
+
+
+def drain_outbox(
+    outbox: MailOutbox,
+    send_mail_function: Callable,
+    mail_settings: Dict[str, Any],
+    credentials_dir: str,
+    limit: Optional[int] = None,
+    batch_size: int = 50,
+    workers: int = 1,
+    rate_limit: Optional[TokenBucket] = None,
+) -> Set[Tuple[int, str]]:
+    """Deliver pending emails of the outbox in batches.
+
+    The delivery status is committed after every batch, so a run that is cut off
+    only repeats the emails of the batch it was working on.
+
+    Args:
+        outbox: The outbox to drain.
+        send_mail_function: Function to use for sending emails. It must raise if an
+            email was not sent.
+        mail_settings: Dictionary containing mail configuration.
+        credentials_dir: Path to the email credentials file.
+        limit: Optional maximum number of emails to attempt, bounding the work of a run.
+        batch_size: Number of emails per committed batch.
+        workers: Number of registrations whose emails are sent concurrently.
+        rate_limit: Optional token bucket shared by all workers.
+
+    Returns:
+        Keys of the emails delivered by this call.
+
+    Raises:
+        Exception: If the OAuth2 authentication failed.
+    """
+
+    def send(to_email: str, template: Dict[str, Any]) -> Optional[str]:
+        return _send(
+            send_mail_function, to_email, template, mail_settings, credentials_dir, rate_limit
+        )
+
+    def deliver(messages: List[OutboxMessage]) -> List[Optional[str]]:
+        return [send(m.to_email, m.template) for m in messages]
+
+    delivered = set()
+    messages = outbox.pending(limit)
+    for start in range(0, len(messages), batch_size):
+        batch = messages[start : start + batch_size]
+        # the emails of one registration stay in order on one worker
+        groups = [list(group) for _, group in groupby(batch, key=lambda m: m.registration_id)]
+        if isinstance(send_mail_function, BatchMailTransport):
+            errors = _deliver_in_batches(
+                send_mail_function,
+                [[(m.to_email, m.template) for m in group] for group in groups],
+                mail_settings,
+                credentials_dir,
+                workers,
+                rate_limit,
+            )
+        else:
+            results = _run_concurrently(deliver, groups, workers)
+            errors = [error for group_errors in results for error in group_errors]
+        sent = [m.key for m, error in zip(batch, errors) if error is None]
+        outbox.mark_sent(sent)
+        outbox.mark_failed([(m.key, error) for m, error in zip(batch, errors) if error is not None])
+        delivered.update(sent)
+    return delivered
+
+
 def mail_service(
     registrations: List[Registration],
     paid_template_dir: str,
     registration_template_dir: str,
     mail_settings_dir: str,
     credentials_dir: str,
-    send_mail_function: Callable = send_mail_dummy,
+    send_mail_function: Optional[Callable] = None,
+    changed_ids: Optional[Set[int]] = None,
+    renderer: Optional[TemplateRenderer] = None,
+    workers: int = 1,
+    rate_limit: Optional[TokenBucket] = None,
+    outbox: Optional[MailOutbox] = None,
+    drain_limit: Optional[int] = None,
+    checklist_dir: Optional[str] = None,
+    preview_dir: str = "mail_previews",
 ) -> List[Registration]:
     """Process registrations and send appropriate emails to participants.
 
-    This function iterates through registrations and sends registration confirmation
-    emails to contacts who haven't received them yet. Payment confirmation emails
-    are currently commented out.
+    This function sends registration confirmation emails to contacts who haven't
+    received them yet, and payment confirmation emails once a registration is paid.
+    A mail flag is only set if its email was actually sent, so failed emails are
+    retried on the next run.
 
     Args:
         registrations: List of Registration objects to process.
@@ -156,39 +607,141 @@ def mail_service(
         registration_template_dir: Path to the registration email template HTML file.
         mail_settings_dir: Path to the mail settings YAML file.
         credentials_dir: Path to the email credentials file.
-        checklist_dir: Path to the checklist PDF file to attach. Defaults to "data/mails/checklist.pdf".
-        send_mail_function: Function to use for sending emails. Defaults to send_mail_dummy.
+        send_mail_function: Function to use for sending emails. It must raise if an
+            email was not sent. A ``BatchMailTransport`` is given whole batches of
+            emails instead, never splitting the emails of a registration. If not
+            given, the emails are only rendered to ``preview_dir`` by
+            ``render_previews`` and no flag is set.
+        changed_ids: Optional IDs of the registrations to process, e.g. the factory's
+            ``changed_ids``. Other registrations are returned untouched.
+        renderer: Optional renderer to reuse compiled templates across runs of a warm
+            process. A new one is built for this run if not given.
+        workers: Number of registrations processed concurrently. The emails of one
+            registration are always sent in order by the same worker. For a
+            ``BatchMailTransport`` the number of batches sent concurrently.
+        rate_limit: Optional token bucket shared by all workers, e.g. to stay within
+            the sending limits of the mail provider.
+        outbox: Optional durable outbox. Rendered emails are enqueued first and then
+            delivered by ``drain_outbox``. Emails the outbox already delivered in an
+            earlier, interrupted run only get their flag set.
+        drain_limit: Optional maximum number of emails delivered from the outbox in
+            this run. The rest stays queued for the next run.
+        checklist_dir: Optional path to the checklist PDF file attached to the
+            registration confirmation emails.
+        preview_dir: Output directory of the render only mode.
 
     Returns:
         List of Registration objects with updated mail flags.
 
     Raises:
         FileNotFoundError: If any of the required template or settings files are not found.
+        Exception: If the OAuth2 authentication failed. No further emails are sent then.
     """
-    
-    # Check if all files exist
-    if not os.path.exists(paid_template_dir):
-        raise FileNotFoundError(f"File {paid_template_dir} not found")
-    if not os.path.exists(registration_template_dir):
-        raise FileNotFoundError(f"File {registration_template_dir} not found")
-    if not os.path.exists(mail_settings_dir):
-        raise FileNotFoundError(f"File {mail_settings_dir} not found")
+    if send_mail_function is None:
+        report = render_previews(
+            registrations,
+            paid_template_dir,
+            registration_template_dir,
+            mail_settings_dir,
+            preview_dir,
+            changed_ids,
+            checklist_dir=checklist_dir,
+        )
+        print(report)
+        return registrations
 
+    mail_settings, attachments = _load_mail_settings(
+        paid_template_dir, registration_template_dir, mail_settings_dir, checklist_dir
+    )
+    if renderer is None:
+        renderer = TemplateRenderer()
+    # compile both templates before the workers start
+    renderer.get_template(registration_template_dir, whitespace_control=True)
+    renderer.get_template(paid_template_dir)
 
-    with open(mail_settings_dir, "r") as file:
-        mail_settings = yaml.safe_load(file)
-    for r in registrations:
-        if not r.registration_mail_sent:
-            template = fill_registration_template(r, registration_template_dir,mail_settings)
-            send_mail_function(r.contact.mail, template, mail_settings, credentials_dir)
-            r.registration_mail_sent = True
-        if not r.payment_mail_sent and r.payment.payed:
-            template = fill_paid_template(r, paid_template_dir,mail_settings)
-            send_mail_function(r.contact.mail, template, mail_settings, credentials_dir)
-            r.payment_mail_sent = True
+    def render(r: Registration, kind: str) -> Dict[str, Any]:
+        return _render_mail(
+            r,
+            kind,
+            paid_template_dir,
+            registration_template_dir,
+            mail_settings,
+            renderer,
+            attachments,
+        )
+
+    def process(r: Registration) -> None:
+        for kind in _due_mails(r):
+            error = _send(
+                send_mail_function,
+                r.contact.mail,
+                render(r, kind),
+                mail_settings,
+                credentials_dir,
+                rate_limit,
+            )
+            _set_mail_flag(r, kind, error is None)
+
+    pending = [r for r in registrations if changed_ids is None or r._id in changed_ids]
+    if outbox is None and isinstance(send_mail_function, BatchMailTransport):
+        due = [(r, kind) for r in pending for kind in _due_mails(r)]
+        errors = _deliver_in_batches(
+            send_mail_function,
+            [[(r.contact.mail, render(r, kind)) for kind in _due_mails(r)] for r in pending],
+            mail_settings,
+            credentials_dir,
+            workers,
+            rate_limit,
+        )
+        for (r, kind), error in zip(due, errors):
+            _set_mail_flag(r, kind, error is None)
+        return registrations
+    if outbox is None:
+        _run_concurrently(process, pending, workers)
+        return registrations
+
+    statuses = outbox.statuses()
+    for r in pending:
+        for kind in _due_mails(r):
+            status = statuses.get((r._id, kind, r.contact.mail))
+            if status == SENT:
+                _set_mail_flag(r, kind, True)
+            else:
+                # a queued email is rendered again, the registration may have been edited
+                outbox.enqueue(OutboxMessage(r._id, kind, r.contact.mail, render(r, kind)))
+    delivered = drain_outbox(
+        outbox,
+        send_mail_function,
+        mail_settings,
+        credentials_dir,
+        limit=drain_limit,
+        workers=workers,
+        rate_limit=rate_limit,
+    )
+    for r in pending:
+        for kind in _due_mails(r):
+            if (r._id, kind) in delivered:
+                _set_mail_flag(r, kind, True)
     return registrations
 
 
+def _due_mails(r: Registration) -> List[str]:
+    """Get the kinds of emails a registration still has to receive, in sending order."""
+    kinds = []
+    if not r.registration_mail_sent:
+        kinds.append(REGISTRATION_MAIL)
+    if not r.payment_mail_sent and r.payment.payed:
+        kinds.append(PAYMENT_MAIL)
+    return kinds
+
+
+def _set_mail_flag(r: Registration, kind: str, sent: bool) -> None:
+    if kind == REGISTRATION_MAIL:
+        r.registration_mail_sent = sent
+    else:
+        r.payment_mail_sent = sent
+
+
 if __name__ == "__main__":
     from gdocs_4_ski_automation.core.factories import GDocsRegistrationFactory
     from gdocs_4_ski_automation.utils.utils import GoogleAuthenticatorInterface
@@ -210,6 +763,6 @@ if __name__ == "__main__":
         "data/mails/registration.html",
         "data/dependencies/mail_setting.yaml",
         "data/dependencies/client_secret_mail.json",
-        "data/mails/checklist.pdf",
         send_mail,
+        checklist_dir="data/mails/checklist.pdf",
     )
@@ -0,0 +1,457 @@
+import os
+import smtplib
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Protocol, Tuple, runtime_checkable
+
+import requests
+import yagmail
+from requests import HTTPError
+from yagmail.headers import resolve_addresses
+from yagmail.message import prepare_message
+
+from gdocs_4_ski_automation.core.attachments import (SHARED_ATTACHMENTS,
+                                                     AttachmentCache)
+
+# errors after which the connection is considered dead and is opened again
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+
+# recipient and filled template of an email
+MailMessage = Tuple[str, Dict[str, Any]]
+
+
+@runtime_checkable
+class BatchMailTransport(Protocol):
+    """Transport that delivers many emails per request.
+
+    Instances are called like ``send_mail`` for single emails. ``mail_service`` and
+    ``drain_outbox`` hand them whole batches through ``send_batch`` instead.
+    """
+
+    max_batch: int
+
+    def __call__(
+        self,
+        to_email: str,
+        template: Dict[str, Any],
+        mail_settings: Dict[str, Any],
+        credentials_dir: str,
+    ) -> None: ...
+
+    def send_batch(
+        self, messages: List[MailMessage], mail_settings: Dict[str, Any], credentials_dir: str
+    ) -> List[Optional[str]]: ...
+
+
+def connect_gmail(mail_settings: Dict[str, Any], credentials_dir: str) -> yagmail.SMTP:
+    """Build the yagmail client used by ``send_mail``.
+
+    Args:
+        mail_settings: Dictionary containing mail configuration including 'from_email'.
+        credentials_dir: Path to the OAuth2 credentials file.
+
+    Returns:
+        A yagmail client that is not connected yet.
+
+    Raises:
+        FileNotFoundError: If the credentials file does not exist.
+    """
+    if not os.path.exists(credentials_dir):
+        raise FileNotFoundError(f"Credentials file {credentials_dir} not found")
+    return yagmail.SMTP(mail_settings["from_email"], oauth2_file=credentials_dir)
+
+
+def report_send_error(to_email: str, error: Exception) -> None:
+    """Report a failed send, re-raising only authentication failures.
+
+    Args:
+        to_email: Recipient email address.
+        error: The error raised while sending.
+
+    Raises:
+        Exception: If the OAuth2 authentication failed.
+    """
+    if isinstance(error, HTTPError):
+        print(f"HTTP Error: {error.response.status_code} - {error.response.reason}")
+        if error.response.status_code == 401:
+            raise Exception("Authentication failed. Check your OAuth2 credentials.")
+    print(f"Failed to send email to {to_email}: {error}")
+
+
+def compose_message(
+    client: yagmail.SMTP,
+    to_email: str,
+    template: Dict[str, Any],
+    attachments: AttachmentCache = SHARED_ATTACHMENTS,
+) -> Tuple[List[str], str]:
+    """Build the MIME message of an email like ``yagmail.SMTP.prepare_send``.
+
+    Attachments are taken from ``attachments`` instead of being read and encoded
+    again for every message.
+
+    Args:
+        client: The yagmail client the email is sent with.
+        to_email: Recipient email address.
+        template: Dictionary containing email template with 'subject', 'body', and
+            optional 'attachments' keys. 'attachments' holds paths of files to attach.
+        attachments: Cache of encoded attachment parts.
+
+    Returns:
+        The recipients and the serialized message.
+
+    Raises:
+        FileNotFoundError: If an attachment does not exist.
+    """
+    addresses = resolve_addresses(client.user, client.useralias, to_email, None, None)
+    message = prepare_message(
+        client.user,
+        client.useralias,
+        addresses,
+        template["subject"],
+        template["body"],
+        None,
+        None,
+        client.encoding,
+        prettify_html=False,
+    )
+    for path in template.get("attachments", []):
+        message.attach(attachments.get(path))
+    return addresses["recipients"], message.as_string()
+
+
+class SMTPSession:
+    """Sends all mails of a run over one SMTP connection.
+
+    ``yagmail.SMTP.send`` connects, refreshes the OAuth2 token and logs in for every
+    message. The session logs in once, sends the prepared messages on the open
+    connection and only connects again after a dropped connection or once
+    ``max_messages`` were sent on it. Attachments are encoded once and shared by all
+    messages through an ``AttachmentCache``.
+
+    Every thread gets its own connection, so a session can be shared by the workers
+    of a concurrent ``mail_service``. Instances are called like ``send_mail`` and can
+    be passed to ``mail_service`` as ``send_mail_function``. Use them as context
+    manager to close all connections.
+
+    Attributes:
+        connections: Number of connections opened.
+        sent: Number of messages sent.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[Dict[str, Any], str], yagmail.SMTP] = connect_gmail,
+        max_messages: int = 100,
+        max_attempts: int = 2,
+        attachments: AttachmentCache = SHARED_ATTACHMENTS,
+    ) -> None:
+        """Initialize the session. The connection is opened on the first send.
+
+        Args:
+            connect: Builds a yagmail client from the mail settings and credentials path.
+            max_messages: Maximum number of messages per connection.
+            max_attempts: Attempts per message, each on a fresh connection after the first.
+            attachments: Cache of encoded attachment parts. Defaults to the one shared
+                by the process.
+        """
+        self.connect = connect
+        self.max_messages = max_messages
+        self.max_attempts = max_attempts
+        self.attachments = attachments
+        self.connections = 0
+        self.sent = 0
+        # connection and message count of the current thread
+        self._local = threading.local()
+        self._clients: List[yagmail.SMTP] = []
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "SMTPSession":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def _open(self, mail_settings: Dict[str, Any], credentials_dir: str) -> yagmail.SMTP:
+        client = self.connect(mail_settings, credentials_dir)
+        client.login()
+        self._local.client = client
+        self._local.messages = 0
+        with self._lock:
+            self._clients.append(client)
+            self.connections += 1
+        return client
+
+    def _discard(self) -> None:
+        """Close the connection of the current thread."""
+        client = getattr(self._local, "client", None)
+        if client is None:
+            return
+        self._local.client = None
+        with self._lock:
+            self._clients.remove(client)
+        self._quit(client)
+
+    @staticmethod
+    def _quit(client: yagmail.SMTP) -> None:
+        try:
+            client.close()
+        except OSError:
+            pass
+
+    def close(self) -> None:
+        """Close the connections of all threads."""
+        with self._lock:
+            clients, self._clients = self._clients, []
+        for client in clients:
+            self._quit(client)
+        self._local = threading.local()
+
+    def send(
+        self,
+        to_email: str,
+        template: Dict[str, Any],
+        mail_settings: Dict[str, Any],
+        credentials_dir: str,
+    ) -> None:
+        """Send one email on the open connection, reconnecting if needed.
+
+        Args:
+            to_email: Recipient email address.
+            template: Dictionary containing email template with 'subject', 'body', and
+                'attachments' keys.
+            mail_settings: Dictionary containing mail configuration including 'from_email'.
+            credentials_dir: Path to the OAuth2 credentials file.
+
+        Raises:
+            FileNotFoundError: If an attachment does not exist.
+            smtplib.SMTPException: If the server rejects the message.
+            ConnectionError: If the message could not be sent within ``max_attempts``.
+        """
+        for attempt in range(self.max_attempts):
+            try:
+                client = getattr(self._local, "client", None)
+                if client is None or self._local.messages >= self.max_messages:
+                    self._discard()
+                    client = self._open(mail_settings, credentials_dir)
+                recipients, message = compose_message(
+                    client, to_email, template, self.attachments
+                )
+                client.smtp.sendmail(client.user, recipients, message)
+            except CONNECTION_ERRORS as e:
+                # drop the dead connection, the next attempt opens a new one
+                self._discard()
+                if attempt == self.max_attempts - 1:
+                    raise ConnectionError(f"Could not send email to {to_email}: {e}") from e
+                continue
+            self._local.messages += 1
+            with self._lock:
+                self.sent += 1
+            return
+
+    def __call__(
+        self,
+        to_email: str,
+        template: Dict[str, Any],
+        mail_settings: Dict[str, Any],
+        credentials_dir: str,
+    ) -> None:
+        """Send one email like ``send_mail``.
+
+        Args:
+            to_email: Recipient email address.
+            template: Dictionary containing email template with 'subject' and 'body' keys.
+            mail_settings: Dictionary containing mail configuration including 'from_email'.
+            credentials_dir: Path to the OAuth2 credentials file.
+
+        Raises:
+            Exception: If the email could not be sent.
+        """
+        self.send(to_email, template, mail_settings, credentials_dir)
+        print(f"Email sent to {to_email}")
+
+
+class HTTPBatchTransport:
+    """Sends emails through the batch endpoint of an HTTP mail API.
+
+    Up to ``max_batch`` emails are posted in one request as JSON::
+
+        {"from": ..., "messages": [{"to": ..., "subject": ..., "html": ...,
+                                    "attachments": [{"filename": ..., "content_type": ...,
+                                                     "content": <base64>}]}]}
+
+    The API answers with ``{"results": [...]}``, one entry per email in order, holding
+    an ``"error"`` for rejected emails. Throttled (429) and failed (5xx) requests are
+    repeated after the ``Retry-After`` the API asks for, or an exponential backoff.
+    Attachments are encoded once through an ``AttachmentCache``.
+
+    Attributes:
+        requests: Number of HTTP requests made.
+        throttled: Number of requests answered with 429.
+        sent: Number of emails the API accepted.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        api_key: Optional[str] = None,
+        max_batch: int = 100,
+        max_attempts: int = 5,
+        backoff: float = 1.0,
+        timeout: float = 30.0,
+        attachments: AttachmentCache = SHARED_ATTACHMENTS,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        """Initialize the transport.
+
+        Args:
+            url: URL of the batch endpoint.
+            api_key: Bearer token of the API. If not given, it is read from the
+                credentials file passed with the emails.
+            max_batch: Maximum number of emails per request.
+            max_attempts: Attempts per request before its emails count as failed.
+            backoff: Delay before the second attempt if the API gives no
+                ``Retry-After``. Doubles with every further attempt.
+            timeout: Timeout of a request in seconds.
+            attachments: Cache of encoded attachment parts. Defaults to the one shared
+                by the process.
+            sleep: Function used to wait between attempts.
+        """
+        self.url = url
+        self.api_key = api_key
+        self.max_batch = max_batch
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.timeout = timeout
+        self.attachments = attachments
+        self.sleep = sleep
+        self.requests = 0
+        self.throttled = 0
+        self.sent = 0
+        self._session = requests.Session()
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "HTTPBatchTransport":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the pooled HTTP connections."""
+        self._session.close()
+
+    def _api_key(self, credentials_dir: str) -> str:
+        if self.api_key is None:
+            if not os.path.exists(credentials_dir):
+                raise FileNotFoundError(f"Credentials file {credentials_dir} not found")
+            with open(credentials_dir, "r") as file:
+                self.api_key = file.read().strip()
+        return self.api_key
+
+    def _payload(self, template: Dict[str, Any]) -> List[Dict[str, str]]:
+        parts = [self.attachments.get(path) for path in template.get("attachments", [])]
+        return [
+            {
+                "filename": part.get_filename(),
+                "content_type": part.get_content_type(),
+                "content": part.get_payload(),
+            }
+            for part in parts
+        ]
+
+    def _retry_delay(self, response: Optional[requests.Response], attempt: int) -> float:
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        try:
+            return float(retry_after)
+        except (TypeError, ValueError):
+            return self.backoff * 2**attempt
+
+    def send_batch(
+        self, messages: List[MailMessage], mail_settings: Dict[str, Any], credentials_dir: str
+    ) -> List[Optional[str]]:
+        """Send emails in one request.
+
+        Args:
+            messages: Recipients and filled templates, at most ``max_batch``.
+            mail_settings: Dictionary containing mail configuration including 'from_email'.
+            credentials_dir: Path to the file holding the API key.
+
+        Returns:
+            None for every accepted email, the error message for every rejected one.
+
+        Raises:
+            FileNotFoundError: If the credentials file or an attachment does not exist.
+            requests.HTTPError: If the API refuses the request, e.g. with 401.
+            ConnectionError: If the request failed within ``max_attempts``.
+            RuntimeError: If the API answers with a result count other than the number
+                of emails, so the results cannot be matched to the emails.
+        """
+        headers = {"Authorization": f"Bearer {self._api_key(credentials_dir)}"}
+        payload = {
+            "from": mail_settings["from_email"],
+            "messages": [
+                {
+                    "to": to_email,
+                    "subject": template["subject"],
+                    "html": template["body"],
+                    "attachments": self._payload(template),
+                }
+                for to_email, template in messages
+            ],
+        }
+        response: Optional[requests.Response] = None
+        reason = ""
+        for attempt in range(self.max_attempts):
+            if attempt:
+                self.sleep(self._retry_delay(response, attempt - 1))
+            with self._lock:
+                self.requests += 1
+            try:
+                response = self._session.post(
+                    self.url, json=payload, headers=headers, timeout=self.timeout
+                )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                response, reason = None, str(e)
+                continue
+            if response.status_code == 429 or response.status_code >= 500:
+                if response.status_code == 429:
+                    with self._lock:
+                        self.throttled += 1
+                reason = f"{response.status_code} {response.reason}"
+                continue
+            response.raise_for_status()
+            errors = [result.get("error") for result in response.json()["results"]]
+            if len(errors) != len(messages):
+                raise RuntimeError(
+                    f"Mail API answered {len(errors)} results for {len(messages)} emails"
+                )
+            with self._lock:
+                self.sent += errors.count(None)
+            return errors
+        raise ConnectionError(
+            f"Mail API request failed after {self.max_attempts} attempts: {reason}"
+        )
+
+    def __call__(
+        self,
+        to_email: str,
+        template: Dict[str, Any],
+        mail_settings: Dict[str, Any],
+        credentials_dir: str,
+    ) -> None:
+        """Send one email like ``send_mail``.
+
+        Args:
+            to_email: Recipient email address.
+            template: Dictionary containing email template with 'subject', 'body', and
+                'attachments' keys.
+            mail_settings: Dictionary containing mail configuration including 'from_email'.
+            credentials_dir: Path to the file holding the API key.
+
+        Raises:
+            Exception: If the email could not be sent.
+        """
+        (error,) = self.send_batch([(to_email, template)], mail_settings, credentials_dir)
+        if error is not None:
+            raise RuntimeError(f"Mail API rejected email to {to_email}: {error}")
+        print(f"Email sent to {to_email}")
@@ -0,0 +1,252 @@
+import json
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+# mail kinds, part of the idempotency key together with the registration ID
+REGISTRATION_MAIL = "registration"
+PAYMENT_MAIL = "payment"
+
+PENDING = "pending"
+SENT = "sent"
+# given up after too many failed attempts, e.g. for an address that does not exist
+DEAD = "dead"
+
+# delivery attempts of an email before it is marked DEAD
+MAX_ATTEMPTS = 5
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    registration_id INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    to_email TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    body TEXT NOT NULL,
+    attachments TEXT NOT NULL DEFAULT '[]',
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    enqueued_at REAL NOT NULL,
+    sent_at REAL,
+    PRIMARY KEY (registration_id, kind)
+)
+"""
+
+
+@dataclass(slots=True, frozen=True)
+class OutboxMessage:
+    """A rendered email waiting for delivery.
+
+    Attributes:
+        registration_id: ID of the registration the email belongs to.
+        kind: REGISTRATION_MAIL or PAYMENT_MAIL.
+        to_email: Recipient email address.
+        template: Dictionary with the 'subject', 'body' and 'attachments' of the email.
+    """
+
+    registration_id: int
+    kind: str
+    to_email: str
+    template: Dict[str, Any]
+
+    @property
+    def key(self) -> Tuple[int, str]:
+        return self.registration_id, self.kind
+
+
+class MailOutbox:
+    """Crash-safe queue of rendered emails in a local SQLite database.
+
+    Every email is stored under the idempotency key (registration ID, kind), so
+    enqueueing the same email again is a no-op and an email recorded as sent is
+    never delivered twice by the outbox. Registration IDs follow the row order of the
+    form responses, so an email for the same key but a different recipient replaces
+    the stored one. Delivery is at least once: a crash between sending and
+    ``mark_sent`` sends that single email again on the next drain. An email that fails
+    ``max_attempts`` times is marked DEAD and no longer delivered, so permanently
+    failing addresses cannot use up the drain limit of every run. A new recipient for
+    its key makes it pending again.
+    """
+
+    def __init__(self, path: str, max_attempts: int = MAX_ATTEMPTS) -> None:
+        """Open or create the outbox.
+
+        Args:
+            path: Path of the SQLite database file.
+            max_attempts: Failed delivery attempts after which an email is marked DEAD.
+        """
+        self.path = path
+        self.max_attempts = max_attempts
+        self._db = sqlite3.connect(path)
+        with self._db:
+            self._db.execute(_SCHEMA)
+            columns = {row[1] for row in self._db.execute("PRAGMA table_info(outbox)")}
+            if "attachments" not in columns:
+                # outboxes written before emails carried attachments
+                self._db.execute(
+                    "ALTER TABLE outbox ADD COLUMN attachments TEXT NOT NULL DEFAULT '[]'"
+                )
+
+    def __enter__(self) -> "MailOutbox":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the database connection."""
+        self._db.close()
+
+    def enqueue(self, message: OutboxMessage) -> bool:
+        """Store an email for delivery unless its key is already known for the recipient.
+
+        A pending email for the same key and recipient takes the subject, body and
+        attachments of ``message``, so edits of the registration reach emails still
+        waiting for delivery.
+
+        Args:
+            message: The rendered email.
+
+        Returns:
+            True if the email was added or a pending one was changed, False if it was
+            already in the outbox as is.
+        """
+        subject = message.template["subject"]
+        body = message.template["body"]
+        attachments = json.dumps([str(path) for path in message.template.get("attachments", [])])
+        with self._db:
+            cursor = self._db.execute(
+                "INSERT INTO outbox (registration_id, kind, to_email, subject, body, "
+                "attachments, status, enqueued_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (registration_id, kind) DO UPDATE SET "
+                "to_email = excluded.to_email, subject = excluded.subject, "
+                "body = excluded.body, attachments = excluded.attachments, "
+                "status = excluded.status, attempts = 0, last_error = NULL, "
+                "enqueued_at = excluded.enqueued_at, sent_at = NULL, "
+                "rowid = (SELECT MAX(rowid) + 1 FROM outbox) "
+                "WHERE outbox.to_email != excluded.to_email",
+                (
+                    message.registration_id,
+                    message.kind,
+                    message.to_email,
+                    subject,
+                    body,
+                    attachments,
+                    PENDING,
+                    time.time(),
+                ),
+            )
+            if cursor.rowcount == 0:
+                cursor = self._db.execute(
+                    "UPDATE outbox SET subject = ?, body = ?, attachments = ? "
+                    "WHERE registration_id = ? AND kind = ? AND status = ? "
+                    "AND (subject != ? OR body != ? OR attachments != ?)",
+                    (
+                        subject,
+                        body,
+                        attachments,
+                        message.registration_id,
+                        message.kind,
+                        PENDING,
+                        subject,
+                        body,
+                        attachments,
+                    ),
+                )
+        return cursor.rowcount == 1
+
+    def statuses(self) -> Dict[Tuple[int, str, str], str]:
+        """Get the status of all stored emails.
+
+        Returns:
+            Dictionary mapping (registration ID, kind, recipient) to PENDING, SENT or DEAD.
+        """
+        rows = self._db.execute("SELECT registration_id, kind, to_email, status FROM outbox")
+        return {
+            (registration_id, kind, to_email): status
+            for registration_id, kind, to_email, status in rows
+        }
+
+    def pending(self, limit: Optional[int] = None) -> List[OutboxMessage]:
+        """Get emails waiting for delivery, in the order they were enqueued.
+
+        DEAD emails are not returned.
+
+        Args:
+            limit: Maximum number of emails to return.
+
+        Returns:
+            The pending emails.
+        """
+        rows = self._db.execute(
+            "SELECT registration_id, kind, to_email, subject, body, attachments FROM outbox "
+            "WHERE status = ? ORDER BY rowid LIMIT ?",
+            (PENDING, -1 if limit is None else limit),
+        )
+        return [
+            OutboxMessage(
+                registration_id=registration_id,
+                kind=kind,
+                to_email=to_email,
+                template={
+                    "subject": subject,
+                    "body": body,
+                    "attachments": json.loads(attachments),
+                },
+            )
+            for registration_id, kind, to_email, subject, body, attachments in rows
+        ]
+
+    def mark_sent(self, keys: List[Tuple[int, str]]) -> None:
+        """Record emails as delivered.
+
+        Args:
+            keys: Keys of the delivered emails.
+        """
+        now = time.time()
+        with self._db:
+            self._db.executemany(
+                "UPDATE outbox SET status = ?, attempts = attempts + 1, sent_at = ? "
+                "WHERE registration_id = ? AND kind = ?",
+                [(SENT, now, registration_id, kind) for registration_id, kind in keys],
+            )
+
+    def mark_failed(self, failures: List[Tuple[Tuple[int, str], str]]) -> None:
+        """Record failed delivery attempts.
+
+        The emails stay pending until they failed ``max_attempts`` times, then they
+        are marked DEAD.
+
+        Args:
+            failures: Pairs of email key and error message.
+        """
+        with self._db:
+            self._db.executemany(
+                "UPDATE outbox SET attempts = attempts + 1, last_error = ?, "
+                "status = CASE WHEN attempts + 1 >= ? THEN ? ELSE status END "
+                "WHERE registration_id = ? AND kind = ?",
+                [
+                    (error, self.max_attempts, DEAD, registration_id, kind)
+                    for (registration_id, kind), error in failures
+                ],
+            )
+
+    def prune(self, max_age: float) -> int:
+        """Delete emails sent more than ``max_age`` seconds ago.
+
+        Sent emails are kept so that a run whose mail flags never reached the sheet does
+        not send them again. Keep them long enough for the next runs to write the flags.
+
+        Args:
+            max_age: Age in seconds after which sent emails are deleted.
+
+        Returns:
+            Number of deleted emails.
+        """
+        with self._db:
+            cursor = self._db.execute(
+                "DELETE FROM outbox WHERE status = ? AND sent_at < ?",
+                (SENT, time.time() - max_age),
+            )
+        return cursor.rowcount
@@ -1,84 +1,170 @@
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Dict, List, Union
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
 
 from gdocs_4_ski_automation.core.ctypes import Course, Participant
+from gdocs_4_ski_automation.core.timestamps import as_timestamp
+
+# prices are charged in whole cents
+CENT_DIGITS = 2
+
+# integer codes of the courses for the columnar batch pricing
+COURSE_CODES = {
+    Course.ZWEGERL: 0,
+    Course.ZWEGERL_SNOWBOARD: 1,
+    Course.SKI: 2,
+    Course.SNOWBOARD: 3,
+}
+
+
+@dataclass(slots=True, frozen=True)
+class PriceTable:
+    """Prices of the 'Preise' sheet, parsed once per run.
+
+    Attributes:
+        zwergerl: Base price of the Zwergerl courses.
+        child: Base price of the Ski and Snowboard courses for participants under 18.
+        adult: Base price of the Ski and Snowboard courses for participants of 18 or older.
+        early_bird_discount: Discount per participant for early registrations.
+        early_bird_date: Last day that counts as early registration.
+        family_discount: Discount per participant beyond the second, None if not configured.
+    """
+
+    zwergerl: float
+    child: float
+    adult: float
+    early_bird_discount: float
+    early_bird_date: datetime
+    family_discount: Optional[float] = None
+
+    @classmethod
+    def from_prices(cls, prices: Mapping[str, Union[str, float]]) -> "PriceTable":
+        """Parses a price dictionary or the 'Preis' column of the 'Preise' sheet.
+
+        Args:
+            prices: Mapping of price categories to prices, as strings or numbers.
+
+        Returns:
+            The parsed price table.
+
+        Raises:
+            KeyError: If a required category is missing.
+        """
+        return cls(
+            zwergerl=float(prices["Zwergerl"]),
+            child=float(prices["Kind"]),
+            adult=float(prices["Erwachsen"]),
+            early_bird_discount=float(prices["FruehbucherRabatt"]),
+            early_bird_date=datetime.strptime(prices["FruehbucherRabattDatum"], "%d.%m.%Y"),
+            family_discount=(
+                float(prices["FamilienRabatt"]) if "FamilienRabatt" in prices else None
+            ),
+        )
+
+
+Prices = Union[PriceTable, Dict[str, Union[str, float]]]
+
+
+def as_price_table(prices: Prices) -> PriceTable:
+    """Returns ``prices`` as PriceTable, parsing it if given in dictionary form.
+
+    Args:
+        prices: A price table or a dictionary containing price information.
+
+    Returns:
+        The price table.
+    """
+    if isinstance(prices, PriceTable):
+        return prices
+    return PriceTable.from_prices(prices)
 
 
-def map_base_price(participant: Participant, prices: Dict[str, Union[str, float]]) -> float:
+def map_base_price(participant: Participant, prices: Prices) -> float:
     """
     Maps the base price for a participant based on their course and age.
 
     Args:
         participant (Participant): The participant whose price is to be calculated.
-        prices (Dict[str, Union[str, float]]): A dictionary containing price information.
+        prices (Prices): A price table or a dictionary containing price information.
 
     Returns:
         float: The base price for the participant.
     """
+    prices = as_price_table(prices)
     match participant.course:
         case Course.ZWEGERL | Course.ZWEGERL_SNOWBOARD:
-            return float(prices["Zwergerl"])
+            return prices.zwergerl
         case Course.SKI | Course.SNOWBOARD:
             if participant.age < 18:
-                return float(prices["Kind"])
+                return prices.child
             else:
-                return float(prices["Erwachsen"])
+                return prices.adult
 
 
 def apply_early_bird_discount(
-    participants: List[float], prices: Dict[str, Union[str, float]], date: str
+    participants: List[float], prices: Prices, date: Union[str, datetime]
 ) -> List[float]:
     """
     Applies an early bird discount to the list of participant prices if applicable.
 
     Args:
         participants (List[float]): List of participant prices.
-        prices (Dict[str, Union[str, float]]): A dictionary containing price information.
-        date (str): The current date in the format '%d.%m.%Y %H:%M:%S'.
+        prices (Prices): A price table or a dictionary containing price information.
+        date (Union[str, datetime]): The registration time, as datetime or in the
+            format '%d.%m.%Y %H:%M:%S'.
 
     Returns:
         List[float]: The list of participant prices after applying the early bird discount.
     """
-    date_format0 = "%d.%m.%Y %H:%M:%S"
-    date_format1 = "%d.%m.%Y"
-    if datetime.strptime(date, date_format0) <= datetime.strptime(
-        prices["FruehbucherRabattDatum"], date_format1
-    ):
-        return [p - float(prices["FruehbucherRabatt"]) for p in participants]
+    prices = as_price_table(prices)
+    if as_timestamp(date) <= prices.early_bird_date:
+        return [p - prices.early_bird_discount for p in participants]
     return participants
 
 
-def get_family_discount(participant_count: int, prices: Dict[str, Union[str, float]]) -> float:
+def get_family_discount(participant_count: int, prices: Prices) -> float:
     """
     Calculates the family discount based on the number of participants.
 
     Args:
         participant_count (int): The number of participants.
-        prices (Dict[str, Union[str, float]]): A dictionary containing price information.
+        prices (Prices): A price table or a dictionary containing price information.
 
     Returns:
         float: The family discount amount.
+
+    Raises:
+        KeyError: If a family discount applies but 'FamilienRabatt' is not configured.
     """
     if participant_count < 3:
         return 0
-    else:
-        return float(prices["FamilienRabatt"]) * (participant_count - 2)
+    prices = as_price_table(prices)
+    if prices.family_discount is None:
+        raise KeyError("FamilienRabatt")
+    return prices.family_discount * (participant_count - 2)
 
 
 def get_price(
-    participants: List[Participant], date: str, prices: Dict[str, Union[str, float]]
+    participants: List[Participant], date: Union[str, datetime], prices: Prices
 ) -> float:
     """
     Calculates the total price for a list of participants, applying any applicable discounts.
 
     Args:
         participants (List[Participant]): The list of participants.
-        date (str): The current date in the format '%d.%m.%Y %H:%M:%S'.
-        prices (Dict[str, Union[str, float]]): A dictionary containing price information.
+        date (Union[str, datetime]): The registration time, as datetime or in the
+            format '%d.%m.%Y %H:%M:%S'. Pass the parsed ``Registration.timestamp``
+            to avoid parsing per call.
+        prices (Prices): A price table or a dictionary containing price information.
+            Pass a PriceTable built once per run to avoid parsing the prices per call.
 
     Returns:
-        float: The total price after applying all discounts.
+        float: The total price after applying all discounts, rounded to cents.
     """
+    prices = as_price_table(prices)
 
     # Calculate base prices for each participant
     price_list = list(map(lambda p: map_base_price(p, prices), participants))
@@ -89,5 +175,199 @@ def get_price(
     # Calculate family discount
     family_discount = get_family_discount(len(participants), prices)
 
-    # Return the total price after applying all discounts
-    return sum(price_list) - family_discount
+    # Return the total price after applying all discounts, rounded to cents so that
+    # the result does not depend on the order the participants are summed in
+    return round(sum(price_list) - family_discount, CENT_DIGITS)
+
+
+# (course code, charged as child) of a participant, see ``price_class``
+PriceClass = Tuple[int, bool]
+
+
+def price_class(participant: Participant) -> PriceClass:
+    """
+    Reduces a participant to the attributes its base price depends on.
+
+    Args:
+        participant (Participant): The participant to classify.
+
+    Returns:
+        PriceClass: The course code and whether the child price applies. Zwergerl courses
+            have one price for all ages, so their participants are never marked as child.
+    """
+    zwergerl = participant.course in (Course.ZWEGERL, Course.ZWEGERL_SNOWBOARD)
+    return COURSE_CODES[participant.course], not zwergerl and participant.age < 18
+
+
+class PriceCache:
+    """Memoizing front end of ``get_price``.
+
+    Most registrations share a handful of shapes, so prices are cached per signature:
+    the multiset of participant price classes plus the early bird flag. The cache is
+    bounded by LRU eviction and cleared whenever it is used with a different price table.
+
+    Attributes:
+        maxsize: Maximum number of cached signatures.
+        prices: Price table the cached prices were calculated with.
+        hits: Number of prices served from the cache.
+        misses: Number of prices calculated.
+    """
+
+    def __init__(self, maxsize: int = 256) -> None:
+        """Initialize the cache.
+
+        Args:
+            maxsize: Maximum number of cached signatures.
+        """
+        self.maxsize = maxsize
+        self.prices: Optional[PriceTable] = None
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[Tuple[PriceClass, ...], bool], float]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        """Drop all cached prices, keeping the counters."""
+        self._entries.clear()
+
+    def get_price(
+        self, participants: Sequence[Participant], date: Union[str, datetime], prices: Prices
+    ) -> float:
+        """
+        Calculates the total price like ``get_price``, reusing earlier results.
+
+        Participant prices are added in canonical order on a cache miss. Like with
+        ``get_price`` the total is rounded to cents, so both give the same result.
+
+        Args:
+            participants (Sequence[Participant]): The participants of the registration.
+            date (Union[str, datetime]): The registration time, as datetime or in the
+                format '%d.%m.%Y %H:%M:%S'.
+            prices (Prices): A price table or a dictionary containing price information.
+
+        Returns:
+            float: The total price after applying all discounts, rounded to cents.
+
+        Raises:
+            KeyError: If a family discount applies but 'FamilienRabatt' is not configured.
+        """
+        prices = as_price_table(prices)
+        if prices != self.prices:
+            self.clear()
+            self.prices = prices
+
+        classes = tuple(sorted(price_class(p) for p in participants))
+        key = (classes, as_timestamp(date) <= prices.early_bird_date)
+
+        price = self._entries.get(key)
+        if price is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return price
+
+        self.misses += 1
+        price = self._calculate(classes, key[1], prices)
+        self._entries[key] = price
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return price
+
+    @staticmethod
+    def _calculate(classes: Tuple[PriceClass, ...], early: bool, prices: PriceTable) -> float:
+        zwergerl = (COURSE_CODES[Course.ZWEGERL], COURSE_CODES[Course.ZWEGERL_SNOWBOARD])
+        price_list = [
+            prices.zwergerl if code in zwergerl else prices.child if child else prices.adult
+            for code, child in classes
+        ]
+        if early:
+            price_list = [p - prices.early_bird_discount for p in price_list]
+        total = sum(price_list) - get_family_discount(len(classes), prices)
+        return round(total, CENT_DIGITS)
+
+
+def to_price_columns(
+    participant_lists: Sequence[Sequence[Participant]],
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Converts the participants of many registrations to the columns ``get_prices`` takes.
+
+    Args:
+        participant_lists: The participants of each registration.
+
+    Returns:
+        Tuple of course codes and ages of all participants in registration order, and
+        the number of participants per registration.
+    """
+    counts = np.fromiter((len(ps) for ps in participant_lists), dtype=np.int64)
+    courses = np.fromiter(
+        (COURSE_CODES[p.course] for ps in participant_lists for p in ps), dtype=np.int64
+    )
+    ages = np.fromiter((p.age for ps in participant_lists for p in ps), dtype=np.int64)
+    return courses, ages, counts
+
+
+def get_prices(
+    courses: np.ndarray,
+    ages: np.ndarray,
+    dates: Sequence[Union[str, datetime]],
+    counts: np.ndarray,
+    prices: Prices,
+) -> np.ndarray:
+    """
+    Calculates the total price of many registrations at once.
+
+    Gives exactly the results of ``get_price`` for each registration, rounded to
+    cents the same way.
+
+    Args:
+        courses (np.ndarray): Course code (see COURSE_CODES) of every participant,
+            grouped by registration.
+        ages (np.ndarray): Age of every participant, in the same order.
+        dates (Sequence[Union[str, datetime]]): Timestamp of every registration, as datetime
+            or in the format '%d.%m.%Y %H:%M:%S'.
+        counts (np.ndarray): Number of participants of every registration.
+        prices (Prices): A price table or a dictionary containing price information.
+
+    Returns:
+        np.ndarray: The total price of every registration after applying all discounts,
+            rounded to cents.
+
+    Raises:
+        KeyError: If a family discount applies but 'FamilienRabatt' is not configured.
+    """
+    prices = as_price_table(prices)
+    courses = np.asarray(courses)
+    ages = np.asarray(ages)
+    counts = np.asarray(counts, dtype=np.int64)
+
+    # base price per participant
+    zwergerl = (courses == COURSE_CODES[Course.ZWEGERL]) | (
+        courses == COURSE_CODES[Course.ZWEGERL_SNOWBOARD]
+    )
+    base = np.where(zwergerl, prices.zwergerl, np.where(ages < 18, prices.child, prices.adult))
+
+    # early bird discount per registration, broadcast to its participants
+    early = np.fromiter(
+        (as_timestamp(d) <= prices.early_bird_date for d in dates),
+        dtype=bool,
+        count=len(counts),
+    )
+    base = np.where(np.repeat(early, counts), base - prices.early_bird_discount, base)
+
+    # segmented sum: scatter into one row per registration and add the columns from
+    # left to right, which keeps the summation order of get_price
+    slots = np.arange(len(base)) - np.repeat(np.cumsum(counts) - counts, counts)
+    matrix = np.zeros((len(counts), int(counts.max(initial=0))))
+    matrix[np.repeat(np.arange(len(counts)), counts), slots] = base
+    totals = np.zeros(len(counts))
+    for column in matrix.T:
+        totals += column
+
+    # family discount
+    family = counts >= 3
+    if family.any():
+        if prices.family_discount is None:
+            raise KeyError("FamilienRabatt")
+        totals -= np.where(family, prices.family_discount * (counts - 2), 0)
+    return np.round(totals, CENT_DIGITS)
@@ -0,0 +1,84 @@
+import threading
+import time
+from typing import Callable, Optional
+
+
+class TokenBucket:
+    """Thread-safe token bucket limiting how often an operation may run.
+
+    Tokens refill continuously at ``rate`` per second up to ``capacity``. A caller
+    that finds the bucket empty reserves its token anyway and sleeps until the token
+    would have been refilled, so concurrent callers are served in arrival order.
+
+    Attributes:
+        rate: Tokens added per second.
+        capacity: Maximum number of tokens, i.e. the largest burst.
+        waited: Total seconds callers slept in ``acquire``.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        """Initialize a full bucket.
+
+        Args:
+            rate: Tokens added per second.
+            capacity: Maximum number of tokens. Defaults to ``rate``, but at least one.
+            clock: Monotonic clock in seconds.
+            sleep: Function used to wait.
+
+        Raises:
+            ValueError: If ``rate`` is not positive.
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self.clock = clock
+        self.sleep = sleep
+        self.waited = 0.0
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def set_rate(self, rate: float) -> None:
+        """Change the refill rate, keeping the tokens refilled at the old rate so far.
+
+        Args:
+            rate: Tokens added per second from now on.
+
+        Raises:
+            ValueError: If ``rate`` is not positive.
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        with self._lock:
+            self._refill()
+            self.rate = rate
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Take tokens, waiting until they are available.
+
+        Args:
+            tokens: Number of tokens to take.
+
+        Returns:
+            Seconds waited.
+        """
+        with self._lock:
+            self._refill()
+            self._tokens -= tokens
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            self.waited += wait
+        if wait > 0:
+            self.sleep(wait)
+        return wait
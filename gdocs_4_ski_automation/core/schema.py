@@ -0,0 +1,128 @@
+from dataclasses import dataclass
+from typing import Dict, Generator, List, Tuple
+
+PARTICIPANT_SLOTS = 8
+
+
+def make_headers_unique(headers: List[str]) -> Generator[str, None, None]:
+    """Ensures that headers are unique by appending a count to duplicate headers.
+
+    Also replaces spaces with underscores in the headers.
+
+    Args:
+        headers: List of header names.
+
+    Yields:
+        Unique header name with spaces replaced by underscores.
+    """
+    seen = dict()
+    for item in headers:
+        if item not in seen:
+            seen[item] = 0
+            yield item.replace(" ", "_")
+        else:
+            seen[item] += 1
+            yield f"{item}{seen[item]}".replace(" ", "_")
+
+
+@dataclass(frozen=True)
+class ParticipantSlot:
+    """Column positions of one participant block of the registration form."""
+
+    first: int
+    last: int
+    age: int
+    course: int
+    pre_course: int
+    notes: int
+
+
+@dataclass(frozen=True)
+class RegistrationSchema:
+    """Column positions of every field the mapper reads from a Formularantworten row.
+
+    Compiled once from the deduplicated headers, so decoding a row is plain list
+    indexing instead of building column names and indexing a ``pd.Series``.
+    """
+
+    time_stemp: int
+    first: int
+    last: int
+    adress: int
+    mail: int
+    tel: int
+    r_mail_sent: int
+    p_mail_sent: int
+    _id: int
+    participants: Tuple[ParticipantSlot, ...]
+    width: int
+
+    @property
+    def columns(self) -> List[int]:
+        """Sorted positions of all columns the mapper reads."""
+        positions = {
+            self.time_stemp,
+            self.first,
+            self.last,
+            self.adress,
+            self.mail,
+            self.tel,
+            self.r_mail_sent,
+            self.p_mail_sent,
+            self._id,
+        }
+        for slot in self.participants:
+            positions.update(
+                (slot.first, slot.last, slot.age, slot.course, slot.pre_course, slot.notes)
+            )
+        return sorted(positions)
+
+    @classmethod
+    def compile(cls, headers: List[str]) -> "RegistrationSchema":
+        """Builds the schema from deduplicated headers (see ``make_headers_unique``).
+
+        Args:
+            headers: Unique column names of the Formularantworten sheet.
+
+        Returns:
+            The compiled schema.
+
+        Raises:
+            ValueError: If a column the mapper needs is missing.
+        """
+        positions: Dict[str, int] = {name: i for i, name in enumerate(headers)}
+
+        def column(name: str) -> int:
+            if name not in positions:
+                raise ValueError(f"Column {name} not found")
+            return positions[name]
+
+        slots = []
+        for i in range(PARTICIPANT_SLOTS):
+            suffix = i if i > 0 else ""
+            slots.append(
+                ParticipantSlot(
+                    first=column(f"Vorname{i + 1}"),
+                    last=column(f"Nachname{i + 1}"),
+                    age=column(f"Alter_zum_Kursbeginn{suffix}"),
+                    course=column(f"Welcher_Kurs_soll_besucht_werden?_{suffix}"),
+                    pre_course=column(f"Hat_die_Teilnehmer*in_bereits_Kurse_besucht?{suffix}"),
+                    notes=column(
+                        f"Hast_du_noch_ein_Frage_oder_willst_eine_Bemerkung_hinterlassen?{suffix}"
+                    ),
+                )
+            )
+
+        return cls(
+            time_stemp=column("Zeitstempel"),
+            first=column("Vorname"),
+            last=column("Nachname"),
+            adress=column("Wie_lautet_deine_Adresse?_"),
+            mail=column("E-Mail_Adresse"),
+            tel=column("Unter_welcher_Nummer_können_wir_dich_erreichen?"),
+            r_mail_sent=column("r_mail_sent"),
+            p_mail_sent=column("p_mail_sent"),
+            _id=column("ID"),
+            participants=tuple(slots),
+            width=len(headers),
+        )
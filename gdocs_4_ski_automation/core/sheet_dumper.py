@@ -1,14 +1,26 @@
 from datetime import datetime
-from time import sleep
-from typing import Dict, List
+from typing import Any, Dict, List, Optional, Set
 
 import gspread
 import numpy as np
-from gspread.exceptions import APIError
+from gspread.utils import a1_to_rowcol, absolute_range_name
 
 from gdocs_4_ski_automation.core.ctypes import Course, Registration
+from gdocs_4_ski_automation.core.sheet_reader import BatchSheetReader, column_runs
+from gdocs_4_ski_automation.core.sheet_writer import (SheetWrites, TableExtent,
+                                                      WritePlan, block_range,
+                                                      diff_block, diff_table,
+                                                      table_range, table_writes)
 from gdocs_4_ski_automation.utils.utils import GoogleAuthenticatorInterface
 
+# tables of the registrations sheet, written below two header rows, and their widths
+TABLE_ANCHOR = "A3"
+TABLE_WIDTHS = {"Bezahlung": 7, "Mitglied": 7, "Zwergerl": 9, "Kurse": 10}
+# price, registration mail flag, payment mail flag and ID of the form responses in 'db'
+FLAGS_COLUMN = "BE"
+FLAGS_WIDTH = 4
+FLAGS_FIRST_ROW = 2
+
 
 class GDocsDumper:
     def __init__(
@@ -16,6 +28,9 @@ class GDocsDumper:
         registrations: List[Registration],
         sheet_ids: Dict[str, str],
         g_clients: gspread.Client,
+        changed_ids: Optional[Set[int]] = None,
+        diff: bool = False,
+        extents: Optional[Dict[str, TableExtent]] = None,
     ):
         """
         Initialize the GDocsDumper.
@@ -24,59 +39,24 @@ class GDocsDumper:
             registrations: List of registration objects.
             sheet_ids: Dictionary containing sheet IDs.
             g_clients: Google client object.
+            changed_ids: Optional IDs of the registrations whose price or mail flags may
+                have changed. If given, only their rows are written by ``dump_mail_flags``.
+            diff: If True, ``dump_registrations`` reads the registrations sheet once and
+                only writes the cells that differ from it.
+            extents: Optional extents of the tables as written by the previous run,
+                keyed by worksheet title. Updated by ``dump_registrations``.
         """
         self.registrations = registrations
+        self.changed_ids = changed_ids
+        self.diff = diff
+        self.extents = dict(extents or {})
         self.sheet_ids = sheet_ids
         self.gc = g_clients
-        self._sheets_cache: Dict[str, gspread.Spreadsheet] = {}
-
-    def _get_sheet(self, sheet_key: str) -> gspread.Spreadsheet:
-        """
-        Get a cached sheet object to minimize API calls.
 
-        Args:
-            sheet_key: Key from sheet_ids dict ('registrations', 'db', etc.).
-
-        Returns:
-            Cached spreadsheet object.
-        """
-        if sheet_key not in self._sheets_cache:
-            self._sheets_cache[sheet_key] = self.gc.open_by_key(self.sheet_ids[sheet_key])
-        return self._sheets_cache[sheet_key]
-
-    def _batch_update_with_retry(
-        self,
-        worksheet: gspread.Worksheet,
-        updates: List[Dict],
-        max_retries: int = 3,
-    ) -> None:
-        """
-        Execute batch update with exponential backoff retry on rate limits.
-
-        Args:
-            worksheet: Target worksheet.
-            updates: List of update dictionaries with 'range' and 'values'.
-            max_retries: Maximum number of retry attempts.
-        """
-        for attempt in range(max_retries):
-            try:
-                worksheet.batch_update(updates)
-                return
-            except APIError as e:
-                if e.response.status_code == 429 and attempt < max_retries - 1:
-                    wait_time = 2**attempt  # Exponential backoff: 1s, 2s, 4s
-                    sleep(wait_time)
-                    continue
-                raise
-
-    def _dump_overview(self) -> None:
+    def _overview_writes(self) -> SheetWrites:
         """
-        Dump overview data to the 'Übersicht' worksheet using batch update.
-        Reduces from 12 individual API calls to 1 batch call.
+        Build the writes of overview data to the 'Übersicht' worksheet.
         """
-        sheet = self._get_sheet("registrations")
-        worksheet = sheet.worksheet("Übersicht")
-
         all_participants = [p for r in self.registrations for p in r.participants]
         total_participants = len(all_participants)
         total_zw = len(
@@ -103,7 +83,6 @@ class GDocsDumper:
         max_age = max([p.age for p in all_participants]) if all_participants else 0
         last_gcloud_call = datetime.now().strftime("%d.%m.%Y %H:%M:%S")
 
-        # Use batch update instead of individual update_acell calls
         cell_updates = [
             {"range": "B4", "values": [[total_zw]]},
             {"range": "B5", "values": [[total_normal]]},
@@ -118,12 +97,11 @@ class GDocsDumper:
             {"range": "B18", "values": [[max_age]]},
             {"range": "B19", "values": [[last_gcloud_call]]},
         ]
-        self._batch_update_with_retry(worksheet, cell_updates)
+        return SheetWrites("Übersicht", cell_updates)
 
-    def _dump_paid(self) -> None:
+    def _paid_writes(self) -> SheetWrites:
         """
-        Dump paid registration data to the 'Bezahlung' worksheet.
-        Combines two updates into a single batch operation.
+        Build the writes of paid registration data to the 'Bezahlung' worksheet.
         """
         paid_counter = 0
         data = []
@@ -144,23 +122,18 @@ class GDocsDumper:
                 paid_counter += 1
 
         data = sorted(data, key=lambda x: x[0])
-        sheet = self._get_sheet("registrations")
-        worksheet = sheet.worksheet("Bezahlung")
-
-        # Batch update both data and summary
         updates = [
             {"range": "A3", "values": data},
             {"range": "G1", "values": [[f"Insgesamt Bezahlt: {paid_counter}/{len(data)}"]]},
         ]
-        self._batch_update_with_retry(worksheet, updates)
+        return SheetWrites("Bezahlung", updates)
 
-    def _dump_member(self) -> None:
+    def _member_writes(self) -> SheetWrites:
         """
-        Dump member data to the 'Mitglied' worksheet.
-        Uses single update call for all data.
+        Build the writes of member data to the 'Mitglied' worksheet.
         """
         data = []
-        p_names = []
+        p_names = set()
 
         for registration in self.registrations:
             for participant in registration.participants:
@@ -176,17 +149,14 @@ class GDocsDumper:
                             registration.contact.tel,
                         ]
                     )
-                    p_names.append(participant.name)
+                    p_names.add(participant.name)
 
         data = sorted(data, key=lambda x: (x[0], x[1]))
-        sheet = self._get_sheet("registrations")
-        worksheet = sheet.worksheet("Mitglied")
-        worksheet.update("A3", data)
+        return SheetWrites("Mitglied", [{"range": "A3", "values": data}])
 
-    def _dump_zwergerl(self) -> None:
+    def _zwergerl_writes(self) -> SheetWrites:
         """
-        Dump Zwergerl course data to the 'Zwergerl' worksheet.
-        Combines clear, data update, and count into batch operation.
+        Build the writes of Zwergerl course data to the 'Zwergerl' worksheet.
         """
         data = []
 
@@ -207,21 +177,15 @@ class GDocsDumper:
                         ]
                     )
 
-        sheet = self._get_sheet("registrations")
-        worksheet = sheet.worksheet("Zwergerl")
-
-        # Clear and update in batch
-        worksheet.batch_clear(["A3:I1000"])
         updates = [
             {"range": "A3", "values": data},
             {"range": "G1", "values": [[len(data)]]},
         ]
-        self._batch_update_with_retry(worksheet, updates)
+        return SheetWrites("Zwergerl", updates)
 
-    def _dump_normal(self) -> None:
+    def _normal_writes(self) -> SheetWrites:
         """
-        Dump normal course data to the 'Kurse' worksheet.
-        Combines clear, data update, and count into batch operation.
+        Build the writes of normal course data to the 'Kurse' worksheet.
         """
         data = []
 
@@ -243,82 +207,180 @@ class GDocsDumper:
                         ]
                     )
 
-        sheet = self._get_sheet("registrations")
-        worksheet = sheet.worksheet("Kurse")
-
-        # Clear and update in batch
-        worksheet.batch_clear(["A3:J1000"])
         updates = [
             {"range": "A3", "values": data},
             {"range": "G1", "values": [[len(data)]]},
         ]
-        self._batch_update_with_retry(worksheet, updates)
+        return SheetWrites("Kurse", updates)
 
-    def dump_mail_flags(self) -> None:
+    def _flag_row(self, registration: Registration) -> List[Any]:
         """
-        Dump mail flags to the 'Formularantworten' worksheet in the 'db' sheet.
-        Reduces from 3N+2 individual API calls to 2 batch calls.
+        Get the price, mail flags and ID of a registration as written to columns BE:BH.
         """
-        sheet = self._get_sheet("db")
-        worksheet = sheet.worksheet("Formularantworten")
-
-        # First update: registration IDs
-        registration_id = [[str(r._id)] for r in self.registrations]
-        worksheet.update("BH2", registration_id)
-
-        # Get all values once
-        cell_values = worksheet.get_all_values()
-        ids = list(zip(*cell_values))[-1][1:]
-        id_mapping = {
-            _id: {
-                "r_cell": f"BF{int(_id) + 1}",
-                "p_cell": f"BG{int(_id) + 1}",
-                "price_cell": f"BE{int(_id) + 1}",
-            }
-            for _id in ids
+        return [
+            registration.payment.amount,
+            "TRUE" if registration.registration_mail_sent else "FALSE",
+            "TRUE" if registration.payment_mail_sent else "FALSE",
+            str(registration._id),
+        ]
+
+    def _mail_flag_writes(self) -> SheetWrites:
+        """
+        Build the writes of prices, mail flags and IDs to the 'Formularantworten' worksheet.
+
+        The ID of a registration is its position among the form responses, so its row
+        is ``_id + 1`` below the header and nothing needs to be read first. Without
+        ``changed_ids`` all rows are written as one block from row 2 on. Otherwise only
+        the rows of ``changed_ids`` are written, one range per run of consecutive rows.
+        Rows without a registration inside a range are sent as null, which the API
+        leaves untouched.
+        """
+        rows = {
+            r._id + 1: self._flag_row(r)
+            for r in self.registrations
+            if self.changed_ids is None or r._id in self.changed_ids
         }
+        if not rows:
+            return SheetWrites("Formularantworten")
+        if self.changed_ids is None:
+            runs = [(FLAGS_FIRST_ROW, max(rows))]
+        else:
+            runs = column_runs(list(rows))  # contiguous runs of row numbers
+        updates = [
+            {
+                "range": block_range(f"{FLAGS_COLUMN}{first}", last - first + 1, FLAGS_WIDTH),
+                "values": [rows.get(row, [None] * FLAGS_WIDTH) for row in range(first, last + 1)],
+            }
+            for first, last in runs
+        ]
+        return SheetWrites("Formularantworten", updates)
 
-        # Prepare batch updates for all flags
-        updates = []
-        for registration in self.registrations:
-            p_mail_sent = "TRUE" if registration.payment_mail_sent else "FALSE"
-            r_mail_sent = "TRUE" if registration.registration_mail_sent else "FALSE"
+    def dump_mail_flags(self) -> None:
+        """
+        Dump prices, mail flags and IDs to the 'Formularantworten' worksheet in the 'db'
+        sheet with a single batch update and without reading the worksheet.
+        """
+        plan = WritePlan(self.gc, self.sheet_ids["db"])
+        plan.add(self._mail_flag_writes())
+        plan.flush()
 
-            updates.extend(
-                [
-                    {
-                        "range": id_mapping[str(registration._id)]["r_cell"],
-                        "values": [[r_mail_sent]],
-                    },
-                    {
-                        "range": id_mapping[str(registration._id)]["p_cell"],
-                        "values": [[p_mail_sent]],
-                    },
-                    {
-                        "range": id_mapping[str(registration._id)]["price_cell"],
-                        "values": [[registration.payment.amount]],
-                    },
-                ]
-            )
+    def _diff_writes(self, sheet_id: str, writes: List[SheetWrites]) -> List[SheetWrites]:
+        """
+        Reduce writes to the cells that differ from what the sheet currently holds.
+
+        The current values of all written ranges are read in one request. Tables are
+        compared row by row, so only runs of changed rows are written and rows past
+        the new end of a table are cleared. Other ranges are only written if any of
+        their cells changed.
 
-        # Single batch update for all mail flags
-        self._batch_update_with_retry(worksheet, updates)
+        Args:
+            sheet_id: The ID of the Google Sheets document the writes are for.
+            writes: Full writes of the worksheets.
+
+        Returns:
+            The reduced writes.
+        """
+        ranges = {}
+        for w in writes:
+            for u in w.updates:
+                if w.title in TABLE_WIDTHS and u["range"] == TABLE_ANCHOR:
+                    cells = table_range(TABLE_ANCHOR, TABLE_WIDTHS[w.title])
+                else:
+                    width = max((len(row) for row in u["values"]), default=1)
+                    cells = block_range(u["range"], max(len(u["values"]), 1), width)
+                ranges[(w.title, u["range"])] = absolute_range_name(w.title, cells)
+        current = BatchSheetReader(self.gc).fetch_values(sheet_id, list(ranges.values()))
+
+        reduced = []
+        for w in writes:
+            changes = SheetWrites(w.title)
+            for u in w.updates:
+                old = current[ranges[(w.title, u["range"])]]
+                if w.title in TABLE_WIDTHS and u["range"] == TABLE_ANCHOR:
+                    updates, clears = diff_table(
+                        TABLE_ANCHOR, TABLE_WIDTHS[w.title], old, u["values"]
+                    )
+                    changes.updates.extend(updates)
+                    changes.clears.extend(clears)
+                elif (update := diff_block(u["range"], old, u["values"])) is not None:
+                    changes.updates.append(update)
+            reduced.append(changes)
+        return reduced
+
+    def _sized_writes(self, writes: List[SheetWrites]) -> List[SheetWrites]:
+        """
+        Replace the tables of full writes by writes sized to the previous extents.
+
+        Rows of a longer previous table are blanked in the same update as the new rows.
+        A table without a known extent is cleared below its new rows down to the end of
+        the grid.
+
+        Args:
+            writes: Full writes of the worksheets.
+
+        Returns:
+            The writes with the stale rows of the tables removed.
+        """
+        sized = []
+        for w in writes:
+            changes = SheetWrites(w.title, clears=list(w.clears))
+            for u in w.updates:
+                if w.title in TABLE_WIDTHS and u["range"] == TABLE_ANCHOR:
+                    previous = self.extents.get(w.title)
+                    updates, clears = table_writes(
+                        TABLE_ANCHOR,
+                        TABLE_WIDTHS[w.title],
+                        u["values"],
+                        previous.rows if previous is not None else None,
+                    )
+                    changes.updates.extend(updates)
+                    changes.clears.extend(clears)
+                else:
+                    changes.updates.append(u)
+            sized.append(changes)
+        return sized
 
     def dump_registrations(self) -> None:
         """
         Dump all registration data to the respective worksheets.
-        Adds small delays between operations to respect API rate limits.
+        The writes to all tabs of the registrations sheet are sent together in one
+        batch clear and one batch update request. In diff mode they are preceded by
+        one read and only contain the changed cells. Grids too small for a table are
+        grown first, which needs a metadata request unless the grid size is known from
+        the previous extents. Those sizes are only trusted until a write hits the grid
+        limits; then the grids are checked, grown and the writes repeated.
         """
-        self._dump_overview()
-        sleep(0.3)  # Brief pause to respect rate limits
-        self._dump_paid()
-        sleep(0.3)
-        self._dump_member()
-        sleep(0.3)
-        self._dump_zwergerl()
-        sleep(0.3)
-        self._dump_normal()
-        sleep(0.3)
+        writes = [
+            self._overview_writes(),
+            self._paid_writes(),
+            self._member_writes(),
+            self._zwergerl_writes(),
+            self._normal_writes(),
+        ]
+        table_rows = {
+            w.title: len(u["values"])
+            for w in writes
+            for u in w.updates
+            if w.title in TABLE_WIDTHS and u["range"] == TABLE_ANCHOR
+        }
+        sheet_id = self.sheet_ids["registrations"]
+        writes = self._diff_writes(sheet_id, writes) if self.diff else self._sized_writes(writes)
+        plan = WritePlan(self.gc, sheet_id)
+        for w in writes:
+            plan.add(w)
+        first_row = a1_to_rowcol(TABLE_ANCHOR)[0]
+        for title, rows in table_rows.items():
+            previous = self.extents.get(title)
+            if previous is None:
+                plan.ensure_rows(title, first_row + rows - 1)
+            else:
+                # stale rows of the previous table are blanked, so they must fit as well
+                last_row = first_row + max(rows, previous.rows) - 1
+                plan.ensure_rows(title, last_row, previous.grid_rows)
+        plan.flush()
+        self.extents = {
+            title: TableExtent(rows, plan.grid_rows[title]) for title, rows in table_rows.items()
+        }
         self.dump_mail_flags()
 
 
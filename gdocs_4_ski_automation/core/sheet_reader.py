@@ -0,0 +1,302 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time
+from pathlib import Path
+from typing import (AbstractSet, Any, Dict, List, Optional, Sequence, Tuple,
+                    Union)
+
+import gspread
+import openpyxl
+from gspread.utils import absolute_range_name, fill_gaps, rowcol_to_a1
+
+from gdocs_4_ski_automation.core.snapshot_cache import SnapshotCache
+
+
+def column_letter(index: int) -> str:
+    """Converts a 0-based column index to its A1 letter, e.g. 0 -> A, 59 -> BH."""
+    return rowcol_to_a1(1, index + 1)[:-1]
+
+
+def column_runs(columns: Sequence[int]) -> List[Tuple[int, int]]:
+    """Groups column indices into contiguous runs.
+
+    Args:
+        columns: 0-based column indices, in any order.
+
+    Returns:
+        List of inclusive (first, last) index pairs, sorted by position.
+    """
+    runs: List[Tuple[int, int]] = []
+    for column in sorted(set(columns)):
+        if runs and runs[-1][1] == column - 1:
+            runs[-1] = (runs[-1][0], column)
+        else:
+            runs.append((column, column))
+    return runs
+
+
+class BatchSheetReader:
+    """Reads many ranges from many spreadsheets with as few round trips as possible.
+
+    All ranges of one spreadsheet go into a single ``values:batchGet`` request and
+    the requests for different spreadsheets run concurrently on a thread pool. The
+    spreadsheets are addressed by ID only, so no metadata request is needed.
+    """
+
+    def __init__(
+        self,
+        g_client: gspread.Client,
+        max_workers: int = 3,
+        cache: Optional[SnapshotCache] = None,
+    ) -> None:
+        """Initialize the reader.
+
+        Args:
+            g_client: The Google client used to interact with the Google Sheets API.
+            max_workers: Maximum number of spreadsheets fetched at the same time.
+            cache: Optional snapshot cache serving whole worksheets that did not change.
+        """
+        self.gc = g_client
+        self.max_workers = max_workers
+        self.cache = cache
+
+    def fetch(
+        self, ranges: Dict[str, List[str]], cached: Union[bool, AbstractSet[str]] = True
+    ) -> Dict[str, Dict[str, List[List[str]]]]:
+        """Fetch the values of all given ranges.
+
+        Args:
+            ranges: Dictionary mapping spreadsheet IDs to A1 ranges to read from them.
+            cached: Whether whole-worksheet ranges may be served from the snapshot cache,
+                either for all spreadsheets or only for the given spreadsheet IDs.
+
+        Returns:
+            Dictionary mapping spreadsheet IDs to a dictionary of range name to values.
+            Rows are padded to a rectangle like ``get_all_values()`` does.
+        """
+        def is_cached(sheet_id: str) -> bool:
+            return cached if isinstance(cached, bool) else sheet_id in cached
+
+        if len(ranges) <= 1:
+            return {
+                sheet_id: self.fetch_spreadsheet(sheet_id, names, is_cached(sheet_id))
+                for sheet_id, names in ranges.items()
+            }
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(ranges))) as pool:
+            futures = {
+                sheet_id: pool.submit(self.fetch_spreadsheet, sheet_id, names, is_cached(sheet_id))
+                for sheet_id, names in ranges.items()
+            }
+            return {sheet_id: future.result() for sheet_id, future in futures.items()}
+
+    def fetch_spreadsheet(
+        self, sheet_id: str, ranges: List[str], cached: bool = True
+    ) -> Dict[str, List[List[str]]]:
+        """Fetch several ranges of one spreadsheet in a single request.
+
+        With a snapshot cache, the revision of the spreadsheet is probed first and
+        whole-worksheet ranges (a bare title like ``'Preise'``) with a snapshot of
+        that revision are not downloaded again.
+
+        Args:
+            sheet_id: The ID of the Google Sheets document.
+            ranges: A1 ranges to read.
+            cached: Whether whole-worksheet ranges may be served from the snapshot cache.
+
+        Returns:
+            Dictionary mapping each requested range name to its values.
+        """
+        if self.cache is None or not cached:
+            return self._batch_get(sheet_id, ranges)
+
+        worksheets = {name: name.strip("'") for name in ranges if "!" not in name}
+        revision, snapshots = self.cache.lookup(sheet_id, list(worksheets.values()))
+        missing = [name for name in ranges if worksheets.get(name) not in snapshots]
+        values = self._batch_get(sheet_id, missing) if missing else {}
+        self.cache.update(
+            sheet_id,
+            revision,
+            {worksheets[name]: values[name] for name in missing if name in worksheets},
+        )
+        for name, title in worksheets.items():
+            if title in snapshots:
+                values[name] = snapshots[title]
+        return values
+
+    def fetch_values(
+        self,
+        sheet_id: str,
+        ranges: List[str],
+        value_render_option: str = "UNFORMATTED_VALUE",
+    ) -> Dict[str, List[List[Any]]]:
+        """Fetch several ranges of one spreadsheet in a single request, bypassing the cache.
+
+        Unlike the other reads, values come back unformatted by default, i.e. numbers
+        and booleans as such, so they can be compared with values about to be written.
+
+        Args:
+            sheet_id: The ID of the Google Sheets document.
+            ranges: A1 ranges to read.
+            value_render_option: How the API renders the values.
+
+        Returns:
+            Dictionary mapping each requested range name to its values.
+        """
+        return self._batch_get(sheet_id, ranges, {"valueRenderOption": value_render_option})
+
+    def _batch_get(
+        self, sheet_id: str, ranges: List[str], params: Optional[Dict[str, str]] = None
+    ) -> Dict[str, List[List[str]]]:
+        """Fetch several ranges of one spreadsheet with a single ``values:batchGet``."""
+        response = self.gc.http_client.values_batch_get(sheet_id, list(ranges), params)
+        value_ranges = response.get("valueRanges", [])
+        # the API answers in request order, but with normalized range names
+        return {
+            name: self._rectangular(value_range.get("values", []))
+            for name, value_range in zip(ranges, value_ranges)
+        }
+
+    def read_rows(
+        self,
+        sheet_id: str,
+        sheet_title: str,
+        width: int,
+        start_row: int = 2,
+        columns: Optional[Sequence[int]] = None,
+        chunk_rows: Optional[int] = None,
+    ) -> List[List[str]]:
+        """Read the rows of a worksheet, optionally projected to some columns and in chunks.
+
+        Only the given columns are requested, one range per contiguous run of columns,
+        all in the same batch request. Rows come back at full ``width`` with the
+        columns that were not requested left empty, so column positions stay valid.
+        With ``chunk_rows``, the rows are read ``chunk_rows`` at a time, which bounds the
+        size of each response. As the API drops trailing empty rows of every range, a
+        short chunk does not mark the end of the sheet: the first request also reads
+        column A, and the chunks run up to its last non-empty row.
+
+        Args:
+            sheet_id: The ID of the Google Sheets document.
+            sheet_title: Title of the worksheet to read.
+            width: Number of columns of the returned rows.
+            start_row: Sheet row number (1-based) of the first row to read.
+            columns: 0-based indices of the columns to read. Defaults to all of them.
+            chunk_rows: Maximum number of rows per request. Defaults to a single request.
+
+        Returns:
+            The rows from ``start_row`` to the last non-empty row of the worksheet, or
+            with ``chunk_rows`` to the last row with a value in column A.
+        """
+        runs = column_runs(columns) if columns is not None else [(0, width - 1)]
+        rows: List[List[str]] = []
+        first_row = start_row
+        end_row: Optional[int] = None
+        while True:
+            last_row = first_row + chunk_rows - 1 if chunk_rows is not None else ""
+            ranges = [
+                absolute_range_name(
+                    sheet_title,
+                    f"{column_letter(first)}{first_row}:{column_letter(last)}{last_row}",
+                )
+                for first, last in runs
+            ]
+            sizing = chunk_rows is not None and end_row is None
+            if sizing:
+                ranges.append(absolute_range_name(sheet_title, f"A{start_row}:A"))
+            response = self.gc.http_client.values_batch_get(sheet_id, ranges)
+            value_ranges = response.get("valueRanges", [])
+            if sizing:
+                end_row = start_row + len(value_ranges[-1].get("values", [])) - 1
+                value_ranges = value_ranges[:-1]
+            chunk = self._assemble(value_ranges, runs, width)
+            if chunk_rows is None:
+                return chunk
+            # keep row positions when the API trimmed empty rows at the end of the chunk
+            chunk += [[""] * width for _ in range(chunk_rows - len(chunk))]
+            rows.extend(chunk)
+            first_row += chunk_rows
+            if first_row > end_row:
+                return rows[: end_row - start_row + 1]
+
+    @staticmethod
+    def _assemble(
+        value_ranges: List[Dict], runs: List[Tuple[int, int]], width: int
+    ) -> List[List[str]]:
+        """Stitch the values of column runs back into full-width rows."""
+        parts = [value_range.get("values", []) for value_range in value_ranges]
+        height = max((len(part) for part in parts), default=0)
+        rows = [[""] * width for _ in range(height)]
+        for (first, _), part in zip(runs, parts):
+            for row, values in zip(rows, part):
+                row[first : first + len(values)] = values
+        return rows
+
+    @staticmethod
+    def _rectangular(values: List[List[str]]) -> List[List[str]]:
+        """Pad rows to the same length, as the API drops trailing empty cells."""
+        if not values:
+            return []
+        return fill_gaps(values)
+
+
+def format_cell(value: Any) -> str:
+    """Formats an xlsx cell value the way the Sheets API returns formatted values.
+
+    Dates without a time of day are formatted as ``%d.%m.%Y``, all other datetimes as
+    ``%d.%m.%Y %H:%M:%S`` like the Google Forms Zeitstempel.
+
+    Args:
+        value: Cell value as returned by openpyxl.
+
+    Returns:
+        The cell value as string.
+    """
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, datetime):
+        if value.time() == time(0):
+            return value.strftime("%d.%m.%Y")
+        return value.strftime("%d.%m.%Y %H:%M:%S")
+    return str(value)
+
+
+def read_workbook_values(
+    path: Union[str, Path], sheet_titles: List[str]
+) -> Dict[str, List[List[str]]]:
+    """Read worksheets of a local xlsx file like ``get_all_values()`` reads a Google Sheet.
+
+    The workbook is streamed in openpyxl's read-only mode, so memory stays flat
+    for large exports.
+
+    Args:
+        path: Path to the xlsx file.
+        sheet_titles: Titles of the worksheets to read.
+
+    Returns:
+        Dictionary mapping each sheet title to its values, as strings padded to a
+        rectangle, without trailing empty rows.
+
+    Raises:
+        KeyError: If a worksheet is missing.
+    """
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        values = {}
+        for title in sheet_titles:
+            rows = []
+            for row in workbook[title].iter_rows(values_only=True):
+                cells = [format_cell(value) for value in row]
+                while cells and cells[-1] == "":
+                    cells.pop()
+                rows.append(cells)
+            while rows and not rows[-1]:
+                rows.pop()
+            values[title] = fill_gaps(rows) if rows else []
+        return values
+    finally:
+        workbook.close()
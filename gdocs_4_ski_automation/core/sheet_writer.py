@@ -0,0 +1,324 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import gspread
+from gspread.exceptions import APIError
+from gspread.utils import a1_to_rowcol, absolute_range_name, rowcol_to_a1
+
+
+@dataclass
+class SheetWrites:
+    """Clears and value updates for one worksheet.
+
+    Attributes:
+        title: Title of the worksheet.
+        updates: Dictionaries with an A1 'range' relative to the worksheet and 'values'.
+        clears: A1 ranges relative to the worksheet to clear before the updates.
+    """
+
+    title: str
+    updates: List[Dict[str, Any]] = field(default_factory=list)
+    clears: List[str] = field(default_factory=list)
+
+
+@dataclass
+class TableExtent:
+    """Size of a table as last written to a worksheet.
+
+    Attributes:
+        rows: Number of rows of the table below its anchor.
+        grid_rows: Number of rows of the worksheet grid at the time.
+    """
+
+    rows: int
+    grid_rows: int
+
+
+def block_range(anchor: str, rows: int, columns: int) -> str:
+    """Get the A1 range of a block of cells.
+
+    Args:
+        anchor: A1 notation of the top left cell, e.g. 'A3'.
+        rows: Number of rows of the block, at least one.
+        columns: Number of columns of the block, at least one.
+
+    Returns:
+        The A1 range, e.g. 'A3:G10'.
+    """
+    row, column = a1_to_rowcol(anchor)
+    return f"{anchor}:{rowcol_to_a1(row + rows - 1, column + columns - 1)}"
+
+
+def table_range(anchor: str, width: int) -> str:
+    """Get the open-ended A1 range of a table down to the last row of the worksheet.
+
+    Args:
+        anchor: A1 notation of the top left cell, e.g. 'A3'.
+        width: Number of columns of the table.
+
+    Returns:
+        The A1 range, e.g. 'A3:G'.
+    """
+    row, column = a1_to_rowcol(anchor)
+    return f"{anchor}:{rowcol_to_a1(row, column + width - 1).rstrip('0123456789')}"
+
+
+def cells_equal(old: Any, new: Any) -> bool:
+    """Compare a cell read unformatted from a worksheet with a value to be written.
+
+    Numbers compare by value, so 100 equals 100.0, but booleans only equal booleans.
+    """
+    if isinstance(old, bool) or isinstance(new, bool):
+        return isinstance(old, bool) and isinstance(new, bool) and old == new
+    return old == new
+
+
+def _pad(row: Sequence[Any], width: int) -> List[Any]:
+    return list(row) + [""] * (width - len(row))
+
+
+def diff_block(
+    anchor: str, old: List[List[Any]], new: List[List[Any]]
+) -> Optional[Dict[str, Any]]:
+    """Get the update of a fixed block of cells, or None if it would change nothing.
+
+    Args:
+        anchor: A1 notation of the top left cell of the block.
+        old: Current values of the block, as read.
+        new: Values to write.
+
+    Returns:
+        The update of the whole block or None.
+    """
+    width = max((len(row) for row in new), default=0)
+    rows = [_pad(old[i], width) if i < len(old) else [""] * width for i in range(len(new))]
+    for before, after in zip(rows, new):
+        if not all(cells_equal(a, b) for a, b in zip(before, _pad(after, width))):
+            return {"range": anchor, "values": new}
+    return None
+
+
+def diff_table(
+    anchor: str, width: int, old: List[List[Any]], new: List[List[Any]]
+) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """Get the minimal writes turning the rows of a table into new rows.
+
+    Rows are compared by position. Consecutive changed rows form a run, which is
+    written as one range spanning the changed columns of the run. Rows beyond the
+    new end of the table are cleared in one range.
+
+    Args:
+        anchor: A1 notation of the top left cell of the table.
+        width: Number of columns of the table.
+        old: Current rows of the table, as read.
+        new: Rows to write.
+
+    Returns:
+        The updates and the A1 ranges to clear.
+    """
+    top, left = a1_to_rowcol(anchor)
+    runs: List[List[int]] = []  # [first row, last row, first column, last column]
+    for i, row in enumerate(new):
+        before = _pad(old[i], width) if i < len(old) else [""] * width
+        after = _pad(row, width)
+        changed = [c for c in range(width) if not cells_equal(before[c], after[c])]
+        if not changed:
+            continue
+        if runs and runs[-1][1] == i - 1:
+            run = runs[-1]
+            run[1], run[2], run[3] = i, min(run[2], changed[0]), max(run[3], changed[-1])
+        else:
+            runs.append([i, i, changed[0], changed[-1]])
+
+    updates = [
+        {
+            "range": rowcol_to_a1(top + first, left + first_column),
+            "values": [
+                _pad(new[i], width)[first_column : last_column + 1] for i in range(first, last + 1)
+            ],
+        }
+        for first, last, first_column, last_column in runs
+    ]
+    clears = []
+    if len(old) > len(new):
+        start = rowcol_to_a1(top + len(new), left)
+        clears.append(block_range(start, len(old) - len(new), width))
+    return updates, clears
+
+
+def table_writes(
+    anchor: str, width: int, rows: List[List[Any]], previous_rows: Optional[int] = None
+) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """Get the writes replacing a table with new rows.
+
+    If the number of rows previously written is known, the rows of a longer previous
+    table are blanked in the same update as the new rows, so nothing needs clearing.
+    Otherwise everything below the new rows is cleared down to the end of the grid.
+
+    Args:
+        anchor: A1 notation of the top left cell of the table.
+        width: Number of columns of the table.
+        rows: Rows to write.
+        previous_rows: Number of rows of the table written before, if known.
+
+    Returns:
+        The updates and the A1 ranges to clear.
+    """
+    values = [_pad(row, width) for row in rows]
+    clears = []
+    if previous_rows is None:
+        top, left = a1_to_rowcol(anchor)
+        clears.append(table_range(rowcol_to_a1(top + len(rows), left), width))
+    else:
+        values.extend([""] * width for _ in range(previous_rows - len(rows)))
+    updates = [{"range": anchor, "values": values}] if values else []
+    return updates, clears
+
+
+# fields of the spreadsheet metadata needed to grow worksheet grids
+GRID_FIELDS = "sheets.properties(sheetId,title,gridProperties.rowCount)"
+
+
+def exceeds_grid_limits(error: APIError) -> bool:
+    """Checks if the API refused a request because a range lies outside the worksheet grid.
+
+    Args:
+        error: Error raised by the request.
+
+    Returns:
+        True if the grid is too small for the request, False otherwise.
+    """
+    return error.code == 400 and "exceeds grid limits" in str(error.error.get("message", ""))
+
+
+class WritePlan:
+    """Collects the writes to one spreadsheet and sends them in as few requests as possible.
+
+    All clears go into a single ``values:batchClear`` request and all value updates
+    into a single ``values:batchUpdate`` request that follows it, so a flush costs at
+    most two round trips regardless of the number of worksheets and ranges. The
+    spreadsheet is addressed by ID only, so no metadata request is needed unless a
+    worksheet grid may have to grow. Pacing and retries are left to the client, see
+    ``ScheduledHTTPClient``.
+
+    Attributes:
+        grid_rows: Number of grid rows of the worksheets passed to ``ensure_rows``,
+            known after the flush.
+    """
+
+    def __init__(self, g_client: gspread.Client, sheet_id: str) -> None:
+        """Initialize an empty plan.
+
+        Args:
+            g_client: The Google client used to interact with the Google Sheets API.
+            sheet_id: The ID of the Google Sheets document to write to.
+        """
+        self.gc = g_client
+        self.sheet_id = sheet_id
+        self.clears: List[str] = []
+        self.updates: List[Dict[str, Any]] = []
+        self.needed_rows: Dict[str, int] = {}
+        self.grid_hints: Dict[str, int] = {}
+        self.grid_rows: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.clears) + len(self.updates)
+
+    def add(self, writes: SheetWrites) -> None:
+        """Add the writes of a worksheet to the plan.
+
+        Args:
+            writes: Clears and updates of the worksheet.
+        """
+        self.clears.extend(absolute_range_name(writes.title, cells) for cells in writes.clears)
+        self.updates.extend(
+            {"range": absolute_range_name(writes.title, u["range"]), "values": u["values"]}
+            for u in writes.updates
+        )
+
+    def ensure_rows(self, title: str, rows: int, grid_rows: Optional[int] = None) -> None:
+        """Make sure the grid of a worksheet has enough rows before the writes are sent.
+
+        Args:
+            title: Title of the worksheet.
+            rows: Number of rows the grid needs at least.
+            grid_rows: Grid size known from an earlier write. Only a hint, as rows may
+                have been deleted since: if it is large enough, the grid is not checked
+                up front but only once a write hits its limits.
+        """
+        self.needed_rows[title] = max(rows, self.needed_rows.get(title, 0))
+        if grid_rows is not None:
+            self.grid_hints[title] = grid_rows
+        else:
+            self.grid_hints.pop(title, None)
+
+    def _grow(self) -> int:
+        """Append rows to the grids too small for ``needed_rows``.
+
+        Returns:
+            Number of requests made.
+        """
+        http_client = self.gc.http_client
+        metadata = http_client.fetch_sheet_metadata(self.sheet_id, params={"fields": GRID_FIELDS})
+        appends = []
+        for sheet in metadata["sheets"]:
+            properties = sheet["properties"]
+            title = properties["title"]
+            if title not in self.needed_rows:
+                continue
+            rows = properties["gridProperties"]["rowCount"]
+            if rows < self.needed_rows[title]:
+                appends.append(
+                    {
+                        "appendDimension": {
+                            "sheetId": properties["sheetId"],
+                            "dimension": "ROWS",
+                            "length": self.needed_rows[title] - rows,
+                        }
+                    }
+                )
+                rows = self.needed_rows[title]
+            self.grid_rows[title] = rows
+        if appends:
+            http_client.batch_update(self.sheet_id, {"requests": appends})
+        return 1 + bool(appends)
+
+    def flush(self) -> int:
+        """Grow grids where needed, send all clears, then all updates, and empty the plan.
+
+        If a write hits the limits of a grid that was assumed to be large enough, the
+        grids are checked and grown and the writes are sent once more.
+
+        Returns:
+            Number of requests made.
+
+        Raises:
+            APIError: If a request fails.
+        """
+        requests = 0
+        http_client = self.gc.http_client
+        checked = any(
+            self.grid_hints.get(title, 0) < rows for title, rows in self.needed_rows.items()
+        )
+        if checked:
+            requests += self._grow()
+        else:
+            self.grid_rows.update({title: self.grid_hints[title] for title in self.needed_rows})
+        while True:
+            try:
+                if self.clears:
+                    requests += 1
+                    http_client.values_batch_clear(self.sheet_id, body={"ranges": self.clears})
+                if self.updates:
+                    requests += 1
+                    body = {"valueInputOption": "RAW", "data": self.updates}
+                    http_client.values_batch_update(self.sheet_id, body=body)
+                break
+            except APIError as e:
+                if checked or not self.needed_rows or not exceeds_grid_limits(e):
+                    raise
+                # the grid shrank since the hints were taken, e.g. rows were deleted
+                checked = True
+                requests += self._grow()
+        self.clears, self.updates, self.needed_rows, self.grid_hints = [], [], {}, {}
+        return requests
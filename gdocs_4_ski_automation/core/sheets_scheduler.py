@@ -0,0 +1,222 @@
+import random
+import threading
+import time
+from http import HTTPStatus
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+import requests
+from google.auth.credentials import Credentials
+from gspread.exceptions import APIError
+from gspread.http_client import HTTPClient
+
+from gdocs_4_ski_automation.core.rate_limit import TokenBucket
+
+T = TypeVar("T")
+
+# default Sheets API quota of one user, e.g. a service account, per minute
+READS_PER_MINUTE = 60
+WRITES_PER_MINUTE = 60
+
+
+class SheetsScheduler:
+    """Paces and retries the requests to the Google Sheets and Drive APIs.
+
+    Reads (GET requests) and writes take tokens from separate buckets, one per quota.
+    A bucket holds ``burst`` tokens and refills so that no 60 second window exceeds
+    the quota. A throttled request halves the rate of its bucket, down to a tenth of
+    the quota, and every successful request gives back a tenth of the quota rate.
+    Throttled (429, or 403 for usage limits on Drive), timed out (408) and failed (5xx)
+    requests and connection errors are repeated after the ``Retry-After`` the API asks
+    for, or a jittered exponential backoff. The scheduler is safe to share between
+    threads.
+
+    Attributes:
+        reads: Token bucket of the read requests.
+        writes: Token bucket of the write requests.
+        requests: Number of requests made, including repeated ones.
+        retries: Number of requests repeated.
+        throttled: Number of requests answered as over quota.
+        failed: Number of requests that timed out, failed or got no answer.
+        backed_off: Total seconds slept between attempts. The time spent waiting for
+            tokens is ``reads.waited + writes.waited``.
+    """
+
+    def __init__(
+        self,
+        reads_per_minute: float = READS_PER_MINUTE,
+        writes_per_minute: float = WRITES_PER_MINUTE,
+        burst: float = 10,
+        max_attempts: int = 5,
+        backoff: float = 1.0,
+        max_backoff: float = 64.0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+        jitter: Callable[[], float] = random.random,
+    ) -> None:
+        """Initialize the scheduler with full buckets.
+
+        Args:
+            reads_per_minute: Quota of read requests per minute.
+            writes_per_minute: Quota of write requests per minute.
+            burst: Requests of a kind that may be sent at once, less than the quotas.
+            max_attempts: Attempts per request before its error is raised.
+            backoff: Delay before the second attempt if the API gives no
+                ``Retry-After``. Doubles with every further attempt.
+            max_backoff: Upper bound of the backoff delay in seconds.
+            clock: Monotonic clock in seconds.
+            sleep: Function used to wait.
+            jitter: Function returning a random number in [0, 1).
+
+        Raises:
+            ValueError: If ``burst`` is not less than both quotas.
+        """
+        if burst >= min(reads_per_minute, writes_per_minute):
+            raise ValueError("burst must be less than the quotas")
+        self._quota_rates = {
+            "read": (reads_per_minute - burst) / 60,
+            "write": (writes_per_minute - burst) / 60,
+        }
+        self.reads = TokenBucket(self._quota_rates["read"], burst, clock, sleep)
+        self.writes = TokenBucket(self._quota_rates["write"], burst, clock, sleep)
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.sleep = sleep
+        self.jitter = jitter
+        self.requests = 0
+        self.retries = 0
+        self.throttled = 0
+        self.failed = 0
+        self.backed_off = 0.0
+        self._lock = threading.Lock()
+
+    def counters(self) -> Dict[str, float]:
+        """Get the counters of the scheduler, e.g. to log them after a run."""
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "retries": self.retries,
+                "throttled": self.throttled,
+                "failed": self.failed,
+                "backed_off": self.backed_off,
+                "limited": self.reads.waited + self.writes.waited,
+            }
+
+    def _adapt(self, kind: str, throttled: bool) -> None:
+        bucket = self.reads if kind == "read" else self.writes
+        quota_rate = self._quota_rates[kind]
+        with self._lock:
+            if throttled:
+                rate = max(bucket.rate / 2, quota_rate / 10)
+            else:
+                rate = min(bucket.rate + quota_rate / 10, quota_rate)
+            if rate != bucket.rate:
+                bucket.set_rate(rate)
+
+    def _delay(self, response: Optional[requests.Response], attempt: int) -> float:
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        try:
+            return max(float(retry_after), 0.0)
+        except (TypeError, ValueError):
+            delay = min(self.backoff * 2**attempt, self.max_backoff)
+            return delay / 2 + self.jitter() * delay / 2
+
+    @staticmethod
+    def _over_quota(error: APIError) -> bool:
+        status = error.response.status_code
+        if status == HTTPStatus.TOO_MANY_REQUESTS:
+            return True
+        # the Drive API reports exceeded quotas as 403
+        errors = error.error.get("errors") or [{}]
+        return status == HTTPStatus.FORBIDDEN and errors[0].get("domain") == "usageLimits"
+
+    def run(self, request: Callable[[], T], write: bool = False) -> T:
+        """Run a request once a token is available, repeating it on transient errors.
+
+        Args:
+            request: Function sending the request.
+            write: True if the request counts against the write quota.
+
+        Returns:
+            The result of the request.
+
+        Raises:
+            APIError: If the API refuses the request, or keeps failing for
+                ``max_attempts`` attempts.
+            requests.ConnectionError: If the API cannot be reached within
+                ``max_attempts`` attempts.
+            requests.Timeout: If the last attempt times out.
+        """
+        kind = "write" if write else "read"
+        bucket = self.writes if write else self.reads
+        attempt = 0
+        while True:
+            bucket.acquire()
+            with self._lock:
+                self.requests += 1
+            last = attempt == self.max_attempts - 1
+            try:
+                result = request()
+            except APIError as e:
+                status = e.response.status_code
+                over_quota = self._over_quota(e)
+                transient = status == HTTPStatus.REQUEST_TIMEOUT or status >= 500
+                if over_quota:
+                    with self._lock:
+                        self.throttled += 1
+                    self._adapt(kind, throttled=True)
+                elif transient:
+                    with self._lock:
+                        self.failed += 1
+                if last or not (over_quota or transient):
+                    raise
+                delay = self._delay(e.response, attempt)
+            except (requests.ConnectionError, requests.Timeout):
+                with self._lock:
+                    self.failed += 1
+                if last:
+                    raise
+                delay = self._delay(None, attempt)
+            else:
+                self._adapt(kind, throttled=False)
+                return result
+            with self._lock:
+                self.retries += 1
+                self.backed_off += delay
+            self.sleep(delay)
+            attempt += 1
+
+
+class ScheduledHTTPClient(HTTPClient):
+    """gspread HTTP client sending every request through a ``SheetsScheduler``.
+
+    Pass the class as ``http_client`` to ``gspread.authorize``. All clients of a
+    process share ``SHEETS_SCHEDULER`` unless given another scheduler, as the quota
+    belongs to the user and not to the client.
+    """
+
+    def __init__(
+        self,
+        auth: Optional[Credentials],
+        session: Optional[requests.Session] = None,
+        scheduler: Optional[SheetsScheduler] = None,
+    ) -> None:
+        """Initialize the client.
+
+        Args:
+            auth: Credentials used to authenticate requests, None if ``session`` is given.
+            session: Optional session sending the requests.
+            scheduler: Scheduler of the requests. Defaults to ``SHEETS_SCHEDULER``.
+        """
+        super().__init__(auth, session)
+        self.scheduler = scheduler if scheduler is not None else SHEETS_SCHEDULER
+
+    def request(self, method: str, endpoint: str, *args: Any, **kwargs: Any) -> requests.Response:
+        send = super().request
+        return self.scheduler.run(
+            lambda: send(method, endpoint, *args, **kwargs), write=method.lower() != "get"
+        )
+
+
+# one scheduler per process, so concurrent reads and writes share the quota
+SHEETS_SCHEDULER = SheetsScheduler()
@@ -0,0 +1,171 @@
+import hashlib
+import os
+import pickle
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Protocol, Tuple
+
+import gspread
+
+
+@dataclass
+class Snapshot:
+    """Values of a worksheet together with the spreadsheet revision they were read at."""
+
+    revision: str
+    values: List[List[str]]
+
+
+class SnapshotStore(Protocol):
+    """Storage for worksheet snapshots, keyed by spreadsheet ID and worksheet title."""
+
+    def get(self, sheet_id: str, title: str) -> Optional[Snapshot]: ...
+
+    def put(self, sheet_id: str, title: str, snapshot: Snapshot) -> None: ...
+
+
+class RevisionProbe(Protocol):
+    """Cheap check of the current revision of a spreadsheet."""
+
+    def revision(self, sheet_id: str) -> str: ...
+
+
+class PickleSnapshotStore:
+    """Stores each worksheet snapshot as a pickle file in a local directory."""
+
+    def __init__(self, directory: str) -> None:
+        """Initialize the store.
+
+        Args:
+            directory: Directory for the snapshot files. Created if missing.
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, sheet_id: str, title: str) -> str:
+        digest = hashlib.sha1(f"{sheet_id}\x1f{title}".encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{digest}.pkl")
+
+    def get(self, sheet_id: str, title: str) -> Optional[Snapshot]:
+        """Load a snapshot.
+
+        Args:
+            sheet_id: The ID of the Google Sheets document.
+            title: Title of the worksheet.
+
+        Returns:
+            The stored snapshot or None if there is no usable one.
+        """
+        path = self._path(sheet_id, title)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as file:
+                snapshot = pickle.load(file)
+        except (pickle.UnpicklingError, EOFError, AttributeError):
+            return None
+        return snapshot if isinstance(snapshot, Snapshot) else None
+
+    def put(self, sheet_id: str, title: str, snapshot: Snapshot) -> None:
+        """Atomically store a snapshot.
+
+        Args:
+            sheet_id: The ID of the Google Sheets document.
+            title: Title of the worksheet.
+            snapshot: Snapshot to store.
+        """
+        path = self._path(sheet_id, title)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as file:
+            pickle.dump(snapshot, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+
+class InMemorySnapshotStore:
+    """Keeps snapshots in a dict, for tests and for reuse within a warm process."""
+
+    def __init__(self) -> None:
+        self.snapshots: Dict[Tuple[str, str], Snapshot] = {}
+
+    def get(self, sheet_id: str, title: str) -> Optional[Snapshot]:
+        return self.snapshots.get((sheet_id, title))
+
+    def put(self, sheet_id: str, title: str, snapshot: Snapshot) -> None:
+        self.snapshots[(sheet_id, title)] = snapshot
+
+
+class DriveRevisionProbe:
+    """Uses the Drive ``modifiedTime`` of a spreadsheet as its revision.
+
+    The Drive API has no per-worksheet revision, so any write to a spreadsheet
+    invalidates the snapshots of all its worksheets.
+    """
+
+    def __init__(self, g_client: gspread.Client) -> None:
+        """Initialize the probe.
+
+        Args:
+            g_client: The Google client used to interact with the Google APIs.
+        """
+        self.gc = g_client
+
+    def revision(self, sheet_id: str) -> str:
+        """Get the current revision of a spreadsheet.
+
+        Args:
+            sheet_id: The ID of the Google Sheets document.
+
+        Returns:
+            The modifiedTime of the spreadsheet.
+        """
+        return self.gc.get_file_drive_metadata(sheet_id)["modifiedTime"]
+
+
+class SnapshotCache:
+    """Serves worksheet values from snapshots as long as the spreadsheet did not change."""
+
+    def __init__(self, store: SnapshotStore, probe: RevisionProbe) -> None:
+        """Initialize the cache.
+
+        Args:
+            store: Where snapshots are kept.
+            probe: How the current revision of a spreadsheet is determined.
+        """
+        self.store = store
+        self.probe = probe
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(
+        self, sheet_id: str, titles: List[str]
+    ) -> Tuple[str, Dict[str, List[List[str]]]]:
+        """Probe the revision of a spreadsheet and return the snapshots still valid.
+
+        Args:
+            sheet_id: The ID of the Google Sheets document.
+            titles: Titles of the worksheets wanted.
+
+        Returns:
+            Tuple of the current revision and the cached values per worksheet title.
+            Titles without a valid snapshot are missing from the dictionary.
+        """
+        revision = self.probe.revision(sheet_id)
+        values = {}
+        for title in titles:
+            snapshot = self.store.get(sheet_id, title)
+            if snapshot is not None and snapshot.revision == revision:
+                values[title] = snapshot.values
+                self.hits += 1
+            else:
+                self.misses += 1
+        return revision, values
+
+    def update(self, sheet_id: str, revision: str, values: Dict[str, List[List[str]]]) -> None:
+        """Store freshly read worksheets.
+
+        Args:
+            sheet_id: The ID of the Google Sheets document.
+            revision: Revision probed before the values were read.
+            values: Values per worksheet title.
+        """
+        for title, worksheet_values in values.items():
+            self.store.put(sheet_id, title, Snapshot(revision=revision, values=worksheet_values))
@@ -0,0 +1,87 @@
+from datetime import datetime
+from typing import Dict, Union
+
+# format of the Zeitstempel column written by Google Forms
+TIME_STEMP_FORMAT = "%d.%m.%Y %H:%M:%S"
+
+
+def parse_time_stemp(value: str) -> datetime:
+    """Parses a Zeitstempel like '01.10.2024 08:05:03'.
+
+    Values in exactly this layout are rearranged to ISO 8601 and parsed by
+    ``datetime.fromisoformat``, which is much faster than ``strptime``. Anything
+    else, e.g. days or hours without leading zero, goes through ``strptime``.
+
+    Args:
+        value: The timestamp in the format '%d.%m.%Y %H:%M:%S'.
+
+    Returns:
+        The parsed timestamp.
+
+    Raises:
+        ValueError: If ``value`` is not a valid timestamp in that format.
+    """
+    if (
+        len(value) == 19
+        and value[2] == "."
+        and value[5] == "."
+        and value[10] == " "
+        and value[13] == ":"
+        and value[16] == ":"
+        and value[0:2].isdigit()
+        and value[3:5].isdigit()
+        and value[6:10].isdigit()
+    ):
+        try:
+            return datetime.fromisoformat(f"{value[6:10]}-{value[3:5]}-{value[0:2]}T{value[11:]}")
+        except ValueError:
+            pass
+    return datetime.strptime(value, TIME_STEMP_FORMAT)
+
+
+def as_timestamp(value: Union[str, datetime]) -> datetime:
+    """Returns ``value`` as datetime, parsing it if given as Zeitstempel string.
+
+    Args:
+        value: A datetime or a timestamp in the format '%d.%m.%Y %H:%M:%S'.
+
+    Returns:
+        The timestamp.
+    """
+    if isinstance(value, datetime):
+        return value
+    return parse_time_stemp(value)
+
+
+class TimestampParser:
+    """Parses Zeitstempel values and remembers every distinct value for the run.
+
+    Attributes:
+        hits: Number of values served from the cache.
+        misses: Number of values parsed.
+    """
+
+    def __init__(self) -> None:
+        self._parsed: Dict[str, datetime] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __call__(self, value: str) -> datetime:
+        """Parse a timestamp, reusing the result for repeated values.
+
+        Args:
+            value: The timestamp in the format '%d.%m.%Y %H:%M:%S'.
+
+        Returns:
+            The parsed timestamp.
+
+        Raises:
+            ValueError: If ``value`` is not a valid timestamp in that format.
+        """
+        parsed = self._parsed.get(value)
+        if parsed is not None:
+            self.hits += 1
+            return parsed
+        self.misses += 1
+        parsed = self._parsed[value] = parse_time_stemp(value)
+        return parsed
@@ -1,10 +1,26 @@
-from typing import Dict
+from contextlib import nullcontext
+from typing import Dict, Optional
 
 from gdocs_4_ski_automation.core.factories import GDocsRegistrationFactory
-from gdocs_4_ski_automation.core.mail_services import mail_service, send_mail
+from gdocs_4_ski_automation.core.mail_services import mail_service
+from gdocs_4_ski_automation.core.mail_transports import (HTTPBatchTransport,
+                                                         SMTPSession)
+from gdocs_4_ski_automation.core.outbox import MailOutbox
+from gdocs_4_ski_automation.core.rate_limit import TokenBucket
 from gdocs_4_ski_automation.core.sheet_dumper import GDocsDumper
+from gdocs_4_ski_automation.core.snapshot_cache import (DriveRevisionProbe,
+                                                        PickleSnapshotStore,
+                                                        SnapshotCache)
 from gdocs_4_ski_automation.utils.utils import GoogleAuthenticatorInterface
 
+# concurrent SMTP connections and sending rate, well below the Gmail limits
+MAIL_WORKERS = 4
+MAIL_RATE_PER_SECOND = 5.0
+# emails delivered from the outbox per run, the rest waits for the next trigger
+MAIL_DRAIN_LIMIT = 200
+# sent emails are remembered for 30 days, long after their mail flags reached the sheet
+OUTBOX_RETENTION = 30 * 24 * 60 * 60
+
 
 def run(
     secrets_path: str,
@@ -13,6 +29,11 @@ def run(
     registration_template_path: str,
     mail_secret_path: str,
     sheet_ids: Dict[str, str],
+    state_path: Optional[str] = None,
+    snapshot_dir: Optional[str] = None,
+    outbox_path: Optional[str] = None,
+    checklist_path: Optional[str] = None,
+    mail_api_url: Optional[str] = None,
 ) -> str:
     """Run the Google Docs automation process.
 
@@ -27,9 +48,19 @@ def run(
         mail_settings_path: Path to the mail settings YAML file.
         paid_template_path: Path to the paid email template HTML file.
         registration_template_path: Path to the registration email template HTML file.
-        checklist_path: Path to the checklist PDF file.
         mail_secret_path: Path to the mail client secrets JSON file.
         sheet_ids: Dictionary containing the sheet IDs for settings, registrations, and database.
+        state_path: Optional path of the ingestion state file. Enables incremental reads
+            of the database sheet when given.
+        snapshot_dir: Optional directory for worksheet snapshots. An unchanged settings
+            sheet is then served from disk instead of being downloaded.
+        outbox_path: Optional path of the SQLite mail outbox. Makes the mail stage
+            resumable and bounds it to MAIL_DRAIN_LIMIT emails per run when given.
+        checklist_path: Optional path to the checklist PDF file attached to the
+            registration confirmation emails.
+        mail_api_url: Optional URL of the batch endpoint of an HTTP mail API. Emails
+            are then sent in batches through ``HTTPBatchTransport`` instead of SMTP,
+            and ``mail_secret_path`` holds the API key.
 
     Returns:
         Success message indicating process completion.
@@ -44,23 +75,47 @@ def run(
     google_client = google_authenticator.gspread
 
     # Create a factory for building registrations
-    factory = GDocsRegistrationFactory(sheet_ids, google_client)
+    cache = None
+    if snapshot_dir is not None:
+        cache = SnapshotCache(PickleSnapshotStore(snapshot_dir), DriveRevisionProbe(google_client))
+    factory = GDocsRegistrationFactory(sheet_ids, google_client, state_path, cache=cache)
     registrations = factory.build_registrations()
     
 
-    # Process registrations and send emails
-    registrations = mail_service(
+    # Process registrations and send emails over one SMTP connection or the mail API
+    outbox = MailOutbox(outbox_path) if outbox_path is not None else None
+    transport = HTTPBatchTransport(mail_api_url) if mail_api_url is not None else SMTPSession()
+    with transport as session, outbox or nullcontext():
+        registrations = mail_service(
+            registrations,
+            paid_template_path,
+            registration_template_path,
+            mail_settings_path,
+            mail_secret_path,
+            session,
+            factory.changed_ids,
+            workers=MAIL_WORKERS,
+            rate_limit=TokenBucket(MAIL_RATE_PER_SECOND),
+            outbox=outbox,
+            drain_limit=MAIL_DRAIN_LIMIT,
+            checklist_dir=checklist_path,
+        )
+        if outbox is not None:
+            outbox.prune(OUTBOX_RETENTION)
+
+    # Dump the processed registrations back to Google Sheets, writing only changed cells
+    dumper = GDocsDumper(
         registrations,
-        paid_template_path,
-        registration_template_path,
-        mail_settings_path,
-        mail_secret_path,
-        send_mail,
+        sheet_ids,
+        google_client,
+        factory.changed_ids,
+        diff=True,
+        extents=factory.extents,
     )
-
-    # Dump the processed registrations back to Google Sheets
-    dumper = GDocsDumper(registrations, sheet_ids, google_client)
     dumper.dump_registrations()
+
+    # Remember what was processed so the next run only reads new rows
+    factory.store_state(registrations, dumper.extents)
     return "Process completed successfully"
 
 
@@ -3,6 +3,8 @@ from typing import List
 import gspread
 from google.oauth2.service_account import Credentials
 
+from gdocs_4_ski_automation.core.sheets_scheduler import ScheduledHTTPClient
+
 
 class GoogleAuthenticatorInterface:
     """Interface for Google API authentication and gspread client initialization.
@@ -44,7 +46,10 @@ class GoogleAuthenticatorInterface:
     def get_gspread(self) -> gspread.Client:
         """Get an authenticated gspread client for Google Sheets operations.
         
+        All requests of the client are paced to the quota and retried on transient
+        errors by the shared ``SHEETS_SCHEDULER``.
+
         Returns:
             Authenticated gspread client ready for Google Sheets operations.
         """
-        return gspread.authorize(self.credentials)
+        return gspread.authorize(self.credentials, http_client=ScheduledHTTPClient)
@@ -0,0 +1,187 @@
+"""In-memory stand-in for the parts of gspread used by the factories and the dumper."""
+import json
+from typing import Any, Dict, List, Optional
+
+import requests
+from gspread.exceptions import APIError
+from gspread.utils import a1_range_to_grid_range
+
+
+def _split_range(range_name: str) -> tuple[str, str]:
+    if "!" not in range_name:
+        return range_name.strip("'"), ""
+    title, _, cells = range_name.rpartition("!")
+    return title.strip("'"), cells
+
+
+def _api_error(status: int, message: str) -> APIError:
+    """Builds the error gspread raises for an answer of the API with the given status."""
+    response = requests.Response()
+    response.status_code = status
+    response._content = json.dumps({"error": {"code": status, "message": message}}).encode()
+    return APIError(response)
+
+
+def _trim(rows: List[List[Any]]) -> List[List[Any]]:
+    """Drops trailing empty cells and rows the way the Sheets API does."""
+    trimmed = []
+    for row in rows:
+        row = list(row)
+        while row and row[-1] == "":
+            row.pop()
+        trimmed.append(row)
+    while trimmed and not trimmed[-1]:
+        trimmed.pop()
+    return trimmed
+
+
+class FakeWorksheet:
+    def __init__(
+        self, spreadsheet: "FakeSpreadsheet", title: str, values: List[List[Any]], sheet_id: int = 0
+    ):
+        self.spreadsheet = spreadsheet
+        self.id = sheet_id
+        self.title = title
+        self.values = [list(row) for row in values]
+        # new Google Sheets worksheets have a grid of 1000 rows
+        self.row_count = max(1000, len(self.values))
+
+    def read(self, cells: str) -> List[List[Any]]:
+        grid = a1_range_to_grid_range(cells) if cells else {}
+        rows = self.values[grid.get("startRowIndex", 0) : grid.get("endRowIndex")]
+        rows = [row[grid.get("startColumnIndex", 0) : grid.get("endColumnIndex")] for row in rows]
+        return _trim(rows)
+
+    def write(self, cells: str, values: List[List[Any]]) -> None:
+        grid = a1_range_to_grid_range(cells)
+        top, left = grid.get("startRowIndex", 0), grid.get("startColumnIndex", 0)
+        if top + len(values) > self.row_count:
+            raise _api_error(
+                400, f"Range ('{self.title}'!{cells}) exceeds grid limits. Max rows: {self.row_count}"
+            )
+        for r, row in enumerate(values):
+            while len(self.values) <= top + r:
+                self.values.append([])
+            target = self.values[top + r]
+            target.extend([""] * (left + len(row) - len(target)))
+            for c, value in enumerate(row):
+                if value is not None:  # the API leaves cells sent as null untouched
+                    target[left + c] = value
+
+    def clear(self, cells: str) -> None:
+        grid = a1_range_to_grid_range(cells)
+        for row in self.values[grid.get("startRowIndex", 0) : grid.get("endRowIndex")]:
+            start, end = grid.get("startColumnIndex", 0), grid.get("endColumnIndex", len(row))
+            row[start:end] = [""] * len(row[start:end])
+
+    def update(self, range_name: str, values: List[List[Any]]) -> None:
+        self.spreadsheet.client.requests.append(("update", self.title))
+        self.write(range_name, values)
+
+    def get_all_values(self) -> List[List[Any]]:
+        self.spreadsheet.client.requests.append(("get_all_values", self.title))
+        rows = self.read("")
+        width = max((len(row) for row in rows), default=0)
+        return [row + [""] * (width - len(row)) for row in rows]
+
+
+class FakeSpreadsheet:
+    def __init__(self, client: "FakeClient", key: str, sheets: Dict[str, List[List[Any]]]):
+        self.client = client
+        self.id = key
+        self.revision = 1
+        self._worksheets = {
+            title: FakeWorksheet(self, title, values, sheet_id)
+            for sheet_id, (title, values) in enumerate(sheets.items())
+        }
+
+    def worksheets(self) -> List[FakeWorksheet]:
+        self.client.requests.append(("worksheets", self.id))
+        return list(self._worksheets.values())
+
+    def worksheet(self, title: str) -> FakeWorksheet:
+        self.client.requests.append(("worksheet", self.id))
+        return self._worksheets[title]
+
+    def values_get(self, range_name: str, params: Optional[Dict] = None) -> Dict[str, Any]:
+        self.client.requests.append(("values_get", self.id))
+        title, cells = _split_range(range_name)
+        values = self._worksheets[title].read(cells)
+        return {"range": range_name, "values": values} if values else {"range": range_name}
+
+
+class FakeClient:
+    """Serves spreadsheets from nested dicts ``{key: {title: rows}}`` and records requests."""
+
+    def __init__(self, spreadsheets: Dict[str, Dict[str, List[List[Any]]]]):
+        self.requests: List[tuple] = []
+        # bodies of the batch clear and batch update requests
+        self.writes: List[Dict[str, Any]] = []
+        self.spreadsheets = {
+            key: FakeSpreadsheet(self, key, sheets) for key, sheets in spreadsheets.items()
+        }
+        # gspread exposes the raw API calls on ``client.http_client``
+        self.http_client = self
+
+    def values_batch_get(
+        self, key: str, ranges: List[str], params: Optional[Dict] = None
+    ) -> Dict[str, Any]:
+        self.requests.append(("values_batch_get", key))
+        spreadsheet = self.spreadsheets[key]
+        value_ranges = []
+        for range_name in ranges:
+            title, cells = _split_range(range_name)
+            values = spreadsheet._worksheets[title].read(cells)
+            value_ranges.append({"range": range_name, "values": values} if values else {"range": range_name})
+        return {"spreadsheetId": key, "valueRanges": value_ranges}
+
+    def values_batch_clear(
+        self, key: str, params: Optional[Dict] = None, body: Optional[Dict] = None
+    ) -> Dict[str, Any]:
+        self.requests.append(("values_batch_clear", key))
+        self.writes.append(body)
+        for range_name in body["ranges"]:
+            title, cells = _split_range(range_name)
+            self.spreadsheets[key]._worksheets[title].clear(cells)
+        return {"spreadsheetId": key, "clearedRanges": body["ranges"]}
+
+    def values_batch_update(self, key: str, body: Optional[Dict] = None) -> Dict[str, Any]:
+        self.requests.append(("values_batch_update", key))
+        self.writes.append(body)
+        for value_range in body["data"]:
+            title, cells = _split_range(value_range["range"])
+            self.spreadsheets[key]._worksheets[title].write(cells, value_range["values"])
+        return {"spreadsheetId": key, "totalUpdatedCells": 0}
+
+    def fetch_sheet_metadata(self, key: str, params: Optional[Dict] = None) -> Dict[str, Any]:
+        self.requests.append(("fetch_sheet_metadata", key))
+        sheets = self.spreadsheets[key]._worksheets.values()
+        return {
+            "sheets": [
+                {
+                    "properties": {
+                        "sheetId": sheet.id,
+                        "title": sheet.title,
+                        "gridProperties": {"rowCount": sheet.row_count},
+                    }
+                }
+                for sheet in sheets
+            ]
+        }
+
+    def batch_update(self, key: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        self.requests.append(("batch_update", key))
+        self.writes.append(body)
+        sheets = {sheet.id: sheet for sheet in self.spreadsheets[key]._worksheets.values()}
+        for request in body["requests"]:
+            append = request["appendDimension"]
+            sheets[append["sheetId"]].row_count += append["length"]
+        return {"spreadsheetId": key, "replies": [{} for _ in body["requests"]]}
+
+    def get_file_drive_metadata(self, key: str) -> Dict[str, Any]:
+        self.requests.append(("get_file_drive_metadata", key))
+        return {"id": key, "modifiedTime": f"revision-{self.spreadsheets[key].revision}"}
+
+    def open_by_key(self, key: str) -> FakeSpreadsheet:
+        self.requests.append(("open_by_key", key))
+        return self.spreadsheets[key]
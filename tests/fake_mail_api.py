@@ -0,0 +1,141 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+class FakeMailAPI:
+    """Local stand-in for the batch endpoint used by ``HTTPBatchTransport``.
+
+    Runs an HTTP server on a free local port in a background thread. It records every
+    accepted request and can simulate the behaviour of a real mail API: a fixed
+    latency per request, throttling of every n-th request with 429, rejected
+    recipients and a maximum batch size. Use it as context manager.
+
+    Attributes:
+        url: URL of the batch endpoint.
+        requests: Number of requests received.
+        throttled: Number of requests answered with 429.
+        batches: Payloads of the accepted requests, in arrival order.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        throttle_every: int = 0,
+        retry_after: Optional[float] = None,
+        reject: Iterable[str] = (),
+        api_key: Optional[str] = None,
+        max_batch: Optional[int] = None,
+        drop_results: int = 0,
+    ) -> None:
+        """Initialize the stand-in. The server starts with ``start`` or ``__enter__``.
+
+        Args:
+            latency: Seconds every request takes.
+            throttle_every: Answer every n-th request with 429. Zero never throttles.
+            retry_after: Optional ``Retry-After`` header of throttled requests in seconds.
+            reject: Recipients whose emails are rejected.
+            api_key: Bearer token requests must carry. Any token is accepted if None.
+            max_batch: Largest batch accepted, larger ones are answered with 413.
+            drop_results: Results left out at the end of every answer, like a faulty API.
+        """
+        self.latency = latency
+        self.throttle_every = throttle_every
+        self.retry_after = retry_after
+        self.reject = set(reject)
+        self.api_key = api_key
+        self.max_batch = max_batch
+        self.drop_results = drop_results
+        self.requests = 0
+        self.throttled = 0
+        self.batches: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+        host, port = self._server.server_address[:2]
+        self.url = f"http://{host}:{port}/v1/messages/batch"
+
+    @property
+    def messages(self) -> List[Dict[str, Any]]:
+        """All accepted emails, in arrival order."""
+        with self._lock:
+            return [m for batch in self.batches for m in batch["messages"]]
+
+    def start(self) -> "FakeMailAPI":
+        """Start serving in a background thread."""
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop the server and close its socket."""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeMailAPI":
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+    def _respond(
+        self, payload: Dict[str, Any], authorization: str
+    ) -> Tuple[int, Dict[str, str], Dict[str, Any]]:
+        """Decide the status, headers and body of the answer to a request."""
+        with self._lock:
+            self.requests += 1
+            number = self.requests
+        time.sleep(self.latency)
+
+        if self.api_key is not None and authorization != f"Bearer {self.api_key}":
+            return 401, {}, {"error": "invalid API key"}
+        if self.throttle_every and number % self.throttle_every == 0:
+            with self._lock:
+                self.throttled += 1
+            headers = {} if self.retry_after is None else {"Retry-After": str(self.retry_after)}
+            return 429, headers, {"error": "rate limited"}
+        if self.max_batch is not None and len(payload["messages"]) > self.max_batch:
+            return 413, {}, {"error": "batch too large"}
+
+        results = []
+        for message in payload["messages"]:
+            if message["to"] in self.reject:
+                results.append({"error": f"recipient {message['to']} rejected"})
+            else:
+                results.append({"id": f"{number}-{len(results)}"})
+        accepted = [m for m in payload["messages"] if m["to"] not in self.reject]
+        with self._lock:
+            self.batches.append(dict(payload, messages=accepted))
+        return 200, {}, {"results": results[: len(results) - self.drop_results]}
+
+    def _handler(self) -> type:
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # headers and body are written separately, don't wait for delayed ACKs
+            disable_nagle_algorithm = True
+
+            def do_POST(self) -> None:
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                status, headers, answer = api._respond(
+                    json.loads(body), self.headers.get("Authorization", "")
+                )
+                data = json.dumps(answer).encode("utf-8")
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        return Handler
@@ -0,0 +1,94 @@
+"""Sheet contents shaped like the live settings, registrations and db spreadsheets."""
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+SHEET_IDS = {"settings": "settings-id", "registrations": "registrations-id", "db": "db-id"}
+
+PARTICIPANT_HEADERS = [
+    "Vorname",
+    "Nachname",
+    "Alter zum Kursbeginn",
+    "Welcher Kurs soll besucht werden? ",
+    "Hat die Teilnehmer*in bereits Kurse besucht?",
+    "Hast du noch ein Frage oder willst eine Bemerkung hinterlassen?",
+]
+
+DB_HEADERS = (
+    [
+        "Zeitstempel",
+        "Sind alle Teilnehmenden Mitglieder des SV DJK Götting?",
+        "E-Mail Adresse",
+        "Vorname",
+        "Nachname",
+        "Wie lautet deine Adresse? ",
+        "Unter welcher Nummer können wir dich erreichen?",
+        "Wie viele Teilnehmer*innen möchtest du anmelden",
+    ]
+    + PARTICIPANT_HEADERS * 8
+    + ["price", "r_mail_sent", "p_mail_sent", "ID"]
+)
+
+PRICES = [
+    ["Kategorie", "Preis"],
+    ["Zwergerl", "100"],
+    ["Kind", "135"],
+    ["Erwachsen", "160"],
+    ["FamilienRabatt", "10"],
+    ["FruehbucherRabatt", "15"],
+    ["FruehbucherRabattDatum", "01.11.2024"],
+]
+
+PAYMENT_HEADERS = [
+    ["Bezahlungs Checkliste", "", "", "", "", "", ""],
+    ["ID", "Vorname", "Nachname", "Mail", "Tel", "Summe", "Bezahlt"],
+]
+
+
+def make_db_row(
+    time_stemp: str,
+    contact: Tuple[str, str],
+    participants: Sequence[Tuple[str, str, int, str]],
+    r_mail_sent: str = "",
+    p_mail_sent: str = "",
+    _id: str = "",
+) -> List[str]:
+    """Builds a Formularantworten row; participants are (first, last, age, course)."""
+    first, last = contact
+    row = [time_stemp, "Ja", f"{first.lower()}@example.org", first, last, "Hauptstr. 1", "0123", str(len(participants))]
+    for slot in range(8):
+        if slot < len(participants):
+            p_first, p_last, age, course = participants[slot]
+            row += [p_first, p_last, str(age), course, "A-Kurs Ski", ""]
+        else:
+            row += [""] * len(PARTICIPANT_HEADERS)
+    return row + ["", r_mail_sent, p_mail_sent, _id]
+
+
+def make_db_rows(count: int, start: int = 0) -> List[List[str]]:
+    """Builds ``count`` distinct registrations with one to three participants each."""
+    courses = ["Ski", "Snowboard", "Zwergerl", "Zwergerl-Snowboard"]
+    rows = []
+    for n in range(start, start + count):
+        participants = [
+            (f"Kind{n}_{k}", f"Familie{n}", 4 + (n + k) % 40, courses[(n + k) % 4])
+            for k in range(1 + n % 3)
+        ]
+        day = 1 + n % 28
+        month = 10 + n % 3
+        rows.append(make_db_row(f"{day:02d}.{month:02d}.2024 12:00:00", (f"Eltern{n}", f"Familie{n}"), participants))
+    return rows
+
+
+def make_spreadsheets(
+    db_rows: List[List[str]], paid_ids: Optional[Sequence[int]] = None
+) -> Dict[str, Dict[str, List[List[Any]]]]:
+    """Builds the contents of all three spreadsheets for the fake client."""
+    paid_ids = set(paid_ids or [])
+    payments = [
+        [str(i), "", "", "", "", "", "TRUE" if i in paid_ids else "FALSE"]
+        for i in range(1, len(db_rows) + 1)
+    ]
+    return {
+        SHEET_IDS["settings"]: {"Preise": PRICES},
+        SHEET_IDS["registrations"]: {"Bezahlung": PAYMENT_HEADERS + payments},
+        SHEET_IDS["db"]: {"Formularantworten": [DB_HEADERS] + db_rows},
+    }
@@ -0,0 +1,55 @@
+import base64
+import os
+
+from gdocs_4_ski_automation.core.attachments import AttachmentCache
+
+
+def _write(path, content: bytes) -> str:
+    with open(path, "wb") as file:
+        file.write(content)
+    return str(path)
+
+
+def test_cache_encodes_each_file_once(tmp_path) -> None:
+    """Test that all emails share one encoded part per file."""
+    path = _write(tmp_path / "checklist.pdf", b"%PDF-1.4 checklist")
+    cache = AttachmentCache()
+    part = cache.get(path)
+    assert cache.get(path) is part
+    assert cache.get(os.path.relpath(path)) is part
+    assert (cache.misses, cache.hits) == (1, 2)
+
+    assert part.get_content_type() == "application/pdf"
+    assert part.get_filename() == "checklist.pdf"
+    assert part["Content-Transfer-Encoding"] == "base64"
+    assert base64.b64decode(part.get_payload()) == b"%PDF-1.4 checklist"
+
+
+def test_changed_file_is_encoded_again(tmp_path) -> None:
+    """Test that a file changed on disk does not serve the stale part."""
+    path = _write(tmp_path / "checklist.pdf", b"old")
+    cache = AttachmentCache()
+    old = cache.get(path)
+    _write(path, b"new content")
+    assert base64.b64decode(cache.get(path).get_payload()) == b"new content"
+    assert cache.get(path) is not old
+
+
+def test_cache_evicts_least_recently_used_parts(tmp_path) -> None:
+    """Test that the encoded size stays below the cap and large files are not cached."""
+    paths = [_write(tmp_path / f"file{n}.bin", bytes(300)) for n in range(3)]
+    size = len(AttachmentCache().get(paths[0]).get_payload())
+    cache = AttachmentCache(max_bytes=2 * size)
+
+    first = cache.get(paths[0])
+    cache.get(paths[1])
+    cache.get(paths[0])
+    cache.get(paths[2])
+    assert len(cache) == 2 and cache.size == 2 * size
+    assert cache.get(paths[0]) is first
+    cache.get(paths[1])
+    assert cache.misses == 4
+
+    large = _write(tmp_path / "large.bin", bytes(3 * 300))
+    assert cache.get(large) is not cache.get(large)
+    assert len(cache) == 2 and cache.size <= cache.max_bytes
@@ -0,0 +1,114 @@
+import base64
+
+import pytest
+from fake_mail_api import FakeMailAPI
+from test_mail_services import _registration, _write_mail_files
+
+from gdocs_4_ski_automation.core.mail_services import mail_service
+from gdocs_4_ski_automation.core.mail_transports import (BatchMailTransport,
+                                                         HTTPBatchTransport)
+
+TEMPLATE = {"subject": "Registrierungsbestätigung", "body": "<p>Hallo</p>", "attachments": []}
+MAIL_SETTINGS = {"from_email": "kurse@example.org"}
+
+
+def test_mail_service_sends_batches_without_splitting_registrations(tmp_path) -> None:
+    """Test that whole registrations are packed into batches and rejections are kept."""
+    paths = _write_mail_files(tmp_path)
+    checklist = tmp_path / "checklist.pdf"
+    checklist.write_bytes(b"%PDF-1.4 checklist")
+    registrations = [_registration(n, payed=n % 2 == 0) for n in range(1, 8)]
+
+    with FakeMailAPI(api_key="secret", reject={"m5@example.org"}) as api:
+        with HTTPBatchTransport(api.url, "secret", max_batch=3) as transport:
+            assert isinstance(transport, BatchMailTransport)
+            mail_service(
+                registrations,
+                paths["paid"],
+                paths["registration"],
+                paths["settings"],
+                "unused",
+                transport,
+                workers=2,
+                checklist_dir=str(checklist),
+            )
+
+    # 1 | 2 2 3 | 4 4 5 | 6 6 7, each registration within one request
+    assert api.requests == len(api.batches) == 4
+    assert sorted(len(batch["messages"]) for batch in api.batches) == [1, 2, 3, 3]
+    assert transport.sent == 9
+    assert [r.registration_mail_sent for r in registrations] == [True] * 4 + [False, True, True]
+    assert [r.payment_mail_sent for r in registrations] == [False, True] * 3 + [False]
+
+    first = next(m for m in api.messages if m["to"] == "m1@example.org")
+    (attachment,) = first["attachments"]
+    assert attachment["filename"] == "checklist.pdf"
+    assert base64.b64decode(attachment["content"]) == b"%PDF-1.4 checklist"
+    assert api.batches[0]["from"] == "kurse@example.org"
+
+
+def test_throttled_requests_are_repeated_after_retry_after() -> None:
+    """Test that 429 answers are retried after the delay the API asks for."""
+    waits = []
+    with FakeMailAPI(throttle_every=2, retry_after=0.25) as api:
+        transport = HTTPBatchTransport(api.url, "key", sleep=waits.append)
+        for n in range(3):
+            transport(f"eltern{n}@example.org", TEMPLATE, MAIL_SETTINGS, "unused")
+    assert [m["to"] for m in api.messages] == [f"eltern{n}@example.org" for n in range(3)]
+    assert transport.throttled == api.throttled == 2
+    assert waits == [0.25, 0.25]
+
+
+def test_transport_gives_up_after_max_attempts() -> None:
+    """Test that a permanently throttled batch fails instead of retrying forever."""
+    waits = []
+    with FakeMailAPI(throttle_every=1) as api:
+        transport = HTTPBatchTransport(
+            api.url, "key", max_attempts=3, backoff=0.5, sleep=waits.append
+        )
+        with pytest.raises(ConnectionError, match="429"):
+            transport("eltern@example.org", TEMPLATE, MAIL_SETTINGS, "unused")
+    assert api.requests == 3 and not api.messages
+    # without a Retry-After header the backoff doubles
+    assert waits == [0.5, 1.0]
+
+
+def test_rejected_api_key_stops_the_run(tmp_path) -> None:
+    """Test that an authentication failure is raised instead of being retried."""
+    paths = _write_mail_files(tmp_path)
+    key_file = tmp_path / "mail_api_key"
+    key_file.write_text("wrong\n")
+    with FakeMailAPI(api_key="secret") as api:
+        with pytest.raises(Exception, match="Authentication failed"):
+            mail_service(
+                [_registration(1), _registration(2)],
+                paths["paid"],
+                paths["registration"],
+                paths["settings"],
+                str(key_file),
+                HTTPBatchTransport(api.url),
+            )
+    assert api.requests == 1
+
+
+def test_short_answer_fails_the_whole_batch(tmp_path) -> None:
+    """Test that results missing from an answer are not shifted onto other emails."""
+    paths = _write_mail_files(tmp_path)
+    registrations = [_registration(n) for n in range(1, 4)]
+    with FakeMailAPI(drop_results=1) as api:
+        with HTTPBatchTransport(api.url, "key", max_batch=3) as transport:
+            with pytest.raises(RuntimeError, match="2 results for 3 emails"):
+                transport.send_batch(
+                    [(f"eltern{n}@example.org", TEMPLATE) for n in range(3)],
+                    MAIL_SETTINGS,
+                    "unused",
+                )
+            mail_service(
+                registrations,
+                paths["paid"],
+                paths["registration"],
+                paths["settings"],
+                "unused",
+                transport,
+            )
+    assert not any(r.registration_mail_sent for r in registrations)
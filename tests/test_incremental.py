@@ -0,0 +1,175 @@
+from fake_gspread import FakeClient
+from sheet_samples import SHEET_IDS, make_db_rows, make_spreadsheets
+
+from gdocs_4_ski_automation.core.factories import GDocsRegistrationFactory
+from gdocs_4_ski_automation.core.incremental import load_state, save_state
+from gdocs_4_ski_automation.core.sheet_writer import TableExtent
+
+
+def _summary(registrations) -> list:
+    return [
+        (r._id, r.time_stemp, r.timestamp, r.contact.name.last, len(r.participants), r.payment.amount)
+        for r in registrations
+    ]
+
+
+def _settle(registrations) -> None:
+    for r in registrations:
+        r.registration_mail_sent = True
+        r.payment_mail_sent = r.payment.payed
+
+
+def _write_flags(rows, registrations) -> None:
+    """Writes mail flags and IDs into the db rows like ``GDocsDumper.dump_mail_flags``."""
+    for r in registrations:
+        row = rows[r._id - 1]
+        flags = [r.registration_mail_sent, r.payment_mail_sent]
+        row[-3:] = [str(flag).upper() for flag in flags] + [str(r._id)]
+
+
+def test_incremental_decodes_only_new_rows(tmp_path) -> None:
+    """Test that a second run reads all rows but only decodes and prices the new ones."""
+    state_path = str(tmp_path / "state.pkl")
+    rows = make_db_rows(5)
+    client = FakeClient(make_spreadsheets(rows))
+    factory = GDocsRegistrationFactory(SHEET_IDS, client, state_path)
+    first = factory.build_registrations()
+    for r in first:
+        r.registration_mail_sent = True
+    _write_flags(rows, first)
+    assert factory.extents == {}
+    factory.store_state(first, {"Kurse": TableExtent(rows=5, grid_rows=1000)})
+
+    rows += make_db_rows(2, start=5)
+    client = FakeClient(make_spreadsheets(rows))
+    factory = GDocsRegistrationFactory(SHEET_IDS, client, state_path)
+    # every row is read, in one request together with the header row
+    assert len(factory.db_rows) == 7
+    assert client.requests.count(("values_batch_get", SHEET_IDS["db"])) == 1
+    assert factory.extents == {"Kurse": TableExtent(rows=5, grid_rows=1000)}
+    merged = factory.build_registrations()
+    assert merged[0] is factory.state.registrations[0]
+    assert factory.price_cache.hits + factory.price_cache.misses == 2
+    assert factory.changed_ids == {6, 7}
+
+    full = GDocsRegistrationFactory(SHEET_IDS, FakeClient(make_spreadsheets(rows)))
+    assert _summary(merged) == _summary(full.build_registrations())
+    assert [r.registration_mail_sent for r in merged] == [True] * 5 + [False] * 2
+    assert ("get_all_values", "Formularantworten") not in client.requests
+
+
+def test_incremental_maps_edited_last_row(tmp_path) -> None:
+    """Test that an edit of the last processed row is mapped again."""
+    state_path = str(tmp_path / "state.pkl")
+    rows = make_db_rows(3)
+    factory = GDocsRegistrationFactory(SHEET_IDS, FakeClient(make_spreadsheets(rows)), state_path)
+    factory.store_state(factory.build_registrations())
+
+    rows[2][4] = "Umbenannt"
+    factory = GDocsRegistrationFactory(SHEET_IDS, FakeClient(make_spreadsheets(rows)), state_path)
+    registrations = factory.build_registrations()
+    assert len(factory.db_rows) == 3
+    assert registrations[2].contact.name.last == "Umbenannt"
+
+
+def test_incremental_maps_edited_processed_rows(tmp_path) -> None:
+    """Test that an edit of a row before the last processed one is not missed."""
+    state_path = str(tmp_path / "state.pkl")
+    rows = make_db_rows(5)
+    factory = GDocsRegistrationFactory(SHEET_IDS, FakeClient(make_spreadsheets(rows)), state_path)
+    registrations = factory.build_registrations()
+    _settle(registrations)
+    _write_flags(rows, registrations)
+    factory.store_state(registrations)
+
+    rows[1][4] = "Korrigiert"
+    rows[1][2] = "korrigiert@example.com"
+    factory = GDocsRegistrationFactory(SHEET_IDS, FakeClient(make_spreadsheets(rows)), state_path)
+    registrations = factory.build_registrations()
+    assert registrations[1].contact.name.last == "Korrigiert"
+    assert registrations[1].contact.mail == "korrigiert@example.com"
+    assert factory.changed_ids == {2}
+
+
+def test_state_without_parsed_timestamps_is_discarded(tmp_path) -> None:
+    """Test that a state stored before timestamps were parsed forces a full read."""
+    state_path = str(tmp_path / "state.pkl")
+    client = FakeClient(make_spreadsheets(make_db_rows(2)))
+    factory = GDocsRegistrationFactory(SHEET_IDS, client, state_path)
+    factory.store_state(factory.build_registrations())
+    state = load_state(state_path)
+    assert state is not None
+
+    for r in state.registrations:
+        r.timestamp = None
+    save_state(state_path, state)
+    assert load_state(state_path) is None
+
+
+def test_unchanged_registrations_are_skipped(tmp_path) -> None:
+    """Test that only registrations with changed inputs or pending mails count as changed."""
+    state_path = str(tmp_path / "state.pkl")
+    rows = make_db_rows(4)
+    factory = GDocsRegistrationFactory(SHEET_IDS, FakeClient(make_spreadsheets(rows)), state_path)
+    first = factory.build_registrations()
+    assert factory.changed_ids == {1, 2, 3, 4}
+    _settle(first)
+    first[1].registration_mail_sent = False
+    _write_flags(rows, first)
+    factory.store_state(first)
+
+    # registration 3 was paid, registration 2 still waits for its mail
+    factory = GDocsRegistrationFactory(
+        SHEET_IDS, FakeClient(make_spreadsheets(rows, paid_ids=[3])), state_path
+    )
+    registrations = factory.build_registrations()
+    assert factory.changed_ids == {2, 3}
+    assert registrations[2].payment.payed
+    _settle(registrations)
+    _write_flags(rows, registrations)
+    factory.store_state(registrations)
+
+    factory = GDocsRegistrationFactory(
+        SHEET_IDS, FakeClient(make_spreadsheets(rows, paid_ids=[3])), state_path
+    )
+    factory.build_registrations()
+    assert factory.changed_ids == set()
+
+
+def test_full_read_reuses_unchanged_registrations(tmp_path) -> None:
+    """Test that after a fallback to a full read only edited rows are mapped again."""
+    state_path = str(tmp_path / "state.pkl")
+    rows = make_db_rows(3)
+    factory = GDocsRegistrationFactory(SHEET_IDS, FakeClient(make_spreadsheets(rows)), state_path)
+    registrations = factory.build_registrations()
+    _settle(registrations)
+    _write_flags(rows, registrations)
+    factory.store_state(registrations)
+
+    rows[2][4] = "Umbenannt"
+    factory = GDocsRegistrationFactory(SHEET_IDS, FakeClient(make_spreadsheets(rows)), state_path)
+    registrations = factory.build_registrations()
+    assert registrations[0] is factory.state.registrations[0]
+    assert registrations[2].contact.name.last == "Umbenannt"
+    assert factory.changed_ids == {3}
+
+
+def test_mail_flags_of_the_sheet_win_over_a_stale_state(tmp_path) -> None:
+    """Test that mails sent by another run are not reported as unsent again."""
+    state_path = str(tmp_path / "state.pkl")
+    rows = make_db_rows(3)
+    # this instance stored its state while the mails were still pending
+    stale = GDocsRegistrationFactory(SHEET_IDS, FakeClient(make_spreadsheets(rows)), state_path)
+    stale.store_state(stale.build_registrations())
+
+    # another instance sent the mails and wrote the flags to the sheet
+    other = GDocsRegistrationFactory(SHEET_IDS, FakeClient(make_spreadsheets(rows)))
+    sent = other.build_registrations()
+    _settle(sent)
+    _write_flags(rows, sent)
+
+    factory = GDocsRegistrationFactory(SHEET_IDS, FakeClient(make_spreadsheets(rows)), state_path)
+    registrations = factory.build_registrations()
+    assert registrations[0] is factory.state.registrations[0]
+    assert all(r.registration_mail_sent for r in registrations)
+    assert factory.changed_ids == set()
@@ -0,0 +1,61 @@
+from datetime import datetime
+
+import openpyxl
+import pytest
+from fake_gspread import FakeClient
+from sheet_samples import SHEET_IDS, make_db_rows, make_spreadsheets
+
+from gdocs_4_ski_automation.core.factories import (DB_FILE_NAME,
+                                                   REGISTRATION_FILE_NAME,
+                                                   SETTINGS_FILE_NAME,
+                                                   GDocsRegistrationFactory,
+                                                   LocalFileRegistrationFactory)
+
+
+def _typed(value: str):
+    """Turns a formatted Sheets value back into what an xlsx export stores."""
+    if value in ("TRUE", "FALSE"):
+        return value == "TRUE"
+    if value.isdigit() and not value.startswith("0"):
+        return int(value)
+    for date_format in ("%d.%m.%Y %H:%M:%S", "%d.%m.%Y"):
+        try:
+            return datetime.strptime(value, date_format)
+        except ValueError:
+            pass
+    return value or None
+
+
+def _write_exports(directory, spreadsheets) -> None:
+    file_names = {
+        SHEET_IDS["settings"]: SETTINGS_FILE_NAME,
+        SHEET_IDS["registrations"]: REGISTRATION_FILE_NAME,
+        SHEET_IDS["db"]: DB_FILE_NAME,
+    }
+    for sheet_id, sheets in spreadsheets.items():
+        workbook = openpyxl.Workbook()
+        workbook.remove(workbook.active)
+        for title, rows in sheets.items():
+            worksheet = workbook.create_sheet(title)
+            for row in rows:
+                worksheet.append([_typed(value) for value in row])
+        workbook.save(directory / file_names[sheet_id])
+
+
+def test_local_factory_matches_gdocs_factory(tmp_path) -> None:
+    """Test that xlsx exports give the same registrations as the live sheets."""
+    rows = make_db_rows(12)
+    rows[4][-1] = "5"
+    spreadsheets = make_spreadsheets(rows, paid_ids=[5])
+    _write_exports(tmp_path, spreadsheets)
+
+    local = LocalFileRegistrationFactory(tmp_path).build_registrations()
+    remote = GDocsRegistrationFactory(SHEET_IDS, FakeClient(spreadsheets)).build_registrations()
+    assert local == remote
+    assert local[4].payment.payed
+
+
+def test_local_factory_missing_file(tmp_path) -> None:
+    """Test that a missing export raises FileNotFoundError."""
+    with pytest.raises(FileNotFoundError):
+        LocalFileRegistrationFactory(tmp_path)
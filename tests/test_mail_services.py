@@ -0,0 +1,164 @@
+import os
+from datetime import datetime
+
+import yaml
+
+from gdocs_4_ski_automation.core.ctypes import (ContactPerson, Course, Name,
+                                                Participant, Payment,
+                                                Registration)
+from gdocs_4_ski_automation.core.mail_services import (TemplateRenderer,
+                                                       fill_paid_template,
+                                                       fill_registration_template,
+                                                       mail_service,
+                                                       render_previews)
+
+MAIL_SETTINGS = {
+    "from_email": "kurse@example.org",
+    "iban": "DE00 0000",
+    "bic": "GENODEF1",
+    "contact_email": "info@example.org",
+}
+
+REGISTRATION_TEMPLATE = """<p>Hallo {{ first_name }},</p>
+{% for p in participants %}
+  <li>{{ p.first_name }} {{ p.course }}</li>
+{% endfor %}
+<p>{{ amount }} an {{ iban }}, Kurs {{ course_number }}</p>
+"""
+
+PAID_TEMPLATE = "<p>Danke {{ first_name }} {{ last_name }}, {{ amount }} erhalten.</p>\n"
+
+
+def _write_mail_files(directory) -> dict:
+    paths = {
+        "paid": directory / "paid.html",
+        "registration": directory / "registration.html",
+        "settings": directory / "mail_setting.yaml",
+    }
+    paths["paid"].write_text(PAID_TEMPLATE)
+    paths["registration"].write_text(REGISTRATION_TEMPLATE)
+    paths["settings"].write_text(yaml.safe_dump(MAIL_SETTINGS))
+    return {key: str(path) for key, path in paths.items()}
+
+
+def _registration(_id: int, payed: bool = False) -> Registration:
+    return Registration(
+        time_stemp="01.10.2024 12:00:00",
+        _id=_id,
+        contact=ContactPerson(Name("Eltern", f"Familie{_id}"), "Str. 1", f"m{_id}@example.org", "0123"),
+        participants=(Participant(Name("Kind", f"Familie{_id}"), 8, Course.SKI, "", ""),),
+        payment=Payment(amount=120.0, payed=payed),
+        registration_mail_sent=False,
+        payment_mail_sent=False,
+        timestamp=datetime(2024, 10, 1, 12),
+    )
+
+
+def test_renderer_compiles_each_template_once(tmp_path) -> None:
+    """Test that the renderer reuses compiled templates and renders like before."""
+    paths = _write_mail_files(tmp_path)
+    renderer = TemplateRenderer(bytecode_cache_dir=tmp_path / "bytecode")
+    template = renderer.get_template(paths["registration"], whitespace_control=True)
+    assert renderer.get_template(paths["registration"], whitespace_control=True) is template
+    assert os.listdir(tmp_path / "bytecode")
+
+    registration = _registration(7)
+    cached = fill_registration_template(registration, paths["registration"], MAIL_SETTINGS, renderer)
+    assert cached == fill_registration_template(registration, paths["registration"], MAIL_SETTINGS)
+    assert "\n\n" not in cached["body"] and "Kurs 7" in cached["body"]
+    assert fill_paid_template(registration, paths["paid"], MAIL_SETTINGS, renderer)["body"] == (
+        "<p>Danke Eltern Familie7, 120.0 erhalten.</p>"
+    )
+
+
+def test_mail_service_sends_pending_mails_of_changed_registrations(tmp_path) -> None:
+    """Test that mail_service sends pending mails and skips unchanged registrations."""
+    paths = _write_mail_files(tmp_path)
+    sent = []
+    registrations = [_registration(1), _registration(2, payed=True), _registration(3)]
+    mail_service(
+        registrations,
+        paths["paid"],
+        paths["registration"],
+        paths["settings"],
+        "unused",
+        lambda to_email, template, *args: sent.append((to_email, template["subject"])),
+        changed_ids={1, 2},
+    )
+    assert sent == [
+        ("m1@example.org", "Registrierungsbestätigung"),
+        ("m2@example.org", "Registrierungsbestätigung"),
+        ("m2@example.org", "Zahlungseingang"),
+    ]
+    assert [r.registration_mail_sent for r in registrations] == [True, True, False]
+
+
+def test_mail_flags_are_only_set_for_sent_mails(tmp_path) -> None:
+    """Test that a failed send leaves the flag unset so the mail is retried next run."""
+    paths = _write_mail_files(tmp_path)
+
+    def flaky_send(to_email, template, *args) -> None:
+        if to_email == "m2@example.org" and template["subject"] == "Zahlungseingang":
+            raise ConnectionError("connection dropped")
+
+    registrations = [_registration(n, payed=True) for n in range(1, 6)]
+    mail_service(
+        registrations,
+        paths["paid"],
+        paths["registration"],
+        paths["settings"],
+        "unused",
+        flaky_send,
+        workers=3,
+    )
+    assert [r.registration_mail_sent for r in registrations] == [True] * 5
+    assert [r.payment_mail_sent for r in registrations] == [True, False, True, True, True]
+
+
+def test_render_previews_writes_every_pending_mail(tmp_path) -> None:
+    """Test that the process pool renders the same emails mail_service would send."""
+    paths = _write_mail_files(tmp_path)
+    checklist = tmp_path / "checklist.pdf"
+    checklist.write_bytes(b"%PDF")
+    registrations = [_registration(n, payed=n % 2 == 0) for n in range(1, 8)]
+    registrations[0].registration_mail_sent = True
+
+    report = render_previews(
+        registrations,
+        paths["paid"],
+        paths["registration"],
+        paths["settings"],
+        str(tmp_path / "previews"),
+        changed_ids={1, 2, 3, 4, 5, 6},
+        workers=2,
+        checklist_dir=str(checklist),
+        chunksize=2,
+    )
+    files = sorted(os.listdir(tmp_path / "previews"))
+    assert report.mails == len(files) == 8
+    assert "2_payment.html" in files and "1_registration.html" not in files
+    assert report.mails_per_second > 0 and "8 mails" in str(report)
+
+    preview = (tmp_path / "previews" / "3_registration.html").read_text()
+    header, body = preview.split("-->\n")
+    assert "To: m3@example.org" in header and "Attachments: checklist.pdf" in header
+    assert body == fill_registration_template(
+        registrations[2], paths["registration"], MAIL_SETTINGS
+    )["body"]
+    assert not any(r.payment_mail_sent for r in registrations)
+
+
+def test_mail_service_without_sender_only_renders(tmp_path) -> None:
+    """Test that mail_service without a send function writes previews and sets no flag."""
+    paths = _write_mail_files(tmp_path)
+    registrations = [_registration(1), _registration(2, payed=True)]
+    mail_service(
+        registrations,
+        paths["paid"],
+        paths["registration"],
+        paths["settings"],
+        "unused",
+        preview_dir=str(tmp_path / "previews"),
+    )
+    assert len(os.listdir(tmp_path / "previews")) == 3
+    assert not any(r.registration_mail_sent for r in registrations)
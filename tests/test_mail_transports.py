@@ -0,0 +1,151 @@
+import email
+import socket
+
+import pytest
+import yagmail
+
+from gdocs_4_ski_automation.core.attachments import AttachmentCache
+from gdocs_4_ski_automation.core.ctypes import (ContactPerson, Name, Payment,
+                                                Registration)
+from gdocs_4_ski_automation.core.mail_services import mail_service
+from gdocs_4_ski_automation.core.mail_transports import SMTPSession
+from gdocs_4_ski_automation.core.rate_limit import TokenBucket
+
+controller_module = pytest.importorskip("aiosmtpd.controller")
+
+TEMPLATE = {"subject": "Registrierungsbestätigung", "body": "<p>Hallo</p>", "attachments": []}
+MAIL_SETTINGS = {"from_email": "kurse@example.org"}
+
+
+class RecordingHandler:
+    """Records the connections and messages the stand-in server receives."""
+
+    def __init__(self) -> None:
+        self.connections = 0
+        self.recipients = []
+        self.messages = []
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.connections += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        self.recipients.extend(envelope.rcpt_tos)
+        self.messages.append(email.message_from_bytes(envelope.content))
+        return "250 OK"
+
+
+@pytest.fixture
+def smtp_server():
+    """Runs a local SMTP stand-in and yields its handler and port."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    handler = RecordingHandler()
+    controller = controller_module.Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    yield handler, port
+    controller.stop()
+
+
+def _connect_to(port: int):
+    def connect(mail_settings, credentials_dir) -> yagmail.SMTP:
+        return yagmail.SMTP(
+            mail_settings["from_email"],
+            host="127.0.0.1",
+            port=port,
+            smtp_ssl=False,
+            smtp_starttls=False,
+            smtp_skip_login=True,
+        )
+
+    return connect
+
+
+def test_session_reuses_connection_up_to_message_cap(smtp_server) -> None:
+    """Test that mails share a connection until the per-connection cap is reached."""
+    handler, port = smtp_server
+    with SMTPSession(_connect_to(port), max_messages=2) as session:
+        for n in range(5):
+            session(f"eltern{n}@example.org", TEMPLATE, MAIL_SETTINGS, "unused")
+    assert handler.recipients == [f"eltern{n}@example.org" for n in range(5)]
+    assert session.sent == 5
+    assert session.connections == handler.connections == 3
+
+
+def test_session_reconnects_after_dropped_connection(smtp_server) -> None:
+    """Test that a dropped connection is reopened and the mail still goes out."""
+    handler, port = smtp_server
+    with SMTPSession(_connect_to(port)) as session:
+        session.send("eltern0@example.org", TEMPLATE, MAIL_SETTINGS, "unused")
+        session._local.client.smtp.sock.shutdown(socket.SHUT_RDWR)
+        session.send("eltern1@example.org", TEMPLATE, MAIL_SETTINGS, "unused")
+    assert handler.recipients == ["eltern0@example.org", "eltern1@example.org"]
+    assert session.connections == 2
+
+
+def test_session_attaches_shared_encoded_parts(smtp_server, tmp_path) -> None:
+    """Test that every email carries the attachment, which is encoded only once."""
+    handler, port = smtp_server
+    checklist = tmp_path / "checklist.pdf"
+    checklist.write_bytes(b"%PDF-1.4 checklist")
+    template = dict(TEMPLATE, attachments=[str(checklist)])
+    cache = AttachmentCache()
+    with SMTPSession(_connect_to(port), attachments=cache) as session:
+        for n in range(3):
+            session.send(f"eltern{n}@example.org", template, MAIL_SETTINGS, "unused")
+    assert (cache.misses, cache.hits) == (1, 2)
+    for message in handler.messages:
+        (part,) = [p for p in message.walk() if p.get_filename()]
+        assert part.get_filename() == "checklist.pdf"
+        assert part.get_payload(decode=True) == b"%PDF-1.4 checklist"
+        (html,) = [p for p in message.walk() if p.get_content_type() == "text/html"]
+        assert "Hallo" in html.get_payload(decode=True).decode()
+
+
+def test_session_gives_up_after_max_attempts() -> None:
+    """Test that an unreachable server raises ConnectionError from send."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    session = SMTPSession(_connect_to(port), max_attempts=2)
+    with pytest.raises(ConnectionError):
+        session.send("eltern0@example.org", TEMPLATE, MAIL_SETTINGS, "unused")
+    assert session.connections == 0
+
+
+def test_concurrent_mail_service_shares_session(smtp_server, tmp_path) -> None:
+    """Test that concurrent workers each send over their own pooled connection."""
+    handler, port = smtp_server
+    (tmp_path / "paid.html").write_text("<p>{{ amount }}</p>")
+    (tmp_path / "registration.html").write_text("<p>{{ course_number }}</p>")
+    (tmp_path / "mail_setting.yaml").write_text(
+        "from_email: kurse@example.org\niban: DE00\nbic: X\ncontact_email: info@example.org\n"
+    )
+    registrations = [
+        Registration(
+            time_stemp="01.10.2024 12:00:00",
+            _id=n,
+            contact=ContactPerson(Name("Eltern", str(n)), "", f"eltern{n}@example.org", ""),
+            participants=(),
+            payment=Payment(amount=100.0, payed=False),
+            registration_mail_sent=False,
+            payment_mail_sent=False,
+        )
+        for n in range(12)
+    ]
+    with SMTPSession(_connect_to(port)) as session:
+        mail_service(
+            registrations,
+            str(tmp_path / "paid.html"),
+            str(tmp_path / "registration.html"),
+            str(tmp_path / "mail_setting.yaml"),
+            "unused",
+            session,
+            workers=3,
+            rate_limit=TokenBucket(rate=1000),
+        )
+    assert sorted(handler.recipients) == sorted(f"eltern{n}@example.org" for n in range(12))
+    assert all(r.registration_mail_sent for r in registrations)
+    assert session.connections <= 3
@@ -0,0 +1,155 @@
+import sqlite3
+
+from test_mail_services import _registration, _write_mail_files
+
+from gdocs_4_ski_automation.core.ctypes import Payment
+from gdocs_4_ski_automation.core.mail_services import mail_service
+from gdocs_4_ski_automation.core.outbox import (DEAD, PENDING,
+                                                REGISTRATION_MAIL, SENT,
+                                                MailOutbox, OutboxMessage)
+
+TEMPLATE = {"subject": "Registrierungsbestätigung", "body": "<p>Hallo</p>", "attachments": []}
+
+
+def test_enqueue_is_idempotent_per_key_and_recipient(tmp_path) -> None:
+    """Test that an email is stored once and replaced only for a new recipient."""
+    with MailOutbox(str(tmp_path / "outbox.sqlite")) as outbox:
+        message = OutboxMessage(1, REGISTRATION_MAIL, "a@example.org", TEMPLATE)
+        assert outbox.enqueue(message)
+        assert not outbox.enqueue(message)
+        outbox.enqueue(OutboxMessage(2, REGISTRATION_MAIL, "b@example.org", TEMPLATE))
+        outbox.mark_sent([(1, REGISTRATION_MAIL)])
+        assert not outbox.enqueue(message)
+
+        # the rows were reordered and ID 1 now belongs to someone else
+        assert outbox.enqueue(OutboxMessage(1, REGISTRATION_MAIL, "c@example.org", TEMPLATE))
+        assert outbox.statuses() == {
+            (1, REGISTRATION_MAIL, "c@example.org"): PENDING,
+            (2, REGISTRATION_MAIL, "b@example.org"): PENDING,
+        }
+        assert [m.to_email for m in outbox.pending()] == ["b@example.org", "c@example.org"]
+
+
+def test_failing_emails_are_given_up_and_sent_ones_pruned(tmp_path) -> None:
+    """Test that an email failing too often stops taking the drain limit of later runs."""
+    with MailOutbox(str(tmp_path / "outbox.sqlite"), max_attempts=2) as outbox:
+        outbox.enqueue(OutboxMessage(1, REGISTRATION_MAIL, "gibts@nicht", TEMPLATE))
+        outbox.enqueue(OutboxMessage(2, REGISTRATION_MAIL, "b@example.org", TEMPLATE))
+        outbox.mark_failed([((1, REGISTRATION_MAIL), "550 no such user")])
+        assert [m.registration_id for m in outbox.pending(limit=1)] == [1]
+        outbox.mark_failed([((1, REGISTRATION_MAIL), "550 no such user")])
+        assert [m.registration_id for m in outbox.pending(limit=1)] == [2]
+        assert outbox.statuses()[(1, REGISTRATION_MAIL, "gibts@nicht")] == DEAD
+
+        # a corrected address is delivered again
+        assert outbox.enqueue(OutboxMessage(1, REGISTRATION_MAIL, "a@example.org", TEMPLATE))
+        assert [m.registration_id for m in outbox.pending()] == [2, 1]
+
+        outbox.mark_sent([(2, REGISTRATION_MAIL)])
+        assert outbox.prune(max_age=60) == 0
+        assert outbox.prune(max_age=-60) == 1
+        assert outbox.statuses() == {(1, REGISTRATION_MAIL, "a@example.org"): PENDING}
+
+
+def test_pending_emails_follow_edits_of_the_registration(tmp_path) -> None:
+    """Test that an email waiting for delivery is sent with the current registration."""
+    paths = _write_mail_files(tmp_path)
+    outbox_path = str(tmp_path / "outbox.sqlite")
+    bodies = []
+
+    def send(to_email, template, *args) -> None:
+        bodies.append(template["body"])
+
+    def run(registration, drain_limit=None) -> None:
+        with MailOutbox(outbox_path) as outbox:
+            mail_service(
+                [registration],
+                paths["paid"],
+                paths["registration"],
+                paths["settings"],
+                "unused",
+                send,
+                outbox=outbox,
+                drain_limit=drain_limit,
+            )
+
+    # queued behind the drain limit, then the form response is edited
+    registration = _registration(1)
+    run(registration, drain_limit=0)
+    registration.payment = Payment(amount=240.0, payed=False)
+    run(registration)
+    (body,) = bodies
+    assert "240" in body and "120" not in body
+
+    with MailOutbox(outbox_path) as outbox:
+        message = OutboxMessage(1, REGISTRATION_MAIL, "m1@example.org", TEMPLATE)
+        # a sent email stays as it was delivered
+        assert not outbox.enqueue(message)
+        outbox.enqueue(OutboxMessage(2, REGISTRATION_MAIL, "b@example.org", TEMPLATE))
+        edited = dict(TEMPLATE, body="<p>Hallo, neu</p>")
+        assert outbox.enqueue(OutboxMessage(2, REGISTRATION_MAIL, "b@example.org", edited))
+        assert [m.template for m in outbox.pending()] == [edited]
+
+def test_attachments_survive_the_outbox(tmp_path) -> None:
+    """Test that queued emails keep their attachments, also in an outbox from before."""
+    path = str(tmp_path / "outbox.sqlite")
+    with sqlite3.connect(path) as db:
+        db.execute(
+            "CREATE TABLE outbox (registration_id INTEGER NOT NULL, kind TEXT NOT NULL, "
+            "to_email TEXT NOT NULL, subject TEXT NOT NULL, body TEXT NOT NULL, "
+            "status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, last_error TEXT, "
+            "enqueued_at REAL NOT NULL, sent_at REAL, PRIMARY KEY (registration_id, kind))"
+        )
+        db.execute(
+            "INSERT INTO outbox VALUES "
+            "(1, 'payment', 'a@example.org', 's', 'b', 'pending', 0, NULL, 0, NULL)"
+        )
+    db.close()
+
+    template = dict(TEMPLATE, attachments=["data/mails/checklist.pdf"])
+    with MailOutbox(path) as outbox:
+        outbox.enqueue(OutboxMessage(2, REGISTRATION_MAIL, "b@example.org", template))
+        old, new = outbox.pending()
+    assert old.template["attachments"] == []
+    assert new.template == template
+
+
+def test_interrupted_run_resumes_without_resending(tmp_path) -> None:
+    """Test that emails delivered by an earlier run are not sent again."""
+    paths = _write_mail_files(tmp_path)
+    outbox_path = str(tmp_path / "outbox.sqlite")
+    sent = []
+    offline = {"m4@example.org"}
+
+    def send(to_email, template, *args) -> None:
+        if to_email in offline:
+            raise ConnectionError("connection dropped")
+        sent.append(to_email)
+
+    def run(registrations, drain_limit=None) -> None:
+        with MailOutbox(outbox_path) as outbox:
+            mail_service(
+                registrations,
+                paths["paid"],
+                paths["registration"],
+                paths["settings"],
+                "unused",
+                send,
+                outbox=outbox,
+                drain_limit=drain_limit,
+                workers=2,
+            )
+
+    first = [_registration(n) for n in range(1, 6)]
+    run(first, drain_limit=4)
+    assert sorted(sent) == [f"m{n}@example.org" for n in range(1, 4)]
+    assert [r.registration_mail_sent for r in first] == [True, True, True, False, False]
+
+    # the flags of the first run never reached the sheet
+    offline.clear()
+    second = [_registration(n) for n in range(1, 6)]
+    run(second)
+    assert sorted(sent) == [f"m{n}@example.org" for n in range(1, 6)]
+    assert all(r.registration_mail_sent for r in second)
+    with MailOutbox(outbox_path) as outbox:
+        assert set(outbox.statuses().values()) == {SENT}
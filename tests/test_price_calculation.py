@@ -1,9 +1,33 @@
+import itertools
 
-from gdocs_4_ski_automation.core.price_calculation import get_price
+import pytest
+
+from gdocs_4_ski_automation.core.price_calculation import (PriceCache,
+                                                           PriceTable,
+                                                           get_price as get_single_price,
+                                                           get_prices, to_price_columns)
 from gdocs_4_ski_automation.core.ctypes import Course, Participant, Name
 
 
-def test_price_calc0() -> None:
+def get_batch_price(participants, date, prices) -> float:
+    """Prices a single registration through the vectorized batch path."""
+    courses, ages, counts = to_price_columns([participants])
+    return float(get_prices(courses, ages, [date], counts, prices)[0])
+
+
+# shared on purpose, the test cases use different prices and exercise invalidation
+MEMO = PriceCache(maxsize=4)
+
+
+@pytest.fixture(
+    params=[get_single_price, get_batch_price, MEMO.get_price], ids=["single", "batch", "memo"]
+)
+def get_price(request):
+    """Runs every test case against get_price, the batch path and the price cache."""
+    return request.param
+
+
+def test_price_calc0(get_price) -> None:
     """Test price calculation for a single child participant without early bird discount."""
     participants = [Participant(
         name = Name("Max", "Mustermann"),
@@ -24,7 +48,7 @@ def test_price_calc0() -> None:
     assert get_price(participants,date,prices=prices) == 200
 
 
-def test_price_calc1() -> None:
+def test_price_calc1(get_price) -> None:
     """Test price calculation for two child participants with early bird discount."""
     participants = [Participant(
         name = Name("Max", "Mustermann"),
@@ -50,7 +74,7 @@ def test_price_calc1() -> None:
     }
     assert get_price(participants,date,prices=prices) == 360
 
-def test_price_calc2() -> None:
+def test_price_calc2(get_price) -> None:
     """Test price calculation for two adult participants with early bird discount."""
     participants = [Participant(
         name = Name("Max", "Mustermann"),
@@ -76,7 +100,7 @@ def test_price_calc2() -> None:
     }
     assert get_price(participants,date,prices=prices) == 560
 
-def test_price_calc3() -> None:
+def test_price_calc3(get_price) -> None:
     """Test price calculation for mixed age participants with early bird discount."""
     participants = [Participant(
         name = Name("Max", "Mustermann"),
@@ -103,7 +127,7 @@ def test_price_calc3() -> None:
     assert get_price(participants,date,prices=prices) == 460
 
 
-def test_price_calc4() -> None:
+def test_price_calc4(get_price) -> None:
     """Test price calculation for mixed courses with family discount but no early bird discount."""
     participants = [Participant(
         name = Name("Max", "Mustermann"),
@@ -144,7 +168,7 @@ def test_price_calc4() -> None:
     }
     assert get_price(participants,date,prices=prices) == (100+100+300+200)-(2*5)
 
-def test_price_calc5() -> None:
+def test_price_calc5(get_price) -> None:
     """Test price calculation for mixed courses with both family and early bird discounts."""
     participants = [Participant(
         name = Name("Max", "Mustermann"),
@@ -183,4 +207,115 @@ def test_price_calc5() -> None:
         "FruehbucherRabatt": 20,
         "FruehbucherRabattDatum": "01.01.2025",
     }
-    assert get_price(participants,date,prices=prices) == (100+100+300+200)-(4*20)-(2*5)
\ No newline at end of file
+    assert get_price(participants,date,prices=prices) == (100+100+300+200)-(4*20)-(2*5)
+
+def test_price_table_matches_dict(get_price) -> None:
+    """Test that a parsed PriceTable prices like the raw string dictionary of the Preise sheet."""
+    participants = [Participant(
+        name = Name("Max", "Mustermann"),
+        age=age,
+        course=course,
+        pre_course="",
+        notes="",
+    ) for age, course in [(3, Course.ZWEGERL), (9, Course.SKI), (40, Course.SNOWBOARD)]]
+    prices = {
+        "Zwergerl": "100",
+        "Kind": "200",
+        "Erwachsen": "300",
+        "FamilienRabatt": "5",
+        "FruehbucherRabatt": "20",
+        "FruehbucherRabattDatum": "01.01.2025",
+    }
+    table = PriceTable.from_prices(prices)
+    for date in ["31.12.2024 23:59:59", "01.01.2025 00:00:00", "01.01.2025 00:00:01"]:
+        assert get_price(participants, date, table) == get_price(participants, date, prices)
+    assert get_price(participants, "01.01.2025 00:00:00", table) == 600 - 3 * 20 - 5
+
+
+
+def test_batch_prices_match_single_prices() -> None:
+    """Test that pricing a whole season at once matches pricing each registration."""
+    courses = list(Course)
+    season = [
+        [
+            Participant(Name("Max", "Mustermann"), (n * 7 + k * 13) % 60, courses[(n + k) % 4], "", "")
+            for k in range(n % 9)
+        ]
+        for n in range(200)
+    ]
+    dates = [f"{1 + n % 28:02d}.{1 + n % 12:02d}.2024 {n % 24:02d}:00:00" for n in range(200)]
+    prices = {
+        "Zwergerl": "99.9",
+        "Kind": "135.35",
+        "Erwachsen": "160.1",
+        "FamilienRabatt": "7.7",
+        "FruehbucherRabatt": "15.3",
+        "FruehbucherRabattDatum": "15.06.2024",
+    }
+    courses, ages, counts = to_price_columns(season)
+    batch = get_prices(courses, ages, dates, counts, prices)
+    assert list(batch) == [get_single_price(ps, d, prices) for ps, d in zip(season, dates)]
+
+
+def test_price_cache_hits_and_invalidation() -> None:
+    """Test that registrations of the same shape share one cached price."""
+    table = PriceTable.from_prices(
+        {
+            "Zwergerl": "100",
+            "Kind": "135",
+            "Erwachsen": "160",
+            "FamilienRabatt": "10",
+            "FruehbucherRabatt": "15",
+            "FruehbucherRabattDatum": "15.10.2024",
+        }
+    )
+    ski_kid = Participant(Name("A", "B"), 8, Course.SKI, "", "")
+    other_ski_kid = Participant(Name("C", "D"), 12, Course.SKI, "", "")
+    zwergerl = Participant(Name("E", "F"), 4, Course.ZWEGERL, "", "")
+    cache = PriceCache(maxsize=2)
+
+    early = "01.10.2024 10:00:00"
+    assert cache.get_price([ski_kid, zwergerl], early, table) == 205
+    assert cache.get_price([zwergerl, other_ski_kid], "02.10.2024 11:00:00", table) == 205
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # after the cutoff is a different signature
+    assert cache.get_price([ski_kid], "16.10.2024 10:00:00", table) == 135
+    assert cache.get_price([zwergerl], early, table) == 85
+    assert len(cache) == 2 and cache.misses == 3
+    # the least recently used signature was evicted
+    assert cache.get_price([ski_kid, zwergerl], early, table) == 205
+    assert cache.misses == 4
+
+    # a changed price table drops the cached prices
+    cheaper = PriceTable.from_prices(
+        {"Zwergerl": "90", "Kind": "135", "Erwachsen": "160",
+         "FruehbucherRabatt": "15", "FruehbucherRabattDatum": "15.10.2024"}
+    )
+    assert cache.get_price([zwergerl], early, cheaper) == 75
+    assert len(cache) == 1 and cache.misses == 5
+
+
+def test_price_cache_matches_get_price_for_fractional_prices() -> None:
+    """Test that cached prices equal get_price for every order of the participants."""
+    table = PriceTable.from_prices(
+        {
+            "Zwergerl": "99.9",
+            "Kind": "135.35",
+            "Erwachsen": "160.1",
+            "FamilienRabatt": "7.7",
+            "FruehbucherRabatt": "15.3",
+            "FruehbucherRabattDatum": "15.10.2024",
+        }
+    )
+    kinds = [
+        Participant(Name("A", "B"), 4, Course.ZWEGERL, "", ""),
+        Participant(Name("C", "D"), 9, Course.SKI, "", ""),
+        Participant(Name("E", "F"), 40, Course.SNOWBOARD, "", ""),
+    ]
+    cache = PriceCache()
+    for date in ["01.10.2024 10:00:00", "16.10.2024 10:00:00"]:
+        for count in range(1, 6):
+            for shape in itertools.product(kinds, repeat=count):
+                assert cache.get_price(shape, date, table) == get_single_price(shape, date, table)
+    assert cache.hits > 0
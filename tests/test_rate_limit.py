@@ -0,0 +1,40 @@
+import threading
+
+import pytest
+
+from gdocs_4_ski_automation.core.rate_limit import TokenBucket
+
+
+class FakeClock:
+    """Clock whose sleep advances the time instead of waiting."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.lock = threading.Lock()
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        with self.lock:
+            self.now += seconds
+
+
+def test_token_bucket_allows_burst_then_paces() -> None:
+    """Test that a full bucket serves a burst and then one token per 1/rate seconds."""
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, capacity=3, clock=clock, sleep=clock.sleep)
+    assert [bucket.acquire() for _ in range(3)] == [0, 0, 0]
+    assert bucket.acquire() == pytest.approx(0.5)
+    assert bucket.acquire() == pytest.approx(0.5)
+    assert clock.now == pytest.approx(1.0)
+
+    clock.now += 10
+    assert [bucket.acquire() for _ in range(3)] == [0, 0, 0]
+    assert bucket.waited == pytest.approx(1.0)
+
+
+def test_token_bucket_rejects_non_positive_rate() -> None:
+    """Test that a bucket without refill cannot be built."""
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0)
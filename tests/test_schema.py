@@ -0,0 +1,49 @@
+import pandas as pd
+import pytest
+from sheet_samples import DB_HEADERS, PRICES, make_db_row, make_db_rows
+
+from gdocs_4_ski_automation.core.factories import (
+    build_paid_index, dataframe_to_registration_mapper, map_settings_to_price_dict,
+    rows_to_registration_mapper)
+from gdocs_4_ski_automation.core.schema import RegistrationSchema, make_headers_unique
+
+
+def test_rows_mapper_matches_dataframe_mapper() -> None:
+    """Test that decoding raw rows gives the same registrations as the DataFrame path."""
+    headers = list(make_headers_unique(DB_HEADERS))
+    rows = make_db_rows(20)
+    rows[3] = [""] * len(DB_HEADERS)
+    rows[7][-1] = "8"
+    settings_frame = {"Preise": pd.DataFrame(PRICES[1:], columns=PRICES[0])}
+    registrations_frame = {"Bezahlung": pd.DataFrame([["8", "TRUE"]], columns=["ID", "Bezahlt"])}
+
+    expected = list(
+        dataframe_to_registration_mapper(
+            {"Formularantworten": pd.DataFrame(rows, columns=headers)},
+            settings_frame,
+            registrations_frame,
+        )
+    )
+    decoded = list(
+        rows_to_registration_mapper(
+            rows,
+            RegistrationSchema.compile(headers),
+            map_settings_to_price_dict(settings_frame),
+            build_paid_index(registrations_frame),
+        )
+    )
+    assert decoded == expected
+    assert len(decoded) == 19
+    assert decoded[6].payment.payed
+
+
+def test_rows_mapper_rejects_unknown_course() -> None:
+    """Test that an unknown course raises like build_participant does."""
+    headers = list(make_headers_unique(DB_HEADERS))
+    row = make_db_row("01.10.2024 12:00:00", ("Eva", "Muster"), [("Ben", "Muster", 8, "Rodeln")])
+    with pytest.raises(ValueError):
+        list(
+            rows_to_registration_mapper(
+                [row], RegistrationSchema.compile(headers), {"Kind": "100"}, {}
+            )
+        )
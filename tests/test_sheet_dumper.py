@@ -0,0 +1,268 @@
+import time
+
+from fake_gspread import FakeClient
+
+from gdocs_4_ski_automation.core.ctypes import (ContactPerson, Course, Name,
+                                                Participant, Payment,
+                                                Registration)
+from gdocs_4_ski_automation.core.sheet_dumper import GDocsDumper
+from gdocs_4_ski_automation.core.sheet_writer import (SheetWrites, TableExtent,
+                                                      WritePlan, diff_table)
+
+SHEET_IDS = {"registrations": "registrations-id", "db": "db-id"}
+TABS = ["Übersicht", "Bezahlung", "Mitglied", "Zwergerl", "Kurse"]
+
+
+def _registration(_id: int, courses, payed: bool = False) -> Registration:
+    return Registration(
+        time_stemp="01.10.2024 12:00:00",
+        _id=_id,
+        contact=ContactPerson(
+            Name("Eltern", f"Familie{_id}"), "Str. 1", f"m{_id}@example.org", "0123"
+        ),
+        participants=tuple(
+            Participant(Name(f"Kind{n}", f"Familie{_id}"), 4 + n, course, "Nein", "")
+            for n, course in enumerate(courses)
+        ),
+        payment=Payment(amount=100.0 * len(courses), payed=payed),
+        registration_mail_sent=True,
+        payment_mail_sent=payed,
+    )
+
+
+def _client(registrations) -> FakeClient:
+    stale = [[""] * 10 for _ in range(2)] + [["alt"] * 10 for _ in range(8)]
+    db = [["Zeitstempel"] + [""] * 59] + [[""] * 60 for _ in registrations]
+    return FakeClient(
+        {
+            SHEET_IDS["registrations"]: {title: [row[:] for row in stale] for title in TABS},
+            SHEET_IDS["db"]: {"Formularantworten": db},
+        }
+    )
+
+
+def test_write_plan_sends_one_clear_and_one_update() -> None:
+    """Test that writes to several worksheets are flushed in two requests."""
+    client = FakeClient({"key": {"A": [["x", "x"], ["x", "x"]], "B": []}})
+    plan = WritePlan(client, "key")
+    plan.add(SheetWrites("A", [{"range": "B2", "values": [[1]]}], clears=["A1:B2"]))
+    plan.add(SheetWrites("B", [{"range": "A1", "values": [["a", "b"], ["c"]]}]))
+    assert len(plan) == 3
+    assert plan.flush() == 2
+    assert client.requests == [("values_batch_clear", "key"), ("values_batch_update", "key")]
+    assert client.spreadsheets["key"]._worksheets["A"].values == [["", ""], ["", 1]]
+    assert client.spreadsheets["key"]._worksheets["B"].values == [["a", "b"], ["c"]]
+    assert len(plan) == 0 and plan.flush() == 0
+
+
+def test_diff_table_merges_changed_rows_into_runs() -> None:
+    """Test that consecutive changed rows are written as one range of the changed columns."""
+    old = [[1, "a", False], [2, "b", False], [3, "c", False], [4, "d", False], [5, "e", 1]]
+    new = [[1, "a", False], [2, "x", False], [3, "c", True], [4, "d", False], [5, "e", True]]
+    assert diff_table("A3", 3, old, new) == (
+        [
+            {"range": "B4", "values": [["x", False], ["c", True]]},
+            {"range": "C7", "values": [[True]]},
+        ],
+        [],
+    )
+    assert diff_table("B2", 3, old, new[:2] + [[9]]) == (
+        [{"range": "B3", "values": [[2, "x", False], [9, "", ""]]}],
+        ["B5:D6"],
+    )
+
+
+def test_dump_registrations_writes_the_workbook_in_two_requests() -> None:
+    """Test that all tabs of the registrations sheet are written by one request pair."""
+    registrations = [
+        _registration(1, [Course.SNOWBOARD]),
+        _registration(2, [Course.SKI, Course.ZWEGERL], payed=True),
+    ]
+    client = _client(registrations)
+    start = time.perf_counter()
+    dumper = GDocsDumper(registrations, SHEET_IDS, client)
+    dumper.dump_registrations()
+    assert time.perf_counter() - start < 0.3
+
+    key = SHEET_IDS["registrations"]
+    # without previous extents the grid sizes are read once
+    assert [r for r in client.requests if r[1] == key] == [
+        ("fetch_sheet_metadata", key),
+        ("values_batch_clear", key),
+        ("values_batch_update", key),
+    ]
+    assert dumper.extents["Kurse"] == TableExtent(rows=2, grid_rows=1000)
+    sheets = client.spreadsheets[key]._worksheets
+    assert sheets["Übersicht"].read("B4:B7") == [[1], [2], [3], [2]]
+    assert sheets["Bezahlung"].read("A3:G4") == [
+        [1, "Eltern", "Familie1", "m1@example.org", "0123", 100.0, False],
+        [2, "Eltern", "Familie2", "m2@example.org", "0123", 200.0, True],
+    ]
+    assert sheets["Bezahlung"].read("G1") == [["Insgesamt Bezahlt: 1/2"]]
+    # stale rows below the new data are cleared on every table
+    assert sheets["Zwergerl"].read("A3:I10") == [
+        ["ski", "Kind1", "Familie2", 5, "m2@example.org", "0123", "Eltern", "Familie2"]
+    ]
+    assert sheets["Kurse"].read("A3:B4") == [["snowboard", "Kind0"], ["ski", "Kind0"]]
+    assert sheets["Kurse"].read("A5:J10") == []
+    assert sheets["Mitglied"].read("A5:A5") == [[2]]
+    assert sheets["Mitglied"].read("A6:G10") == []
+    assert sheets["Bezahlung"].read("A5:G10") == []
+    assert sheets["Mitglied"].read("H6") == [["alt"]]
+
+    flags = client.spreadsheets[SHEET_IDS["db"]]._worksheets["Formularantworten"]
+    assert flags.read("BE2:BH3") == [[100.0, "TRUE", "FALSE", "1"], [200.0, "TRUE", "TRUE", "2"]]
+
+
+def test_known_extents_blank_stale_rows_in_the_update() -> None:
+    """Test that with known extents a shrunk table is blanked by the one update."""
+    registrations = [_registration(i, [Course.SKI]) for i in range(1, 5)]
+    client = _client(registrations)
+    first = GDocsDumper(registrations, SHEET_IDS, client)
+    first.dump_registrations()
+
+    client.requests.clear()
+    client.writes.clear()
+    second = GDocsDumper(registrations[:1], SHEET_IDS, client, extents=first.extents)
+    second.dump_registrations()
+
+    key = SHEET_IDS["registrations"]
+    assert [r for r in client.requests if r[1] == key] == [("values_batch_update", key)]
+    kurse = client.spreadsheets[key]._worksheets["Kurse"]
+    assert kurse.read("A3:C10") == [["ski", "Kind0", "Familie1"]]
+    assert second.extents["Kurse"] == TableExtent(rows=1, grid_rows=1000)
+
+
+def test_dump_registrations_grows_the_grid_past_1000_rows() -> None:
+    """Test that a table longer than the grid gets rows appended before it is written."""
+    registrations = [_registration(i, [Course.SKI, Course.SKI]) for i in range(1, 601)]
+    client = _client(registrations)
+    extents = {title: TableExtent(rows=0, grid_rows=1000) for title in TABS[1:]}
+    dumper = GDocsDumper(registrations, SHEET_IDS, client, extents=extents)
+    dumper.dump_registrations()
+
+    key = SHEET_IDS["registrations"]
+    assert [r for r in client.requests if r[1] == key] == [
+        ("fetch_sheet_metadata", key),
+        ("batch_update", key),
+        ("values_batch_update", key),
+    ]
+    kurse = client.spreadsheets[key]._worksheets["Kurse"]
+    assert kurse.row_count == 1202
+    assert kurse.read("B1202:C1202") == [["Kind1", "Familie600"]]
+    assert dumper.extents["Kurse"] == TableExtent(rows=1200, grid_rows=1202)
+    assert dumper.extents["Bezahlung"] == TableExtent(rows=600, grid_rows=1000)
+
+
+
+def test_dump_registrations_grows_a_grid_smaller_than_known() -> None:
+    """Test that a grid shrunk since the last run is grown and the writes are repeated."""
+    registrations = [_registration(i, [Course.SKI]) for i in range(1, 5)]
+    client = _client(registrations)
+    first = GDocsDumper(registrations, SHEET_IDS, client)
+    first.dump_registrations()
+    key = SHEET_IDS["registrations"]
+    kurse = client.spreadsheets[key]._worksheets["Kurse"]
+    # rows deleted by hand, the stored extent still claims 1000 grid rows
+    kurse.row_count = 4
+
+    client.requests.clear()
+    second = GDocsDumper(registrations, SHEET_IDS, client, extents=first.extents)
+    second.dump_registrations()
+
+    assert [r for r in client.requests if r[1] == key] == [
+        ("values_batch_update", key),
+        ("fetch_sheet_metadata", key),
+        ("batch_update", key),
+        ("values_batch_update", key),
+    ]
+    assert kurse.row_count == 6
+    assert kurse.read("A6:B6") == [["ski", "Kind0"]]
+    assert second.extents["Kurse"] == TableExtent(rows=4, grid_rows=6)
+    assert second.extents["Bezahlung"] == TableExtent(rows=4, grid_rows=1000)
+
+def test_dump_mail_flags_writes_rows_by_id_without_reading() -> None:
+    """Test that flags land in the row of their ID, in one block and without any read."""
+    # the form response of row 3 (ID 2) was emptied, so it has no registration
+    registrations = [_registration(3, [Course.SKI], payed=True), _registration(1, [Course.SKI])]
+    client = _client(registrations + [None])
+    flags = client.spreadsheets[SHEET_IDS["db"]]._worksheets["Formularantworten"]
+    flags.write("BE3:BH3", [["alt", "alt", "alt", "alt"]])
+
+    GDocsDumper(registrations, SHEET_IDS, client).dump_mail_flags()
+
+    assert client.requests == [("values_batch_update", SHEET_IDS["db"])]
+    assert [u["range"] for u in client.writes[0]["data"]] == ["'Formularantworten'!BE2:BH4"]
+    assert flags.read("BE2:BH4") == [
+        [100.0, "TRUE", "FALSE", "1"],
+        ["alt", "alt", "alt", "alt"],
+        [100.0, "TRUE", "TRUE", "3"],
+    ]
+
+
+def test_dump_mail_flags_writes_only_changed_rows_in_runs() -> None:
+    """Test that with changed IDs only their rows are written, one range per run."""
+    registrations = [_registration(i, [Course.SKI]) for i in range(1, 7)]
+    client = _client(registrations)
+    GDocsDumper(registrations, SHEET_IDS, client, changed_ids={5, 1, 2}).dump_mail_flags()
+
+    assert [u["range"] for u in client.writes[0]["data"]] == [
+        "'Formularantworten'!BE2:BH3",
+        "'Formularantworten'!BE6:BH6",
+    ]
+    flags = client.spreadsheets[SHEET_IDS["db"]]._worksheets["Formularantworten"]
+    assert flags.read("BH2:BH7") == [["1"], ["2"], [], [], ["5"]]
+
+    client.requests.clear()
+    GDocsDumper(registrations, SHEET_IDS, client, changed_ids=set()).dump_mail_flags()
+    assert client.requests == []
+
+
+def test_diff_mode_writes_only_changed_cells() -> None:
+    """Test that a diff dump writes changed cells, clears removed rows and nothing else."""
+    registrations = [
+        _registration(1, [Course.SKI]),
+        _registration(2, [Course.SNOWBOARD, Course.ZWEGERL]),
+        _registration(3, [Course.SKI]),
+    ]
+    client = _client(registrations)
+    first = GDocsDumper(registrations, SHEET_IDS, client)
+    first.dump_registrations()
+
+    # registration 2 paid, registration 3 cancelled
+    registrations = [registrations[0], _registration(2, [Course.SNOWBOARD, Course.ZWEGERL], True)]
+    client.requests.clear()
+    client.writes.clear()
+    GDocsDumper(
+        registrations, SHEET_IDS, client, diff=True, extents=first.extents
+    ).dump_registrations()
+
+    key = SHEET_IDS["registrations"]
+    assert [r for r in client.requests if r[1] == key] == [
+        ("values_batch_get", key),
+        ("values_batch_clear", key),
+        ("values_batch_update", key),
+    ]
+    clear, update = client.writes[:2]
+    assert clear["ranges"] == ["'Bezahlung'!A5:G5", "'Mitglied'!A6:G6", "'Kurse'!A5:J5"]
+    updates = {u["range"]: u["values"] for u in update["data"]}
+    updates.pop("'Übersicht'!B19", None)  # time of the run
+    assert set(updates) == {
+        *(f"'Übersicht'!B{row}" for row in (5, 6, 7, 10, 11, 12, 15, 16)),
+        "'Bezahlung'!G4",
+        "'Bezahlung'!G1",
+        "'Kurse'!G1",
+    }
+    assert updates["'Bezahlung'!G4"] == [[True]]
+    assert updates["'Bezahlung'!G1"] == [["Insgesamt Bezahlt: 1/2"]]
+
+    # nothing changed, nothing but the run time is written
+    client.writes.clear()
+    GDocsDumper(registrations, SHEET_IDS, client, diff=True).dump_registrations()
+    ranges = [
+        u["range"]
+        for body in client.writes
+        for u in body.get("data", [])
+        if not u["range"].startswith("'Formularantworten'")
+    ]
+    assert ranges in ([], ["'Übersicht'!B19"])
@@ -0,0 +1,53 @@
+from fake_gspread import FakeClient
+from sheet_samples import SHEET_IDS, make_db_rows, make_spreadsheets
+
+from gdocs_4_ski_automation.core.factories import GDocsRegistrationFactory
+
+
+def test_factory_reads_each_spreadsheet_with_one_request() -> None:
+    """Test that the factory issues one batch get per spreadsheet and nothing else."""
+    client = FakeClient(make_spreadsheets(make_db_rows(4)))
+    factory = GDocsRegistrationFactory(SHEET_IDS, client)
+    assert sorted(client.requests) == sorted(
+        ("values_batch_get", sheet_id) for sheet_id in SHEET_IDS.values()
+    )
+    assert len(factory.build_registrations()) == 4
+    assert list(factory.settings_frame["Preise"].columns) == ["Kategorie", "Preis"]
+    assert "Bezahlt" in factory.registrations_frame["Bezahlung"].columns
+
+
+def test_projected_chunked_read_matches_full_read(tmp_path) -> None:
+    """Test that column projection and chunking give the same registrations."""
+    rows = make_db_rows(23)
+    rows[5][1] = "Nein"
+    full = GDocsRegistrationFactory(SHEET_IDS, FakeClient(make_spreadsheets(rows)))
+
+    client = FakeClient(make_spreadsheets(rows))
+    projected = GDocsRegistrationFactory(SHEET_IDS, client, projected=True, chunk_rows=10)
+    assert projected.build_registrations() == full.build_registrations()
+    # header row, then three chunks of 10 rows
+    assert client.requests.count(("values_batch_get", SHEET_IDS["db"])) == 4
+    # unused columns like the membership answer are not downloaded
+    assert all(row[1] == "" for row in projected.db_rows)
+
+    state_path = str(tmp_path / "state.pkl")
+    first = GDocsRegistrationFactory(
+        SHEET_IDS, FakeClient(make_spreadsheets(rows)), state_path, projected=True
+    )
+    first.store_state(first.build_registrations())
+    rows += make_db_rows(3, start=23)
+    incremental = GDocsRegistrationFactory(
+        SHEET_IDS, FakeClient(make_spreadsheets(rows)), state_path, projected=True
+    )
+    assert len(incremental.db_rows) == 26
+
+
+def test_chunked_read_continues_after_blank_rows() -> None:
+    """Test that a cleared row at the end of a chunk does not end the read."""
+    rows = make_db_rows(7)
+    rows[2] = [""] * len(rows[2])
+    factory = GDocsRegistrationFactory(
+        SHEET_IDS, FakeClient(make_spreadsheets(rows)), projected=True, chunk_rows=3
+    )
+    assert len(factory.db_rows) == 7
+    assert len(factory.build_registrations()) == 6
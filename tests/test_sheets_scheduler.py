@@ -0,0 +1,111 @@
+import json
+from typing import Any, Dict, List, Optional
+
+import pytest
+import requests
+from gspread.exceptions import APIError
+from test_rate_limit import FakeClock
+
+from gdocs_4_ski_automation.core.sheets_scheduler import (ScheduledHTTPClient,
+                                                          SheetsScheduler)
+
+
+def _response(status: int, headers: Optional[Dict[str, str]] = None) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    response._content = json.dumps({"error": {"code": status, "message": "test"}}).encode()
+    return response
+
+
+def _scheduler(clock: FakeClock, **kwargs: Any) -> SheetsScheduler:
+    return SheetsScheduler(clock=clock, sleep=clock.sleep, jitter=lambda: 0.5, **kwargs)
+
+
+class FlakyRequest:
+    """Request answered by the given responses in turn, then with the result."""
+
+    def __init__(self, responses: List[requests.Response]) -> None:
+        self.responses = responses
+        self.calls = 0
+
+    def __call__(self) -> str:
+        self.calls += 1
+        if self.responses:
+            raise APIError(self.responses.pop(0))
+        return "ok"
+
+
+def test_scheduler_honors_retry_after_and_slows_down() -> None:
+    """Test that a throttled request waits as asked and halves the rate of its quota."""
+    clock = FakeClock()
+    scheduler = _scheduler(clock)
+    request = FlakyRequest([_response(429, {"Retry-After": "7"})])
+    assert scheduler.run(request, write=True) == "ok"
+
+    assert request.calls == 2
+    assert clock.now == pytest.approx(7)
+    assert (scheduler.requests, scheduler.retries, scheduler.throttled) == (2, 1, 1)
+    # halved by the 429, then given back a tenth by the success
+    assert scheduler.writes.rate == pytest.approx(50 / 60 * 0.6)
+    assert scheduler.reads.rate == pytest.approx(50 / 60)
+
+
+def test_scheduler_backs_off_with_jitter_on_server_errors() -> None:
+    """Test that 5xx answers are repeated after a growing backoff and then raised."""
+    clock = FakeClock()
+    scheduler = _scheduler(clock, max_attempts=3)
+    request = FlakyRequest([_response(503), _response(500), _response(502)])
+    with pytest.raises(APIError):
+        scheduler.run(request)
+
+    assert request.calls == 3
+    # backoff of 1s and 2s, each jittered to three quarters
+    assert scheduler.backed_off == pytest.approx(0.75 + 1.5)
+    assert scheduler.counters()["failed"] == 3
+
+
+def test_scheduler_raises_client_errors_at_once() -> None:
+    """Test that errors other than quota, timeout and server errors are not repeated."""
+    scheduler = _scheduler(FakeClock())
+    request = FlakyRequest([_response(400)])
+    with pytest.raises(APIError):
+        scheduler.run(request)
+    assert (request.calls, scheduler.retries) == (1, 0)
+
+
+def test_scheduler_paces_requests_to_the_quota() -> None:
+    """Test that after a burst the requests are paced so a minute stays within quota."""
+    clock = FakeClock()
+    scheduler = _scheduler(clock, reads_per_minute=20, writes_per_minute=20, burst=5)
+    for _ in range(20):
+        scheduler.run(lambda: None)
+    assert clock.now == pytest.approx(60)
+
+
+class FakeSession:
+    """Session answering every request with 200 and recording the methods."""
+
+    def __init__(self) -> None:
+        self.methods: List[str] = []
+
+    def request(self, method: str, **kwargs: Any) -> requests.Response:
+        self.methods.append(method)
+        return _response(200)
+
+
+def test_scheduled_http_client_routes_requests_through_the_scheduler() -> None:
+    """Test that the gspread client takes read tokens for GET and write tokens otherwise."""
+    clock = FakeClock()
+    scheduler = _scheduler(clock, reads_per_minute=20, writes_per_minute=20, burst=1)
+    session = FakeSession()
+    client = ScheduledHTTPClient(None, session, scheduler=scheduler)
+
+    client.values_batch_get("sheet", ["A1"])
+    client.values_batch_update("sheet", body={"data": []})
+    client.values_batch_clear("sheet", body={"ranges": []})
+
+    assert session.methods == ["get", "post", "post"]
+    assert scheduler.requests == 3
+    assert scheduler.reads.waited == 0
+    assert scheduler.writes.waited == pytest.approx(60 / 19)
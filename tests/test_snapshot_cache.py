@@ -0,0 +1,39 @@
+from fake_gspread import FakeClient
+from sheet_samples import SHEET_IDS, make_db_rows, make_spreadsheets
+
+from gdocs_4_ski_automation.core.factories import GDocsRegistrationFactory
+from gdocs_4_ski_automation.core.snapshot_cache import (DriveRevisionProbe,
+                                                        PickleSnapshotStore,
+                                                        SnapshotCache)
+
+
+def test_unchanged_sheets_are_served_from_snapshots(tmp_path) -> None:
+    """Test that the settings are only downloaded again after a change."""
+    client = FakeClient(make_spreadsheets(make_db_rows(3)))
+    cache = SnapshotCache(PickleSnapshotStore(str(tmp_path)), DriveRevisionProbe(client))
+    expected = GDocsRegistrationFactory(SHEET_IDS, client, cache=cache).build_registrations()
+    assert cache.misses == 1
+
+    client.requests.clear()
+    cache = SnapshotCache(PickleSnapshotStore(str(tmp_path)), DriveRevisionProbe(client))
+    assert GDocsRegistrationFactory(SHEET_IDS, client, cache=cache).build_registrations() == expected
+    assert cache.hits == 1
+    assert sorted(r for r in client.requests if r[0] == "values_batch_get") == [
+        ("values_batch_get", SHEET_IDS["db"]),
+        ("values_batch_get", SHEET_IDS["registrations"]),
+    ]
+
+    client.spreadsheets[SHEET_IDS["settings"]].revision += 1
+    client.requests.clear()
+    GDocsRegistrationFactory(SHEET_IDS, client, cache=cache)
+    assert ("values_batch_get", SHEET_IDS["settings"]) in client.requests
+
+
+def test_written_spreadsheets_are_not_probed(tmp_path) -> None:
+    """Test that the registrations and db workbooks cost no revision probe."""
+    client = FakeClient(make_spreadsheets(make_db_rows(3)))
+    cache = SnapshotCache(PickleSnapshotStore(str(tmp_path)), DriveRevisionProbe(client))
+    GDocsRegistrationFactory(SHEET_IDS, client, cache=cache)
+    assert [r for r in client.requests if r[0] != "values_batch_get"] == [
+        ("get_file_drive_metadata", SHEET_IDS["settings"])
+    ]
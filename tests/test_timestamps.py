@@ -0,0 +1,35 @@
+from datetime import datetime
+
+import pytest
+
+from gdocs_4_ski_automation.core.timestamps import (TIME_STEMP_FORMAT,
+                                                    TimestampParser,
+                                                    parse_time_stemp)
+
+
+@pytest.mark.parametrize(
+    "value",
+    ["01.10.2024 08:05:03", "29.02.2024 23:59:59", "31.12.1999 00:00:00", "1.10.2024 8:05:03"],
+)
+def test_parse_time_stemp_matches_strptime(value) -> None:
+    """Test that the fast path and the fallback agree with strptime."""
+    assert parse_time_stemp(value) == datetime.strptime(value, TIME_STEMP_FORMAT)
+
+
+@pytest.mark.parametrize(
+    "value",
+    ["", "31.02.2024 08:05:03", "01.10.2024 24:00:00", "01-10-2024 08:05:03", "2024-10-01T08:05:03"],
+)
+def test_parse_time_stemp_rejects_invalid_values(value) -> None:
+    """Test that invalid timestamps raise like strptime does."""
+    with pytest.raises(ValueError):
+        parse_time_stemp(value)
+
+
+def test_timestamp_parser_parses_each_value_once() -> None:
+    """Test that repeated timestamps are served from the per-run cache."""
+    parser = TimestampParser()
+    first = parser("01.10.2024 08:05:03")
+    assert parser("01.10.2024 08:05:03") is first
+    parser("02.10.2024 08:05:03")
+    assert (parser.hits, parser.misses) == (1, 2)